@@ -1,132 +1,136 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import sqlite3
+from db import get_db_connection, ROOM_TABLES
+from access_cache import access_cache
+from telemetry_writer import TelemetryWriter
+import telemetry_history
+import setpoint_sync
+from mqtt_router import MqttRouter
+from door_protocol import DoorRequest, DoorResponder, InvalidDeviceId
+import allowlist_sync
+import access_audit
+import metrics
+import log
+import startup
 import paho.mqtt.client as mqtt
 import json
+import atexit
+import os
 import threading
 import time
 
 # Конфігурація
-DB_PATH = '/home/marko/SQliteDB_Stuff/smart_home.db'
-MQTT_BROKER = "raspberrypi.local"
-MQTT_PORT = 1883
-MQTT_USER = "rpi"
-MQTT_PASSWORD = "rpi"
-TOPIC_RESPONSE = "home/door/response"
-
-# Ініціалізація Flask
+MQTT_BROKER = os.environ.get("MQTT_BROKER", "raspberrypi.local")
+MQTT_PORT = int(os.environ.get("MQTT_PORT", 1883))
+MQTT_USER = os.environ.get("MQTT_USER", "rpi")
+MQTT_PASSWORD = os.environ.get("MQTT_PASSWORD", "rpi")
+API_PORT = int(os.environ.get("API_PORT", 5000))
+
+# Ініціалізація Flask; /metrics (Prometheus) і /debug/log-level, /debug/profile,
+# /healthz і /readyz. Імпорт модуля лише описує сервіс: підключення до брокера
+# і фонові потоки запускає create_app().
 app = Flask(__name__)
 CORS(app)
+metrics.register_flask(app, "api_server")
+readiness = startup.Readiness()
+startup.register_flask(app, readiness)
 
-# Ініціалізація MQTT
+# MQTT-клієнт (підключається у create_app)
 mqtt_client = mqtt.Client()
 mqtt_client.username_pw_set(MQTT_USER, MQTT_PASSWORD)
-mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
-mqtt_client.loop_start()
 
-# Підключення до бази даних
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Підключення до бази даних: get_db_connection() з db.py повертає з'єднання з пулу
+# (WAL, busy_timeout, кеш підготовлених запитів); conn.close() повертає його в пул.
 
-# Функція для періодичної відправки бажаної температури
+# Контрольна синхронізація бажаної температури. Зміни публікуються одразу
+# в set_desired_temp (retained, з версією), тому цей потік лише рідко звіряє
+# базу з опублікованими значеннями і надсилає тільки розбіжності.
 def send_desired_temp_periodically():
+    # Перша звірка - після підключення: інакше значення вважалися б опублікованими
+    readiness.wait("mqtt")
     while True:
         conn = get_db_connection()
         try:
-            table_map = ["Corridor", "Kitchen", "LivingRoom", "Bedroom", "Bathroom"]
-            for table in table_map:
-                row = conn.execute(f"SELECT desired_temperature FROM {table} WHERE id = 1").fetchone()
-                if row:
-                    desired_temp = row["desired_temperature"]
-                    mqtt_client.publish(f"home/room/{table.lower()}", json.dumps({"desired_temp": desired_temp}))
-                    print(f"[INFO] Sent desired_temp={desired_temp} to home/room/{table.lower()}")
+            for room in setpoint_sync.resync(conn, mqtt_client):
+                log.info("Re-synced desired_temp for home/room/%s", room)
         except Exception as e:
-            print(f"[ERROR] Failed to send desired temperature: {e}")
+            log.error("Failed to send desired temperature: %s", e)
         finally:
             conn.close()
-        time.sleep(10)
-
-# Запуск потоку для відправки температури
-threading.Thread(target=send_desired_temp_periodically, daemon=True).start()
-
-# Функція для обробки повідомлень MQTT
-def on_message(client, userdata, message):
-    topic = message.topic
-    payload = message.payload.decode('utf-8')
-    print(f"[DEBUG] Отримано повідомлення: {payload} на топіку {topic}")
-
-    if topic.startswith("home/room/"):
-        handle_room_message(topic, payload)
-    elif topic == "home/door/check_password":
-        check_password_mqtt(payload)
-    elif topic == "home/door/check_rfid":
-        check_rfid_mqtt(payload)
-    elif topic == "home/door/add_master":
-        add_master_mqtt(payload)
-    elif topic == "home/door/add_user":
-        add_user_mqtt(payload)
-
-# Прив’язка обробника повідомлень MQTT
-mqtt_client.on_message = on_message
-mqtt_client.subscribe("home/room/#")
-mqtt_client.subscribe("home/door/check_password")
-mqtt_client.subscribe("home/door/check_rfid")
-mqtt_client.subscribe("home/door/add_master")
-mqtt_client.subscribe("home/door/add_user")
+        time.sleep(setpoint_sync.RESYNC_INTERVAL)
+
+# Маршрутизація повідомлень MQTT: мережевий потік paho лише ставить повідомлення
+# в чергу смуги. Запити дверей обробляє окремий воркер смуги "security", тому
+# потік телеметрії кімнат (смуга "bulk") не затримує відповідь home/door/response.
+router = MqttRouter().add_lane("security", workers=1).add_lane("bulk", workers=1, max_queue=5000)
+
+# Запис поточного стану кімнати (рядок id = 2); викликається потоком TelemetryWriter
+def write_room_state(conn, room, data):
+    table_name = ROOM_TABLES[room]
+    if room == "kitchen":
+        conn.execute(f"""
+            UPDATE {table_name}
+            SET light_state = ?, current_temperature = ?, fire_detected = ?, timestamp = CURRENT_TIMESTAMP
+            WHERE id = 2;
+        """, (data.get("light"), data.get("temp"), data.get("fire", "no")))
+    elif room == "bedroom":
+        conn.execute(f"""
+            UPDATE {table_name}
+            SET light_state = ?, current_temperature = ?, curtains_state = ?, timestamp = CURRENT_TIMESTAMP
+            WHERE id = 2;
+        """, (data.get("light"), data.get("temp"), data.get("curtains", "closed")))
+    elif room == "bathroom":
+        conn.execute(f"""
+            UPDATE {table_name}
+            SET light_state = ?, current_temperature = ?, fan_state = ?, timestamp = CURRENT_TIMESTAMP
+            WHERE id = 2;
+        """, (data.get("light"), data.get("temp"), data.get("fan", "off")))
+    else:
+        conn.execute(f"""
+            UPDATE {table_name}
+            SET light_state = ?, current_temperature = ?, timestamp = CURRENT_TIMESTAMP
+            WHERE id = 2;
+        """, (data.get("light"), data.get("temp")))
+
+# Черга телеметрії: запис у базу пакетами в окремому потоці
+telemetry_writer = TelemetryWriter(write_room_state, write_samples=telemetry_history.record_samples)
+metrics.gauge("telemetry_queue_depth", "Telemetry messages waiting to be written",
+              func=lambda: telemetry_writer.stats()["queue_depth"])
+metrics.counter("telemetry_messages_total", "Telemetry messages by outcome", ("outcome",),
+                func=lambda: {(outcome,): telemetry_writer.stats()[outcome]
+                              for outcome in ("received", "dropped", "coalesced", "rows_written")})
+metrics.add_collector(router.collect_metrics)
+room_messages = metrics.counter("mqtt_room_messages_total", "Room telemetry messages by result", ("result",))
 
 # Обробка повідомлень для кімнат
+@router.route("home/room/#", "bulk")
 def handle_room_message(topic, payload):
     room = topic.split('/')[2]
-    conn = get_db_connection()
+    if room not in ROOM_TABLES:
+        room_messages.inc(result="unknown_room")
+        log.warning("Unknown room: %s", room)
+        return
 
     try:
         data = json.loads(payload)
-        table_map = {
-            "corridor": "Corridor",
-            "kitchen": "Kitchen",
-            "livingroom": "LivingRoom",
-            "bedroom": "Bedroom",
-            "bathroom": "Bathroom",
-        }
-
-        table_name = table_map.get(room)
-        if not table_name:
-            print(f"[WARNING] Unknown room: {room}")
-            return
-
-        if room == "kitchen":
-            conn.execute(f"""
-                UPDATE {table_name}
-                SET light_state = ?, current_temperature = ?, fire_detected = ?, timestamp = CURRENT_TIMESTAMP
-                WHERE id = 2;
-            """, (data.get("light"), data.get("temp"), data.get("fire", "no")))
-        elif room == "bedroom":
-            conn.execute(f"""
-                UPDATE {table_name}
-                SET light_state = ?, current_temperature = ?, curtains_state = ?, timestamp = CURRENT_TIMESTAMP
-                WHERE id = 2;
-            """, (data.get("light"), data.get("temp"), data.get("curtains", "closed")))
-        elif room == "bathroom":
-            conn.execute(f"""
-                UPDATE {table_name}
-                SET light_state = ?, current_temperature = ?, fan_state = ?, timestamp = CURRENT_TIMESTAMP
-                WHERE id = 2;
-            """, (data.get("light"), data.get("temp"), data.get("fan", "off")))
-        else:
-            conn.execute(f"""
-                UPDATE {table_name}
-                SET light_state = ?, current_temperature = ?, timestamp = CURRENT_TIMESTAMP
-                WHERE id = 2;
-            """, (data.get("light"), data.get("temp")))
+        if not isinstance(data, dict):
+            raise ValueError("payload is not a JSON object")
+    except ValueError as e:
+        room_messages.inc(result="invalid")
+        log.error("Failed to process message for %s: %s", room, e)
+        return
 
-        conn.commit()
-        print(f"[INFO] ESP32 data for {room} updated in row 2.")
-    except Exception as e:
-        print(f"[ERROR] Failed to process message for {room}: {e}")
-    finally:
-        conn.close()
+    # Власні публікації бажаної температури приходять на той самий топік
+    if setpoint_sync.is_setpoint_message(data):
+        room_messages.inc(result="setpoint_echo")
+        return
+
+    if telemetry_writer.submit(room, data):
+        room_messages.inc(result="queued")
+    else:
+        room_messages.inc(result="dropped")
+        log.debug("Telemetry queue full, message for %s dropped.", room)
 
 # Flask маршрути для встановлення бажаної температури
 @app.route('/api/<room>/set-desired-temp', methods=['POST'])
@@ -136,150 +140,296 @@ def set_desired_temp(room):
     if desired_temp is None:
         return jsonify({'error': 'No desired_temp provided'}), 400
 
-    table_map = {
-        "corridor": "Corridor",
-        "kitchen": "Kitchen",
-        "livingroom": "LivingRoom",
-        "bedroom": "Bedroom",
-        "bathroom": "Bathroom",
-    }
-
-    table_name = table_map.get(room)
-    if not table_name:
+    if room not in ROOM_TABLES:
         return jsonify({"error": f"Invalid room: {room}"}), 400
 
     conn = get_db_connection()
     try:
-        conn.execute(f"""
-            UPDATE {table_name}
-            SET desired_temperature = ?, timestamp = CURRENT_TIMESTAMP
-            WHERE id = 1;
-        """, (desired_temp,))
-        conn.commit()
-        mqtt_client.publish(f"home/room/{room}", json.dumps({"desired_temp": desired_temp}))
-        print(f"[INFO] Desired temperature for {room} updated and published.")
-        return jsonify({'message': f'desired_temp updated for {room}'}), 200
+        changed, version = setpoint_sync.update_desired_temp(conn, room, desired_temp)
+        if not changed:
+            return jsonify({'message': f'desired_temp unchanged for {room}', 'version': version}), 200
+        setpoint_sync.publish_desired_temp(mqtt_client, room, desired_temp, version)
+        log.info("Desired temperature for %s updated and published.", room)
+        return jsonify({'message': f'desired_temp updated for {room}', 'version': version}), 200
     except Exception as e:
-        print(f"[ERROR] Failed to update desired_temp for {room}: {e}")
+        log.error("Failed to update desired_temp for %s: %s", room, e)
         return jsonify({'error': str(e)}), 500
     finally:
         conn.close()
 
-# Функції для дверей
-def check_password_mqtt(password):
-    conn = get_db_connection()
-    stored_password = conn.execute('SELECT password FROM door_passwords LIMIT 1').fetchone()
-    conn.close()
-    if stored_password and stored_password['password'] == password:
-        mqtt_client.publish(TOPIC_RESPONSE, "VALID")
-    else:
-        mqtt_client.publish(TOPIC_RESPONSE, "INVALID")
+# Історія телеметрії кімнати: /api/<room>/history?from=&to=&resolution=raw|1m|1h|1d
+@app.route('/api/<room>/history', methods=['GET'])
+def room_history(room):
+    if room not in ROOM_TABLES:
+        return jsonify({"error": f"Invalid room: {room}"}), 400
+    try:
+        end = telemetry_history.parse_time(request.args.get('to'), time.time())
+        start = telemetry_history.parse_time(request.args.get('from'), end - 86400)
+        conn = get_db_connection()
+        try:
+            resolution, points = telemetry_history.query_history(
+                conn, room, start, end, request.args.get('resolution'))
+        finally:
+            conn.close()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'room': room, 'from': start, 'to': end, 'resolution': resolution, 'points': points})
 
-def check_rfid_mqtt(card_id):
-    conn = get_db_connection()
-    card = conn.execute('SELECT * FROM rfid_cards WHERE card_id = ?', (card_id,)).fetchone()
-    conn.close()
-    if card:
-        mqtt_client.publish(TOPIC_RESPONSE, "VALID")
-    else:
-        mqtt_client.publish(TOPIC_RESPONSE, "INVALID")
+# Поширення списку карток і хешу пароля на контролери дверей (retained-знімок
+# і дельти); зміни з WEB-інтерфейсу помічаються за PRAGMA data_version
+allowlist_publisher = allowlist_sync.AllowlistPublisher(mqtt_client)
+
+# Рішення щодо запитів дверей (статус відповіді ESP32)
+def decide_password(password):
+    return "VALID" if access_cache.check_password(password) else "INVALID"
+
+def decide_rfid(card_id):
+    return "VALID" if access_cache.is_card_allowed(card_id) else "INVALID"
 
-def add_master_mqtt(card_id):
+def decide_add_master(card_id):
     conn = get_db_connection()
-    is_master_set = conn.execute('SELECT * FROM rfid_cards WHERE type = "master"').fetchone()
-    if is_master_set:
-        mqtt_client.publish(TOPIC_RESPONSE, "MASTER_ALREADY_EXISTS")
-    else:
-        try:
-            conn.execute('INSERT INTO rfid_cards (card_id, type) VALUES (?, "master")', (card_id,))
-            conn.commit()
-            mqtt_client.publish(TOPIC_RESPONSE, "ADD_MASTER")
-        except sqlite3.IntegrityError:
-            mqtt_client.publish(TOPIC_RESPONSE, "DUPLICATE_CARD")
-    conn.close()
-
-def add_user_mqtt(card_id):
+    try:
+        is_master_set = conn.execute('SELECT * FROM rfid_cards WHERE type = "master"').fetchone()
+        if is_master_set:
+            return "MASTER_ALREADY_EXISTS"
+        conn.execute('INSERT INTO rfid_cards (card_id, type) VALUES (?, "master")', (card_id,))
+        conn.commit()
+        access_cache.invalidate()
+        allowlist_publisher.notify()
+        return "ADD_MASTER"
+    except sqlite3.IntegrityError:
+        return "DUPLICATE_CARD"
+    finally:
+        conn.close()
+
+def decide_add_user(card_id):
     conn = get_db_connection()
     try:
         conn.execute('INSERT INTO rfid_cards (card_id, type) VALUES (?, "user")', (card_id,))
         conn.commit()
-        mqtt_client.publish(TOPIC_RESPONSE, "ADD_USER")
+        access_cache.invalidate()
+        allowlist_publisher.notify()
+        return "ADD_USER"
     except sqlite3.IntegrityError:
-        mqtt_client.publish(TOPIC_RESPONSE, "DUPLICATE_CARD")
-    conn.close()
+        return "DUPLICATE_CARD"
+    finally:
+        conn.close()
+
+# Журнал рішень доступу: запис пакетами в окремому потоці
+audit_log = access_audit.AccessAudit()
+metrics.gauge("access_audit_queue_depth", "Access events waiting to be written",
+              func=lambda: audit_log.stats()["queue_depth"])
+door_decisions = metrics.counter("door_decisions_total", "Door decisions by channel and status", ("channel", "status"))
+door_decision_seconds = metrics.histogram("door_decision_seconds", "Door decision time", ("channel",))
+
+def audit_door_decision(channel, door_request, status, seconds):
+    door_decisions.inc(channel=channel, status=status)
+    door_decision_seconds.observe(seconds, channel=channel)
+    # Введений пароль не зберігається; картка - лише як HMAC
+    credential = None if channel == "password" else door_request.value
+    audit_log.record(channel, access_audit.decision_for(status), detail=status, credential=credential,
+                     device_id=door_request.device_id, latency=seconds)
+
+# Відповіді дверям: запити з device_id і request_id отримують відповідь на
+# home/door/<device_id>/response, рядкові запити - як раніше на home/door/response
+door_responder = DoorResponder(mqtt_client, on_decision=audit_door_decision)
+
+# Запити дверей - у смузі "security"
+for door_topic, field, decide, channel in [
+    ("home/door/check_password", "password", decide_password, "password"),
+    ("home/door/check_rfid", "card_id", decide_rfid, "rfid"),
+    ("home/door/add_master", "card_id", decide_add_master, "add_master"),
+    ("home/door/add_user", "card_id", decide_add_user, "add_user"),
+]:
+    router.add_route(
+        door_topic,
+        lambda topic, payload, field=field, decide=decide, channel=channel:
+            door_responder.handle_mqtt(payload, field, decide, channel),
+        "security",
+    )
+
+mqtt_client.on_message = router.on_message
+
+@app.errorhandler(InvalidDeviceId)
+def invalid_device_id(e):
+    return jsonify({'status': 'error', 'message': str(e)}), 400
+
+def door_request_from_json(data, field):
+    """Запит дверей з тіла REST-запиту; device_id і request_id необов'язкові.
+
+    Некоректний device_id - InvalidDeviceId (відповідь 400).
+    """
+    device_id, request_id = data.get('device_id'), data.get('request_id')
+    return DoorRequest(
+        data.get(field),
+        str(device_id) if device_id is not None else None,
+        str(request_id) if request_id is not None else None,
+    )
 
 # REST API для роботи з дверима
 @app.route('/api/check-password', methods=['POST'])
 def check_password():
-    data = request.json
-    password = data.get('password')
-    if not password:
+    door_request = door_request_from_json(request.json, 'password')
+    if not door_request.value:
         return jsonify({'status': 'error', 'message': 'Password is required'}), 400
-    conn = get_db_connection()
-    stored_password = conn.execute('SELECT password FROM door_passwords LIMIT 1').fetchone()
-    conn.close()
-    if stored_password and stored_password['password'] == password:
-        mqtt_client.publish(TOPIC_RESPONSE, "VALID")
-        return jsonify({'status': 'success', 'message': 'Password valid'})
+    if door_responder.respond(door_request, decide_password, "password") == "VALID":
+        return jsonify({'status': 'success', 'message': 'Password valid', 'request_id': door_request.request_id})
     else:
-        mqtt_client.publish(TOPIC_RESPONSE, "INVALID")
-        return jsonify({'status': 'error', 'message': 'Password invalid'})
+        return jsonify({'status': 'error', 'message': 'Password invalid', 'request_id': door_request.request_id})
 
 @app.route('/api/check-rfid', methods=['POST'])
 def check_rfid():
-    data = request.json
-    card_id = data.get('card_id')
-    if not card_id:
+    door_request = door_request_from_json(request.json, 'card_id')
+    if not door_request.value:
         return jsonify({'status': 'error', 'message': 'Card ID is required'}), 400
-    conn = get_db_connection()
-    card = conn.execute('SELECT * FROM rfid_cards WHERE card_id = ?', (card_id,)).fetchone()
-    conn.close()
-    if card:
-        mqtt_client.publish(TOPIC_RESPONSE, "VALID")
-        return jsonify({'status': 'success', 'message': 'Card valid'})
+    if door_responder.respond(door_request, decide_rfid, "rfid") == "VALID":
+        return jsonify({'status': 'success', 'message': 'Card valid', 'request_id': door_request.request_id})
     else:
-        mqtt_client.publish(TOPIC_RESPONSE, "INVALID")
-        return jsonify({'status': 'error', 'message': 'Card invalid'})
+        return jsonify({'status': 'error', 'message': 'Card invalid', 'request_id': door_request.request_id})
 
 @app.route('/api/add-master', methods=['POST'])
 def add_master():
-    data = request.json
-    card_id = data.get('card_id')
-    if not card_id:
+    door_request = door_request_from_json(request.json, 'card_id')
+    if not door_request.value:
         return jsonify({'status': 'error', 'message': 'Card ID is required'}), 400
-    conn = get_db_connection()
-    is_master_set = conn.execute('SELECT * FROM rfid_cards WHERE type = "master"').fetchone()
-    if is_master_set:
-        conn.close()
-        mqtt_client.publish(TOPIC_RESPONSE, "MASTER_ALREADY_EXISTS")
-        return jsonify({'status': 'error', 'message': 'Master card already exists'}), 400
-    try:
-        conn.execute('INSERT INTO rfid_cards (card_id, type) VALUES (?, "master")', (card_id,))
-        conn.commit()
-        conn.close()
-        mqtt_client.publish(TOPIC_RESPONSE, "ADD_MASTER")
-        return jsonify({'status': 'success', 'message': 'Master card added'})
-    except sqlite3.IntegrityError:
-        conn.close()
-        return jsonify({'status': 'error', 'message': 'Card ID already exists'}), 400
+    result = door_responder.respond(door_request, decide_add_master, "add_master")
+    if result == "MASTER_ALREADY_EXISTS":
+        return jsonify({'status': 'error', 'message': 'Master card already exists', 'request_id': door_request.request_id}), 400
+    if result == "DUPLICATE_CARD":
+        return jsonify({'status': 'error', 'message': 'Card ID already exists', 'request_id': door_request.request_id}), 400
+    return jsonify({'status': 'success', 'message': 'Master card added', 'request_id': door_request.request_id})
 
 @app.route('/api/add-user', methods=['POST'])
 def add_user():
-    data = request.json
-    card_id = data.get('card_id')
-    if not card_id:
+    door_request = door_request_from_json(request.json, 'card_id')
+    if not door_request.value:
         return jsonify({'status': 'error', 'message': 'Card ID is required'}), 400
+    if door_responder.respond(door_request, decide_add_user, "add_user") == "DUPLICATE_CARD":
+        return jsonify({'status': 'error', 'message': 'Card ID already exists', 'request_id': door_request.request_id}), 400
+    return jsonify({'status': 'success', 'message': 'User card added', 'request_id': door_request.request_id})
+
+# Зміни списку карток після версії since (повний знімок без since або якщо журнал уже очищено)
+@app.route('/api/allowlist', methods=['GET'])
+def allowlist():
+    since = request.args.get('since', type=int)
     conn = get_db_connection()
     try:
-        conn.execute('INSERT INTO rfid_cards (card_id, type) VALUES (?, "user")', (card_id,))
-        conn.commit()
-        conn.close()
-        mqtt_client.publish(TOPIC_RESPONSE, "ADD_USER")
-        return jsonify({'status': 'success', 'message': 'User card added'})
-    except sqlite3.IntegrityError:
+        # Схема allowlist_sync створюється один раз у create_app (етап database)
+        if since is None:
+            return jsonify(allowlist_sync.build_snapshot(conn))
+        return jsonify(allowlist_sync.diff_since(conn, since))
+    finally:
         conn.close()
-        return jsonify({'status': 'error', 'message': 'Card ID already exists'}), 400
+
+@app.route('/api/allowlist/stats', methods=['GET'])
+def allowlist_stats():
+    return jsonify(allowlist_publisher.stats())
+
+# Журнал доступу: /api/access-events?before_id=&limit=&from=&to=&channel=&decision=&card_id=&plate=
+@app.route('/api/access-events', methods=['GET'])
+def access_events():
+    args = request.args
+    try:
+        start = telemetry_history.parse_time(args.get('from'), None)
+        end = telemetry_history.parse_time(args.get('to'), None)
+        conn = get_db_connection()
+        try:
+            events, next_before_id = access_audit.query_events(
+                conn, before_id=args.get('before_id', type=int), limit=args.get('limit', 100, type=int),
+                start=start, end=end, channel=args.get('channel'), decision=args.get('decision'),
+                credential=args.get('card_id'), plate=args.get('plate'))
+        finally:
+            conn.close()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'events': events, 'next_before_id': next_before_id})
+
+# Кількість відмов по годинах: /api/access-events/denials-per-hour?from=&to=&channel=
+@app.route('/api/access-events/denials-per-hour', methods=['GET'])
+def access_denials_per_hour():
+    try:
+        end = telemetry_history.parse_time(request.args.get('to'), time.time())
+        start = telemetry_history.parse_time(request.args.get('from'), end - 86400)
+        conn = get_db_connection()
+        try:
+            hours = access_audit.denials_per_hour(conn, start, end, request.args.get('channel'))
+        finally:
+            conn.close()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'from': start, 'to': end, 'hours': hours})
+
+# Найчастіші номери біля воріт: /api/access-events/top-plates?from=&to=&limit=
+@app.route('/api/access-events/top-plates', methods=['GET'])
+def access_top_plates():
+    try:
+        end = telemetry_history.parse_time(request.args.get('to'), time.time())
+        start = telemetry_history.parse_time(request.args.get('from'), end - 7 * 86400)
+        conn = get_db_connection()
+        try:
+            plates = access_audit.top_plates(conn, start, end, request.args.get('limit', 10, type=int))
+        finally:
+            conn.close()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'from': start, 'to': end, 'plates': plates})
+
+# Стан черги журналу доступу (прийняті, записані, відкинуті події)
+@app.route('/api/access-events/stats', methods=['GET'])
+def access_events_stats():
+    return jsonify(audit_log.stats())
+
+# Статистика кешу авторизації (кількість рішень, затримки p50/p99)
+@app.route('/api/access-cache/stats', methods=['GET'])
+def access_cache_stats():
+    return jsonify(access_cache.stats())
+
+# Метрики черги телеметрії (глибина, відкинуті повідомлення, записи)
+@app.route('/api/telemetry/stats', methods=['GET'])
+def telemetry_stats():
+    return jsonify(telemetry_writer.stats())
+
+@app.route('/api/mqtt/stats', methods=['GET'])
+def mqtt_stats():
+    return jsonify({**router.stats(), 'door_protocol': door_responder.stats()})
+
+_started = False
+_start_lock = threading.Lock()
+
+def create_app():
+    """Запускає сервіс один раз і повертає app (також для WSGI: "API_server:create_app()").
+
+    База і кеш авторизації готуються одразу (мілісекунди), брокер підключається
+    у фоні з повторними спробами; /readyz відповідає 200, коли готове все.
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return app
+        _started = True
+        readiness.expect("database", "mqtt")
+        with readiness.phase("database"):
+            conn = get_db_connection()
+            try:
+                setpoint_sync.ensure_schema(conn)
+                allowlist_sync.ensure_schema(conn)
+                telemetry_history.ensure_schema(conn)
+            finally:
+                conn.close()
+            access_cache.warm_up()
+        telemetry_writer.start()
+        atexit.register(telemetry_writer.stop)
+        audit_log.start()
+        atexit.register(audit_log.stop)
+        router.start()
+        allowlist_publisher.start()
+        atexit.register(allowlist_publisher.stop)
+        # Контрольна синхронізація бажаної температури
+        threading.Thread(target=send_desired_temp_periodically, name="setpoint-resync", daemon=True).start()
+        # Підписки оформлюються після кожного (пере)підключення
+        startup.connect_mqtt(mqtt_client, MQTT_BROKER, MQTT_PORT, readiness, on_connect=[router.subscribe])
+    return app
 
 # Запуск Flask API
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
+    create_app().run(host='0.0.0.0', port=API_PORT)
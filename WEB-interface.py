@@ -1,60 +1,54 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, stream_with_context
 import sqlite3
-import json
+from db import get_db_connection
+import setpoint_sync
+from live_state import LiveStateHub
+from home_snapshot import home_snapshot
 import paho.mqtt.client as mqtt
+import metrics
+import startup
+import os
 import threading
 import time
 
 # Конфігурація
-DB_PATH = '/home/marko/SQliteDB_Stuff/smart_home.db'
-MQTT_BROKER = "raspberrypi.local"
-MQTT_PORT = 1883
-MQTT_USER = "rpi"
-MQTT_PASSWORD = "rpi"
+MQTT_BROKER = os.environ.get("MQTT_BROKER", "raspberrypi.local")
+MQTT_PORT = int(os.environ.get("MQTT_PORT", 1883))
+MQTT_USER = os.environ.get("MQTT_USER", "rpi")
+MQTT_PASSWORD = os.environ.get("MQTT_PASSWORD", "rpi")
+WEB_PORT = int(os.environ.get("WEB_PORT", 5001))
 
 app = Flask(__name__)
 app.secret_key = "supersecretkey"
+metrics.register_flask(app, "web_interface")
+readiness = startup.Readiness()
+startup.register_flask(app, readiness)
 
-# MQTT-клієнт
+# MQTT-клієнт (підключається у create_app)
 mqtt_client = mqtt.Client()
 mqtt_client.username_pw_set(MQTT_USER, MQTT_PASSWORD)
-mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
-mqtt_client.loop_start()
 
-def get_db_connection():
-    """Підключення до бази даних."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Живий стан для сторінки: заповнюється з бази один раз, далі оновлюється з MQTT
+live_hub = LiveStateHub()
+mqtt_client.on_message = live_hub.on_mqtt_message
+metrics.gauge("sse_subscribers", "Open /events streams", func=lambda: live_hub.stats()["subscribers"])
+metrics.counter("sse_events_total", "State changes sent to /events streams", func=lambda: live_hub.stats()["events"])
 
 @app.route('/')
 def index():
-    """Головна сторінка."""
-    conn = get_db_connection()
-    rooms = {}
-    for room in ["Corridor", "Kitchen", "LivingRoom", "Bedroom", "Bathroom"]:
-        desired = conn.execute(f"SELECT desired_temperature FROM {room} WHERE id = 1").fetchone()
-        current = conn.execute(f"SELECT current_temperature, light_state FROM {room} WHERE id = 2").fetchone()
-        additional_data = {}
-        if room == "Bedroom":
-            additional_data["curtains_state"] = conn.execute(f"SELECT curtains_state FROM {room} WHERE id = 2").fetchone()["curtains_state"]
-        elif room == "Bathroom":
-            additional_data["fan_state"] = conn.execute(f"SELECT fan_state FROM {room} WHERE id = 2").fetchone()["fan_state"]
-        elif room == "Kitchen":
-            additional_data["fire_detected"] = conn.execute(f"SELECT fire_detected FROM {room} WHERE id = 2").fetchone()["fire_detected"]
-        
-        rooms[room] = {
-            "desired_temperature": desired["desired_temperature"] if desired else None,
-            "current_temperature": current["current_temperature"] if current else None,
-            "light_state": current["light_state"] if current else None,
-            **additional_data,
-        }
-    
-    password = conn.execute("SELECT password FROM door_passwords WHERE id = 1").fetchone()
-    vehicles = conn.execute("SELECT * FROM allowed_vehicles").fetchall()
-    conn.close()
-
-    return render_template('index.html', rooms=rooms, password=password, vehicles=vehicles)
+    """Головна сторінка (стан з кешованого знімка home_snapshot)."""
+    snapshot = home_snapshot.get()[0]
+    return render_template('index.html', rooms=snapshot["rooms"], password=snapshot["password"],
+                           vehicles=snapshot["vehicles"])
+
+@app.route('/api/state')
+def api_state():
+    """Стан кімнат і список автомобілів у JSON; незмінений стан - 304 за If-None-Match."""
+    _, body, etag = home_snapshot.get()
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
 
 @app.route('/update-password', methods=['POST'])
 def update_password():
@@ -89,9 +83,9 @@ def update_temperature():
 
     conn = get_db_connection()
     try:
-        conn.execute(f"UPDATE {table_map[room]} SET desired_temperature = ?, timestamp = CURRENT_TIMESTAMP WHERE id = 1", (new_temperature,))
-        conn.commit()
-        mqtt_client.publish(f"home/room/{room.lower()}", json.dumps({"desired_temp": new_temperature}))
+        changed, version = setpoint_sync.update_desired_temp(conn, room.lower(), new_temperature)
+        if changed:
+            setpoint_sync.publish_desired_temp(mqtt_client, room.lower(), new_temperature, version)
         flash(f"Бажана температура для {room} успішно оновлена.", "success")
     except Exception as e:
         flash(f"Помилка при оновленні температури: {e}", "error")
@@ -135,5 +129,38 @@ def delete_vehicle():
         conn.close()
     return redirect(url_for('index'))
 
+@app.route('/events')
+def events():
+    """Потік Server-Sent Events зі змінами стану кімнат, дверей і воріт."""
+    response = Response(stream_with_context(live_hub.stream()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.route('/events/stats')
+def events_stats():
+    """Кількість підключених браузерів і розісланих подій."""
+    return jsonify(live_hub.stats())
+
+_started = False
+_start_lock = threading.Lock()
+
+def create_app():
+    """Запускає сервіс один раз і повертає app (також для WSGI: "WEB-interface:create_app()").
+
+    Стан кімнат читається з бази до підписки на MQTT, брокер підключається
+    у фоні з повторними спробами.
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return app
+        _started = True
+        readiness.expect("database", "mqtt")
+        with readiness.phase("database"):
+            live_hub.seed_rooms(home_snapshot.get()[0]["rooms"])
+        startup.connect_mqtt(mqtt_client, MQTT_BROKER, MQTT_PORT, readiness, on_connect=[live_hub.subscribe_mqtt])
+    return app
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001)
+    create_app().run(host='0.0.0.0', port=WEB_PORT, threaded=True)
@@ -0,0 +1,258 @@
+import hashlib
+import hmac
+import queue
+import secrets
+import threading
+import time
+from collections import Counter
+
+import db
+import log
+
+_STOP = object()
+
+# Журнал рішень доступу (двері та ворота) і погодинні/добові агрегати для звітів.
+# Ідентифікатори карток зберігаються лише як HMAC-SHA256 з ключем у базі;
+# введені паролі не зберігаються взагалі.
+# Індекси за карткою і номером неявно містять id, тому сторінки з таким
+# фільтром (ORDER BY id DESC) читаються прямо з індексу без сортування.
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS access_events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    channel TEXT NOT NULL,
+    device_id TEXT,
+    credential_hash TEXT,
+    plate TEXT,
+    decision TEXT NOT NULL,
+    detail TEXT,
+    latency_ms REAL
+);
+CREATE INDEX IF NOT EXISTS idx_access_events_ts ON access_events (ts);
+CREATE INDEX IF NOT EXISTS idx_access_events_credential ON access_events (credential_hash) WHERE credential_hash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_access_events_plate ON access_events (plate) WHERE plate IS NOT NULL;
+CREATE TABLE IF NOT EXISTS access_hourly (
+    hour INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    decision TEXT NOT NULL,
+    events INTEGER NOT NULL,
+    PRIMARY KEY (hour, channel, decision)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS access_plate_daily (
+    day INTEGER NOT NULL,
+    plate TEXT NOT NULL,
+    granted INTEGER NOT NULL,
+    denied INTEGER NOT NULL,
+    PRIMARY KEY (day, plate)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS access_audit_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+INSERT_EVENT_SQL = """
+INSERT INTO access_events (ts, channel, device_id, credential_hash, plate, decision, detail, latency_ms)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+"""
+UPSERT_HOURLY_SQL = """
+INSERT INTO access_hourly (hour, channel, decision, events) VALUES (?, ?, ?, ?)
+ON CONFLICT (hour, channel, decision) DO UPDATE SET events = events + excluded.events;
+"""
+UPSERT_PLATE_SQL = """
+INSERT INTO access_plate_daily (day, plate, granted, denied) VALUES (?, ?, ?, ?)
+ON CONFLICT (day, plate) DO UPDATE SET granted = granted + excluded.granted, denied = denied + excluded.denied;
+"""
+
+# Статуси відповіді дверям, що означають дозвіл
+GRANTED_STATUSES = {"VALID", "ADD_USER", "ADD_MASTER"}
+MAX_PAGE_SIZE = 500
+
+_schema_ready = False
+_keys = {}
+_keys_lock = threading.Lock()
+
+
+def ensure_schema(conn):
+    """Створює таблиці журналу і ключ HMAC (один раз на процес)."""
+    global _schema_ready
+    if not _schema_ready:
+        for statement in SCHEMA_SQL.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+        conn.execute("INSERT OR IGNORE INTO access_audit_meta (key, value) VALUES ('hmac_key', ?)",
+                     (secrets.token_hex(16),))
+        conn.commit()
+        _schema_ready = True
+
+
+def _hmac_key(conn):
+    path = db.DB_PATH
+    with _keys_lock:
+        key = _keys.get(path)
+        if key is None:
+            row = conn.execute("SELECT value FROM access_audit_meta WHERE key = 'hmac_key'").fetchone()
+            key = _keys[path] = bytes.fromhex(row["value"])
+        return key
+
+
+def credential_hash(conn, credential):
+    """Псевдонім картки: той самий для однієї картки, без можливості відновити id."""
+    if credential is None:
+        return None
+    return hmac.new(_hmac_key(conn), str(credential).encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def decision_for(status):
+    return "granted" if status in GRANTED_STATUSES else "denied"
+
+
+class AccessAudit:
+    """Неблокуючий пакетний запис подій доступу.
+
+    record() лише кладе подію в обмежену чергу, тому шлях дозволу не чекає
+    на базу. Потік запису вставляє події пакетами (executemany) і в тій самій
+    транзакції оновлює погодинні лічильники та добові лічильники номерів, з
+    яких будуються звіти без сканування всього журналу. Хешування
+    ідентифікаторів карток теж виконується в потоці запису.
+    """
+
+    def __init__(self, max_queue=10000, batch_size=200, flush_interval=1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="access-audit", daemon=True)
+            self._thread.start()
+        return self
+
+    def record(self, channel, decision, detail=None, credential=None, plate=None, device_id=None,
+               latency=None, ts=None):
+        """Додає подію (latency - секунди); False, якщо черга заповнена."""
+        event = (time.time() if ts is None else ts, channel, device_id, credential, plate, decision, detail,
+                 None if latency is None else round(latency * 1000, 3))
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.counters["dropped"] += 1
+            return False
+        with self._lock:
+            self.counters["received"] += 1
+        return True
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "queue_depth": self._queue.qsize()}
+
+    def _run(self):
+        conn = db.open_connection()
+        ensure_schema(conn)
+        batch = []
+        deadline = None
+        running = True
+        while running:
+            timeout = self.flush_interval if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                running = False
+            elif item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if batch and (not running or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(conn, batch)
+                batch = []
+                deadline = None
+        conn.really_close()
+
+    def _flush(self, conn, batch):
+        rows = []
+        hourly = Counter()
+        plates = {}
+        for ts, channel, device_id, credential, plate, decision, detail, latency_ms in batch:
+            rows.append((ts, channel, device_id, credential_hash(conn, credential), plate, decision, detail, latency_ms))
+            hourly[(int(ts // 3600 * 3600), channel, decision)] += 1
+            if plate:
+                counts = plates.setdefault((int(ts // 86400 * 86400), plate), [0, 0])
+                counts[0 if decision == "granted" else 1] += 1
+        try:
+            with conn:
+                conn.executemany(INSERT_EVENT_SQL, rows)
+                conn.executemany(UPSERT_HOURLY_SQL, [(*key, events) for key, events in hourly.items()])
+                conn.executemany(UPSERT_PLATE_SQL, [(*key, *counts) for key, counts in plates.items()])
+        except Exception as e:
+            log.error("Failed to write access events: %s", e)
+            with self._lock:
+                self.counters["errors"] += 1
+            return
+        with self._lock:
+            self.counters["written"] += len(rows)
+            self.counters["flushes"] += 1
+
+
+def query_events(conn, before_id=None, limit=100, start=None, end=None, channel=None, decision=None,
+                 credential=None, plate=None):
+    """Сторінка подій від найновіших. Повертає (події, before_id наступної сторінки або None).
+
+    Пагінація за ключем (id < before_id), тому глибокі сторінки не сповільнюються.
+    """
+    ensure_schema(conn)
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    conditions, params = [], []
+    for column, op, value in (
+        ("id", "<", before_id),
+        ("ts", ">=", start),
+        ("ts", "<", end),
+        ("channel", "=", channel),
+        ("decision", "=", decision),
+        ("credential_hash", "=", credential_hash(conn, credential) if credential is not None else None),
+        ("plate", "=", plate),
+    ):
+        if value is not None:
+            conditions.append(f"{column} {op} ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = conn.execute(
+        f"SELECT id, ts, channel, device_id, credential_hash, plate, decision, detail, latency_ms "
+        f"FROM access_events {where} ORDER BY id DESC LIMIT ?",
+        (*params, limit + 1),
+    ).fetchall()
+    events = [dict(row) for row in rows[:limit]]
+    return events, events[-1]["id"] if len(rows) > limit else None
+
+
+def denials_per_hour(conn, start, end, channel=None):
+    """Кількість відмов за кожну годину [start, end) з погодинних лічильників."""
+    ensure_schema(conn)
+    sql = "SELECT hour, sum(events) AS denied FROM access_hourly WHERE decision = 'denied' AND hour >= ? AND hour < ?"
+    params = [int(start // 3600 * 3600), end]
+    if channel is not None:
+        sql += " AND channel = ?"
+        params.append(channel)
+    return [dict(row) for row in conn.execute(sql + " GROUP BY hour ORDER BY hour", params)]
+
+
+def top_plates(conn, start, end, limit=10):
+    """Найчастіші номери за проміжок (з точністю до доби) з добових лічильників."""
+    ensure_schema(conn)
+    rows = conn.execute("""
+        SELECT plate, sum(granted) AS granted, sum(denied) AS denied, sum(granted + denied) AS total
+        FROM access_plate_daily WHERE day >= ? AND day < ?
+        GROUP BY plate ORDER BY total DESC, plate LIMIT ?
+    """, (int(start // 86400 * 86400), end, max(1, min(int(limit), MAX_PAGE_SIZE))))
+    return [dict(row) for row in rows]
@@ -0,0 +1,196 @@
+import threading
+import time
+from collections import deque
+
+import db
+import log
+from plate_matcher import PlateMatcher
+
+# Скільки останніх рішень зберігати для обчислення p50/p99
+LATENCY_WINDOW = 2048
+
+# Лічильник версії даних доступу. Тригери збільшують його при будь-якій зміні
+# rfid_cards, door_passwords або allowed_vehicles, у тому числі з іншого процесу
+# (WEB-interface.py змінює пароль і номери, API_server.py — картки).
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS access_cache_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO access_cache_version (id, version) VALUES (1, 0);
+"""
+WATCHED_TABLES = ["rfid_cards", "door_passwords", "allowed_vehicles"]
+TRIGGER_SQL = """
+CREATE TRIGGER IF NOT EXISTS {table}_access_{op}
+AFTER {op} ON {table}
+BEGIN
+    UPDATE access_cache_version SET version = version + 1 WHERE id = 1;
+END;
+"""
+
+
+def install_triggers(conn):
+    """Створює access_cache_version і тригери на таблицях доступу (якщо їх ще немає).
+
+    Повертає False, якщо тригери створити не вдалося: тоді кеш
+    перезавантажується при кожній зміні PRAGMA data_version.
+    """
+    try:
+        conn.executescript(SCHEMA_SQL + "".join(
+            TRIGGER_SQL.format(table=table, op=op)
+            for table in WATCHED_TABLES
+            for op in ("INSERT", "UPDATE", "DELETE")
+        ))
+        return True
+    except Exception as e:
+        log.error("Access cache triggers not installed, reloading on every database change: %s", e)
+        return False
+
+
+def read_version(conn):
+    """Поточна версія даних доступу або None, якщо тригери не встановлені."""
+    try:
+        row = conn.execute("SELECT version FROM access_cache_version WHERE id = 1").fetchone()
+        return row["version"] if row else None
+    except Exception:
+        return None
+
+
+class AccessCache:
+    """Кеш даних авторизації: картки RFID, пароль дверей і дозволені номери.
+
+    Перевірка виконується в пам'яті за O(1); номери автомобілів, що не
+    збіглися точно, шукаються нечітко (plate_matcher.PlateMatcher). Перед кожною перевіркою читається
+    PRAGMA data_version власного з'єднання (без звернення до таблиць): якщо
+    базу змінило інше з'єднання, порівнюється версія access_cache_version і
+    лише тоді кеш перезавантажується. Якщо версії немає (тригери не
+    встановлені), кеш перезавантажується при кожній зміні data_version.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._version = None
+        self._stale = True
+        self.cards = frozenset()
+        self.password = None
+        self.plates = frozenset()
+        self._plate_matcher = None
+        self.reloads = 0
+        self._latencies = {
+            "rfid": deque(maxlen=LATENCY_WINDOW),
+            "password": deque(maxlen=LATENCY_WINDOW),
+            "plate": deque(maxlen=LATENCY_WINDOW),
+        }
+        self._counts = {kind: {"granted": 0, "denied": 0} for kind in self._latencies}
+
+    def _connect(self):
+        conn = db.open_connection()
+        install_triggers(conn)
+        return conn
+
+    def _read_version(self):
+        return read_version(self._conn)
+
+    def _reload(self):
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            self._version = self._read_version()
+            self.cards = frozenset(row["card_id"] for row in conn.execute("SELECT card_id FROM rfid_cards"))
+            row = conn.execute("SELECT password FROM door_passwords LIMIT 1").fetchone()
+            self.password = row["password"] if row else None
+            plates = frozenset(row["plate_number"] for row in conn.execute("SELECT plate_number FROM allowed_vehicles"))
+        finally:
+            conn.rollback()
+        if plates != self.plates or self._plate_matcher is None:
+            self.plates = plates
+            counters = self._plate_matcher.counters if self._plate_matcher is not None else None
+            self._plate_matcher = PlateMatcher(plates)
+            if counters is not None:
+                self._plate_matcher.counters = counters
+        self._stale = False
+        self.reloads += 1
+
+    def _refresh(self):
+        """Перезавантажує кеш, якщо дані доступу змінилися."""
+        if self._conn is None:
+            self._conn = self._connect()
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            version = self._read_version()
+            if version is None or version != self._version:
+                self._stale = True
+        if self._stale:
+            self._reload()
+
+    def _decide(self, kind, check):
+        started = time.perf_counter()
+        with self._lock:
+            self._refresh()
+            allowed = check()
+            self._latencies[kind].append(time.perf_counter() - started)
+            self._counts[kind]["granted" if allowed else "denied"] += 1
+        return allowed
+
+    def is_card_allowed(self, card_id):
+        return self._decide("rfid", lambda: card_id in self.cards)
+
+    def check_password(self, password):
+        return self._decide("password", lambda: self.password is not None and self.password == password)
+
+    def match_plate(self, plate_number):
+        """Дозволений номер, з яким збігся розпізнаний (точно або нечітко), або None."""
+        matched = []
+
+        def check():
+            if plate_number in self.plates:
+                matched.append(plate_number)
+            else:
+                _, plate, _ = self._plate_matcher.match(plate_number)
+                if plate is not None:
+                    matched.append(plate)
+            return bool(matched)
+
+        self._decide("plate", check)
+        return matched[0] if matched else None
+
+    def is_plate_allowed(self, plate_number):
+        return self.match_plate(plate_number) is not None
+
+    def warm_up(self):
+        """Завантажує кеш заздалегідь, щоб перше рішення доступу не чекало на базу."""
+        with self._lock:
+            self._refresh()
+
+    def invalidate(self):
+        """Позначає кеш застарілим після змін у цьому процесі."""
+        with self._lock:
+            self._stale = True
+
+    def stats(self):
+        """Лічильники рішень і затримки p50/p99 (мс) для кожного типу перевірки."""
+        with self._lock:
+            samples = {kind: sorted(values) for kind, values in self._latencies.items()}
+            counts = {kind: dict(values) for kind, values in self._counts.items()}
+            reloads = self.reloads
+            matcher = self._plate_matcher.stats() if self._plate_matcher is not None else None
+        result = {"reloads": reloads, "versioned": self._version is not None, "plate_matcher": matcher}
+        for kind, values in samples.items():
+            result[kind] = {
+                **counts[kind],
+                "p50_ms": round(_percentile(values, 0.50) * 1000, 4),
+                "p99_ms": round(_percentile(values, 0.99) * 1000, 4),
+            }
+        return result
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+access_cache = AccessCache()
@@ -0,0 +1,238 @@
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+
+import db
+import log
+
+# Retained-знімок списку карток і дельти змін для контролерів дверей
+SNAPSHOT_TOPIC = "home/door/allowlist/snapshot"
+DELTA_TOPIC = "home/door/allowlist/delta"
+# Як часто перевіряти базу на зміни (секунди) та скільки змін зберігати для diff
+POLL_INTERVAL = float(os.environ.get("ALLOWLIST_POLL_INTERVAL", 1.0))
+KEEP_CHANGES = 1000
+# Ключ HMAC для відбитків карток у знімках і дельтах: UID карток не публікуються,
+# контролер дверей прошивається тим самим ключем і порівнює HMAC зчитаного UID.
+# Без ALLOWLIST_CARD_KEY ключ генерується один раз і зберігається в allowlist_meta (card_key).
+ALLOWLIST_CARD_KEY = os.environ.get("ALLOWLIST_CARD_KEY")
+# Ітерації PBKDF2-HMAC-SHA256 для пароля дверей; контролер повторює їх для кожного
+# введеного пароля, тому значення - компроміс між стійкістю до перебору і часом на ESP32
+PASSWORD_ITERATIONS = int(os.environ.get("ALLOWLIST_PASSWORD_ITERATIONS", 20000))
+
+# Журнал змін: кожна зміна rfid_cards або пароля дверей отримує наступну версію
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS allowlist_changes (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    card_id TEXT,
+    card_type TEXT
+);
+CREATE TABLE IF NOT EXISTS allowlist_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS allowlist_rfid_cards_insert AFTER INSERT ON rfid_cards
+BEGIN
+    INSERT INTO allowlist_changes (op, card_id, card_type) VALUES ('add', NEW.card_id, NEW.type);
+END;
+CREATE TRIGGER IF NOT EXISTS allowlist_rfid_cards_delete AFTER DELETE ON rfid_cards
+BEGIN
+    INSERT INTO allowlist_changes (op, card_id) VALUES ('remove', OLD.card_id);
+END;
+CREATE TRIGGER IF NOT EXISTS allowlist_rfid_cards_update AFTER UPDATE ON rfid_cards
+BEGIN
+    INSERT INTO allowlist_changes (op, card_id) VALUES ('remove', OLD.card_id);
+    INSERT INTO allowlist_changes (op, card_id, card_type) VALUES ('add', NEW.card_id, NEW.type);
+END;
+CREATE TRIGGER IF NOT EXISTS allowlist_door_passwords_insert AFTER INSERT ON door_passwords
+BEGIN
+    INSERT INTO allowlist_changes (op) VALUES ('password');
+END;
+CREATE TRIGGER IF NOT EXISTS allowlist_door_passwords_update AFTER UPDATE ON door_passwords
+BEGIN
+    INSERT INTO allowlist_changes (op) VALUES ('password');
+END;
+"""
+
+
+def ensure_schema(conn):
+    conn.executescript(SCHEMA_SQL)
+    conn.execute("INSERT OR IGNORE INTO allowlist_meta (key, value) VALUES ('salt', ?)", (secrets.token_hex(8),))
+    conn.execute("INSERT OR IGNORE INTO allowlist_meta (key, value) VALUES ('card_key', ?)", (secrets.token_hex(32),))
+    conn.execute("INSERT OR IGNORE INTO allowlist_meta (key, value) VALUES ('pruned_through', '0')")
+    conn.commit()
+
+
+def _meta(conn, key):
+    row = conn.execute("SELECT value FROM allowlist_meta WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else None
+
+
+def card_key(conn):
+    return ALLOWLIST_CARD_KEY or _meta(conn, "card_key")
+
+
+def card_hash(key, card_id):
+    """HMAC-SHA256 id картки (32 hex-символи), як його рахує контролер для зчитаної картки."""
+    return hmac.new(key.encode("utf-8"), str(card_id).encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def hash_password(password, salt, iterations=PASSWORD_ITERATIONS):
+    """PBKDF2-HMAC-SHA256 пароля з сіллю; контролер порівнює хеш введеного пароля."""
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("utf-8"), iterations).hex()
+
+
+def password_digest(conn):
+    row = conn.execute("SELECT password FROM door_passwords WHERE id = 1").fetchone()
+    if row is None:
+        return None
+    salt = _meta(conn, "salt")
+    return {"salt": salt, "iterations": PASSWORD_ITERATIONS,
+            "pbkdf2_sha256": hash_password(row["password"], salt, PASSWORD_ITERATIONS)}
+
+
+def current_version(conn):
+    row = conn.execute("SELECT max(version) AS version FROM allowlist_changes").fetchone()
+    return row["version"] or 0
+
+
+def build_snapshot(conn):
+    """Повний список карток ({HMAC id картки: тип}) і хеш пароля з номером версії."""
+    conn.execute("BEGIN")
+    try:
+        key = card_key(conn)
+        return {
+            "version": current_version(conn),
+            "cards": {card_hash(key, row["card_id"]): row["type"]
+                      for row in conn.execute("SELECT card_id, type FROM rfid_cards")},
+            "password": password_digest(conn),
+        }
+    finally:
+        conn.rollback()
+
+
+def diff_since(conn, since):
+    """Зміни після версії since: {"from", "to", "add": {HMAC id картки: тип}, "remove": [...]}.
+
+    Якщо журнал змін уже очищений до since, повертається повний знімок з "full": true.
+    """
+    conn.execute("BEGIN")
+    try:
+        if since < int(_meta(conn, "pruned_through") or 0):
+            conn.rollback()
+            return {**build_snapshot(conn), "full": True}
+        to_version = current_version(conn)
+        final = {}
+        password_changed = False
+        for row in conn.execute(
+            "SELECT op, card_id, card_type FROM allowlist_changes WHERE version > ? AND version <= ? ORDER BY version",
+            (since, to_version),
+        ):
+            if row["op"] == "password":
+                password_changed = True
+            else:
+                final[row["card_id"]] = (row["op"], row["card_type"])
+        key = card_key(conn)
+        delta = {
+            "from": since,
+            "to": to_version,
+            "add": {card_hash(key, card_id): card_type for card_id, (op, card_type) in final.items() if op == "add"},
+            "remove": [card_hash(key, card_id) for card_id, (op, _) in final.items() if op == "remove"],
+        }
+        if password_changed:
+            delta["password"] = password_digest(conn)
+        return delta
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+
+
+def prune(conn, keep=KEEP_CHANGES):
+    """Видаляє найстаріші записи журналу; diff для старіших версій стане повним знімком."""
+    threshold = current_version(conn) - keep
+    if threshold <= int(_meta(conn, "pruned_through") or 0):
+        return 0
+    with conn:
+        deleted = conn.execute("DELETE FROM allowlist_changes WHERE version <= ?", (threshold,)).rowcount
+        conn.execute("UPDATE allowlist_meta SET value = ? WHERE key = 'pruned_through'", (str(threshold),))
+    return deleted
+
+
+class AllowlistPublisher:
+    """Фоновий потік, що поширює список карток на контролери дверей.
+
+    Раз на POLL_INTERVAL секунд (або одразу після notify()) перевіряє PRAGMA
+    data_version власного з'єднання; якщо версія журналу змін зросла,
+    публікує дельту на DELTA_TOPIC і оновлює retained-знімок на SNAPSHOT_TOPIC.
+    Контролер після запуску бере retained-знімок, відписується від
+    SNAPSHOT_TOPIC і далі застосовує лише дельти; якщо "from" дельти не
+    збігається з його версією, він звіряється через diff_since (REST).
+    """
+
+    def __init__(self, mqtt_client, interval=POLL_INTERVAL):
+        self.mqtt_client = mqtt_client
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._published_version = None
+        self._data_version = None
+        self.counters = {"snapshots": 0, "deltas": 0, "snapshot_bytes": 0, "delta_bytes": 0, "errors": 0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="allowlist-sync", daemon=True)
+        self._thread.start()
+        return self
+
+    def notify(self):
+        """Негайна перевірка після зміни карток або пароля в цьому процесі."""
+        self._wake.set()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _publish(self, topic, data, retain):
+        payload = json.dumps(data, separators=(",", ":"))
+        self.mqtt_client.publish(topic, payload, qos=1, retain=retain)
+        return len(payload)
+
+    def sync(self, conn):
+        """Одна перевірка: публікує дельту та знімок, якщо версія змінилась."""
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version and self._published_version is not None:
+            return False
+        self._data_version = data_version
+        version = current_version(conn)
+        if version == self._published_version:
+            return False
+        if self._published_version is not None:
+            self.counters["delta_bytes"] += self._publish(DELTA_TOPIC, diff_since(conn, self._published_version), False)
+            self.counters["deltas"] += 1
+        snapshot = build_snapshot(conn)
+        self.counters["snapshot_bytes"] += self._publish(SNAPSHOT_TOPIC, snapshot, True)
+        self.counters["snapshots"] += 1
+        self._published_version = snapshot["version"]
+        prune(conn)
+        return True
+
+    def _run(self):
+        conn = db.open_connection()
+        ensure_schema(conn)
+        while not self._stop.is_set():
+            try:
+                self.sync(conn)
+            except Exception as e:
+                self.counters["errors"] += 1
+                log.error("Allowlist sync failed: %s", e)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+        conn.really_close()
+
+    def stats(self):
+        return {**self.counters, "published_version": self._published_version}
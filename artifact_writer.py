@@ -0,0 +1,173 @@
+import collections
+import itertools
+import os
+import queue
+import random
+import threading
+from datetime import datetime
+
+import cv2
+
+import log
+
+_STOP = object()
+
+
+def should_save(policy, allowed, confidence, low_confidence=0.8, sample_rate=0.0, rng=random):
+    """Політика вибірки: policy - набір з "all", "denied", "low_confidence", "none".
+
+    Результати, що не підпали під політику, зберігаються з імовірністю sample_rate.
+    """
+    if "all" in policy:
+        return True
+    if "denied" in policy and allowed is False:
+        return True
+    if "low_confidence" in policy and confidence is not None and confidence < low_confidence:
+        return True
+    return sample_rate > 0 and rng.random() < sample_rate
+
+
+class ArtifactWriter:
+    """Фоновий запис вирізаних зображень автомобілів і номерів.
+
+    save() лише копіює область у чергу і повертає шлях файлу, кодування JPEG
+    і запис виконує окремий потік. Імена файлів унікальні (мікросекунди та
+    лічильник). Коли розмір файлів у каталогах перевищує quota_bytes,
+    найстаріші файли видаляються. При заповненій черзі зображення відкидається.
+    """
+
+    def __init__(self, directories, quota_bytes=512 * 1024 * 1024, max_queue=64):
+        self.directories = list(directories)
+        self.quota_bytes = quota_bytes
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._counter = itertools.count(1)
+        self._files = collections.deque()
+        self._used_bytes = 0
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.deleted = 0
+        self.errors = 0
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+        self._scan()
+        self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+        self._thread.start()
+
+    def _scan(self):
+        """Облік наявних файлів (від найстарішого), щоб квота враховувала їх після перезапуску."""
+        entries = []
+        for directory in self.directories:
+            for entry in os.scandir(directory):
+                if entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._files.append((path, size))
+            self._used_bytes += size
+
+    def save(self, image, output_dir, prefix):
+        """Ставить зображення в чергу на запис; повертає шлях майбутнього файлу або None."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        filepath = os.path.join(output_dir, f"{prefix}_{timestamp}_{next(self._counter)}.jpg")
+        try:
+            self._queue.put_nowait((filepath, image.copy()))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return None
+        return filepath
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            filepath, image = item
+            try:
+                if not cv2.imwrite(filepath, image):
+                    raise OSError(f"cv2.imwrite failed for {filepath}")
+                size = os.path.getsize(filepath)
+            except Exception as e:
+                log.error("Не вдалося зберегти зображення %s: %s", filepath, e)
+                with self._lock:
+                    self.errors += 1
+                continue
+            with self._lock:
+                self.written += 1
+                self._files.append((filepath, size))
+                self._used_bytes += size
+            self._enforce_quota()
+
+    def _enforce_quota(self):
+        while True:
+            with self._lock:
+                if self._used_bytes <= self.quota_bytes or not self._files:
+                    return
+                path, size = self._files.popleft()
+                self._used_bytes -= size
+                self.deleted += 1
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "written": self.written,
+                "dropped": self.dropped,
+                "deleted": self.deleted,
+                "errors": self.errors,
+                "queue_depth": self._queue.qsize(),
+                "used_mb": round(self._used_bytes / (1024 * 1024), 1),
+                "quota_mb": round(self.quota_bytes / (1024 * 1024), 1),
+            }
+
+    def close(self, timeout=5.0):
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+
+class BufferedLogAppender:
+    """Буферизований запис рядків у файл: файл відкритий постійно, дані
+    скидаються на диск раз на flush_interval секунд. При досягненні max_bytes
+    файл перейменовується на <ім'я>.1."""
+
+    def __init__(self, path, flush_interval=2.0, max_bytes=5 * 1024 * 1024):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file = open(path, "a", buffering=64 * 1024)
+        self._dirty = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-appender", daemon=True)
+        self._thread.start()
+
+    def append(self, lines):
+        with self._lock:
+            for line in lines:
+                self._file.write(line + "\n")
+            self._dirty = True
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self._file.flush()
+            self._dirty = False
+            if self._file.tell() >= self.max_bytes:
+                self._file.close()
+                os.replace(self.path, self.path + ".1")
+                self._file = open(self.path, "a", buffering=64 * 1024)
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,56 @@
+import os
+
+import cv2
+import numpy as np
+
+# Розмір спільного входу моделі номерів для пакетного виявлення. За замовчуванням
+# 640 - розмір, з яким модель номерів навчена і викликалась для кожного автомобіля
+# окремо; менше значення пришвидшує виявлення, але дрібні номери можуть губитися
+# (перевірка - benchmarks/bench_plate_batch.py, поле parity)
+PLATE_INPUT_SIZE = int(os.environ.get("PLATE_INPUT_SIZE", 640))
+PAD_VALUE = 114
+
+
+def letterbox(image, size):
+    """Зменшує зображення зі збереженням пропорцій і доповнює до size x size.
+
+    Повертає (зображення, масштаб, (зсув_x, зсув_y)) для зворотного перерахунку рамок.
+    """
+    height, width = image.shape[:2]
+    scale = min(size / width, size / height)
+    new_width, new_height = max(1, round(width * scale)), max(1, round(height * scale))
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    resized = cv2.resize(image, (new_width, new_height), interpolation=interpolation)
+    canvas = np.full((size, size, 3), PAD_VALUE, dtype=image.dtype)
+    pad_x, pad_y = (size - new_width) // 2, (size - new_height) // 2
+    canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = resized
+    return canvas, scale, (pad_x, pad_y)
+
+
+def unletterbox(detections, scale, pad, shape):
+    """Переводить рамки [x1, y1, x2, y2, conf, cls] з координат letterbox у координати оригіналу."""
+    if len(detections) == 0:
+        return detections
+    boxes = np.array(detections, dtype=np.float32, copy=True)
+    boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / scale
+    boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / scale
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+    return boxes
+
+
+def detect_batch(model, images, size=PLATE_INPUT_SIZE):
+    """Один пакетний виклик моделі YOLO для всіх зображень.
+
+    Повертає для кожного зображення масив рамок [x1, y1, x2, y2, conf, cls]
+    у координатах цього зображення (як results[0].boxes.data для одного виклику).
+    """
+    if not images:
+        return []
+    boxed = [letterbox(image, size) for image in images]
+    results = model([canvas for canvas, _, _ in boxed], imgsz=size, verbose=False)
+    detections = []
+    for image, (_, scale, pad), result in zip(images, boxed, results):
+        data = result.boxes.data.cpu().numpy() if result.boxes is not None else np.empty((0, 6), dtype=np.float32)
+        detections.append(unletterbox(data, scale, pad, image.shape[:2]))
+    return detections
@@ -0,0 +1,114 @@
+"""Журнал доступу access_audit на мільйонах подій: вартість record() на шляху
+дозволу, швидкість пакетного запису та час запитів REST.
+
+Синтетичні події (двері та ворота) за останні 90 днів записуються через
+AccessAudit._flush тими самими пакетами, що й у фоновому потоці. Далі
+вимірюються: перша і глибока сторінка журналу (пагінація за ключем), фільтр за
+карткою, фільтр за номером, відмови по годинах і найчастіші номери. Для
+порівняння - ті самі агрегати прямим GROUP BY по access_events.
+
+Запуск: python3 benchmarks/bench_access_audit.py [--events 1000000] [--repeats 20]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from synthetic_db import create_database, random_plate
+
+import access_audit
+import db
+
+CHANNELS = ["rfid", "rfid", "password", "plate", "plate", "plate"]
+
+
+def timed(func, repeats):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        result = func()
+    return round((time.perf_counter() - started) / repeats * 1000, 3), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1_000_000, help="подій у журналі доступу")
+    parser.add_argument("--repeats", type=int, default=20, help="повторів кожного запиту")
+    args = parser.parse_args()
+    event_count, repeats = args.events, args.repeats
+    rng = random.Random(3)
+    cards = [f"{rng.getrandbits(32):08X}" for _ in range(200)]
+    plates = [random_plate(rng) for _ in range(2000)]
+    now = time.time()
+    start = now - 90 * 86400
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "smart_home.db")
+        create_database(path, journal_mode="WAL")
+        db.DB_PATH = path
+        conn = db.open_connection(path)
+        access_audit.ensure_schema(conn)
+
+        # Вартість record() для шляху дозволу (лише черга)
+        audit = access_audit.AccessAudit(max_queue=event_count + 1)
+        record_started = time.perf_counter()
+        for _ in range(10000):
+            audit.record("rfid", "granted", detail="VALID", credential=cards[0], device_id="door1", latency=0.001)
+        record_us = (time.perf_counter() - record_started) / 10000 * 1e6
+
+        batch = []
+        written_started = time.perf_counter()
+        for index in range(event_count):
+            ts = start + (now - start) * index / event_count
+            channel = rng.choice(CHANNELS)
+            decision = "denied" if rng.random() < 0.15 else "granted"
+            credential = rng.choice(cards) if channel == "rfid" else None
+            plate = rng.choice(plates) if channel == "plate" else None
+            batch.append((ts, channel, "door1" if channel != "plate" else None, credential, plate, decision,
+                          None, rng.uniform(1, 40)))
+            if len(batch) == 5000:
+                audit._flush(conn, batch)
+                batch = []
+        if batch:
+            audit._flush(conn, batch)
+        write_seconds = time.perf_counter() - written_started
+
+        first_ms, (_, before_id) = timed(lambda: access_audit.query_events(conn, limit=100), repeats)
+        deep_ms, _ = timed(lambda: access_audit.query_events(conn, before_id=event_count // 10, limit=100), repeats)
+        card_ms, _ = timed(lambda: access_audit.query_events(conn, credential=cards[5], limit=100), repeats)
+        plate_ms, _ = timed(lambda: access_audit.query_events(conn, plate=plates[5], limit=100), repeats)
+        window_ms, _ = timed(lambda: access_audit.query_events(
+            conn, start=now - 86400, end=now, decision="denied", limit=100), repeats)
+        hourly_ms, _ = timed(lambda: access_audit.denials_per_hour(conn, now - 7 * 86400, now), repeats)
+        top_ms, _ = timed(lambda: access_audit.top_plates(conn, now - 30 * 86400, now), repeats)
+        raw_hourly_ms, _ = timed(lambda: conn.execute(
+            "SELECT CAST(ts / 3600 AS INTEGER) * 3600 AS hour, count(*) FROM access_events "
+            "WHERE decision = 'denied' AND ts >= ? AND ts < ? GROUP BY hour", (now - 7 * 86400, now)).fetchall(), 3)
+        raw_top_ms, _ = timed(lambda: conn.execute(
+            "SELECT plate, count(*) AS total FROM access_events WHERE plate IS NOT NULL AND ts >= ? AND ts < ? "
+            "GROUP BY plate ORDER BY total DESC LIMIT 10", (now - 30 * 86400, now)).fetchall(), 3)
+        conn.really_close()
+        size_mb = os.path.getsize(path) / 1e6
+
+    print(json.dumps({
+        "events": event_count,
+        "db_size_mb": round(size_mb, 1),
+        "record_call_us": round(record_us, 2),
+        "batched_write_events_per_sec": round(event_count / write_seconds),
+        "query_ms": {
+            "first_page": first_ms,
+            "deep_page": deep_ms,
+            "by_card": card_ms,
+            "by_plate": plate_ms,
+            "last_day_denied": window_ms,
+            "denials_per_hour_7d": hourly_ms,
+            "top_plates_30d": top_ms,
+            "denials_per_hour_7d_raw_group_by": raw_hourly_ms,
+            "top_plates_30d_raw_group_by": raw_top_ms,
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
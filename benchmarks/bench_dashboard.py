@@ -0,0 +1,115 @@
+"""Бенчмарк головної сторінки WEB-інтерфейсу: попередні 13 запитів index() проти
+одного зведеного запиту home_snapshot.load_snapshot та кешованого знімка
+HomeSnapshotCache (з перечитуванням після запису телеметрії і без нього).
+
+Якщо встановлено Flask, вимірюється також повний рендер WEB-interface.html.
+
+Запуск: python3 benchmarks/bench_dashboard.py [--repeats 2000] [--vehicles 200]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from synthetic_db import ROOT_DIR, ROOM_TABLES, create_database
+
+import db
+import home_snapshot
+
+
+def legacy_load(conn):
+    """Запити index() до появи home_snapshot."""
+    rooms = {}
+    for room in ROOM_TABLES:
+        desired = conn.execute(f"SELECT desired_temperature FROM {room} WHERE id = 1").fetchone()
+        current = conn.execute(f"SELECT current_temperature, light_state FROM {room} WHERE id = 2").fetchone()
+        additional_data = {}
+        if room == "Bedroom":
+            additional_data["curtains_state"] = conn.execute(f"SELECT curtains_state FROM {room} WHERE id = 2").fetchone()["curtains_state"]
+        elif room == "Bathroom":
+            additional_data["fan_state"] = conn.execute(f"SELECT fan_state FROM {room} WHERE id = 2").fetchone()["fan_state"]
+        elif room == "Kitchen":
+            additional_data["fire_detected"] = conn.execute(f"SELECT fire_detected FROM {room} WHERE id = 2").fetchone()["fire_detected"]
+        rooms[room] = {
+            "desired_temperature": desired["desired_temperature"] if desired else None,
+            "current_temperature": current["current_temperature"] if current else None,
+            "light_state": current["light_state"] if current else None,
+            **additional_data,
+        }
+    password = conn.execute("SELECT password FROM door_passwords WHERE id = 1").fetchone()
+    vehicles = conn.execute("SELECT * FROM allowed_vehicles").fetchall()
+    return {"rooms": rooms, "password": password, "vehicles": vehicles}
+
+
+def measure(func, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    ordered = sorted(timings)
+    return {
+        "mean_ms": round(statistics.mean(timings) * 1000, 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+    }
+
+
+def make_renderer():
+    try:
+        from flask import Flask, render_template
+    except ImportError:
+        return None
+    app = Flask(__name__, template_folder=ROOT_DIR)
+
+    def render(snapshot):
+        with app.test_request_context("/"):
+            return render_template("WEB-interface.html", rooms=snapshot["rooms"],
+                                   password=snapshot["password"], vehicles=snapshot["vehicles"])
+    return render
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=2000, help="повторів кожного вимірювання")
+    parser.add_argument("--vehicles", type=int, default=200, help="автомобілів у синтетичній базі")
+    args = parser.parse_args()
+    repeats, vehicles = args.repeats, args.vehicles
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "smart_home.db")
+        create_database(path, vehicles=vehicles, journal_mode="WAL")
+        db.DB_PATH = path
+        reader = db.open_connection()
+        writer = db.open_connection()
+        cache = home_snapshot.HomeSnapshotCache()
+        temperature = [20.0]
+
+        def write_telemetry():
+            temperature[0] += 0.1
+            writer.execute("UPDATE Kitchen SET current_temperature = ? WHERE id = 2", (temperature[0],))
+            writer.commit()
+
+        def cache_after_write():
+            write_telemetry()
+            cache.get()
+
+        results = {
+            "legacy_13_queries": measure(lambda: legacy_load(reader), repeats),
+            "uncached_snapshot": measure(lambda: home_snapshot.load_snapshot(reader), repeats),
+            "cache_hit": measure(cache.get, repeats),
+            "write_only": measure(write_telemetry, repeats),
+            "cache_after_write": measure(cache_after_write, repeats),
+        }
+        render = make_renderer()
+        if render is not None:
+            results["render_legacy"] = measure(lambda: render(legacy_load(reader)), repeats // 10 or 1)
+            results["render_cached"] = measure(lambda: render(cache.get()[0]), repeats // 10 or 1)
+        results["cache"] = cache.stats()
+        reader.really_close()
+        writer.really_close()
+    print(json.dumps({"repeats": repeats, "vehicles": vehicles, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Бенчмарк запису телеметрії ESP32: sqlite3.connect на кожне повідомлення
+(rollback-журнал) проти пулу з'єднань db.py (WAL).
+
+Паралельно працює потік-читач, що імітує запити index() з WEB-interface.py,
+щоб було видно, чи блокують записи читання дашборда.
+
+Запуск: python3 benchmarks/bench_db.py [--messages 2000]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from synthetic_db import ROOM_TABLES, create_database, room_payload
+
+import db
+
+ROOMS = [table.lower() for table in ROOM_TABLES]
+TABLE_MAP = {table.lower(): table for table in ROOM_TABLES}
+EXTRA_FIELD = {"kitchen": ("fire_detected", "fire", "no"),
+               "bedroom": ("curtains_state", "curtains", "closed"),
+               "bathroom": ("fan_state", "fan", "off")}
+
+
+def write_room(conn, room, payload):
+    """Те саме оновлення рядка id = 2, що виконує handle_room_message."""
+    data = json.loads(payload)
+    table_name = TABLE_MAP[room]
+    if room in EXTRA_FIELD:
+        column, key, default = EXTRA_FIELD[room]
+        conn.execute(f"""
+            UPDATE {table_name}
+            SET light_state = ?, current_temperature = ?, {column} = ?, timestamp = CURRENT_TIMESTAMP
+            WHERE id = 2;
+        """, (data.get("light"), data.get("temp"), data.get(key, default)))
+    else:
+        conn.execute(f"""
+            UPDATE {table_name}
+            SET light_state = ?, current_temperature = ?, timestamp = CURRENT_TIMESTAMP
+            WHERE id = 2;
+        """, (data.get("light"), data.get("temp")))
+    conn.commit()
+
+
+def read_dashboard(conn):
+    for table in ROOM_TABLES:
+        conn.execute(f"SELECT desired_temperature FROM {table} WHERE id = 1").fetchone()
+        conn.execute(f"SELECT current_temperature, light_state FROM {table} WHERE id = 2").fetchone()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(messages, connect, release, read_connect):
+    rng = random.Random(7)
+    payloads = [(room, json.dumps(room_payload(room, rng))) for room in rng.choices(ROOMS, k=messages)]
+    stop = threading.Event()
+    read_latencies = []
+
+    def reader():
+        while not stop.is_set():
+            conn = read_connect()
+            started = time.perf_counter()
+            try:
+                read_dashboard(conn)
+            except sqlite3.OperationalError:
+                pass
+            read_latencies.append(time.perf_counter() - started)
+            release(conn)
+            time.sleep(0.001)
+
+    reader_thread = threading.Thread(target=reader, daemon=True)
+    reader_thread.start()
+    started = time.perf_counter()
+    for room, payload in payloads:
+        conn = connect()
+        write_room(conn, room, payload)
+        release(conn)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    reader_thread.join()
+    return {
+        "messages": messages,
+        "seconds": round(elapsed, 3),
+        "messages_per_sec": round(messages / elapsed, 1),
+        "reader_p50_ms": round(percentile(read_latencies, 0.50) * 1000, 3),
+        "reader_p99_ms": round(percentile(read_latencies, 0.99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000, help="повідомлень телеметрії на кожен варіант")
+    messages = parser.parse_args().messages
+    workdir = tempfile.mkdtemp(prefix="bench_db_")
+
+    before_path = os.path.join(workdir, "before.db")
+    create_database(before_path)
+
+    def connect_before():
+        conn = sqlite3.connect(before_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    before = run(messages, connect_before, lambda conn: conn.close(), connect_before)
+
+    after_path = os.path.join(workdir, "after.db")
+    create_database(after_path)
+    db.DB_PATH = after_path
+    db.close_all()
+    after = run(messages, db.get_db_connection, lambda conn: conn.close(), db.get_db_connection)
+    db.close_all()
+
+    result = {"before": before, "after": after,
+              "speedup": round(after["messages_per_sec"] / before["messages_per_sec"], 2)}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
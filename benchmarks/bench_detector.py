@@ -0,0 +1,157 @@
+"""Порівняння бекендів detector.py: точність і затримка на каталозі зразків.
+
+Еталон - PyTorch-модель (.pt) через ultralytics; кожен варіант (експортовані
+.onnx, каталоги *_openvino_model, INT8-версії) запускається на тих самих
+зображеннях. Для кожного варіанта:
+- затримка одного виклику detect() (mean, p50, p95) і кадрів/с;
+- збіг з еталоном: частка еталонних рамок, знайдених варіантом (recall),
+  частка рамок варіанта, що є в еталоні (precision), при IoU >= 0.5 і тому
+  самому класі; середній IoU збігів; частка зображень, де перша рамка
+  (саме її бере розпізнавач) збігається з першою рамкою еталона.
+
+--kind car: зображення - повні кадри, зменшуються до DETECT_WIDTH, як у
+розпізнавачі; --kind plate: зображення - вирізані автомобілі, вхід PLATE_INPUT_SIZE.
+
+Запуск: python3 benchmarks/bench_detector.py <каталог> --model yolov8n.pt
+        [--variants yolov8n.onnx yolov8n_int8.onnx yolov8n_openvino_model] [--kind car|plate]
+        [--threads 4] [--repeats 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import detector
+from batch_detect import PLATE_INPUT_SIZE
+from camera import ImageDirectorySource
+from preprocess import FramePreprocessor
+
+MATCH_IOU = 0.5
+
+
+def load_images(directory, kind, limit):
+    source = ImageDirectorySource(directory, loop=False)
+    if not source.paths:
+        raise SystemExit(f"У каталозі {directory} немає зображень")
+    preprocessor = FramePreprocessor()
+    images = []
+    for _ in range(min(limit, len(source.paths))):
+        image = source.read()
+        if image is None:
+            break
+        # Буфер зменшеного кадру використовується повторно - потрібна копія
+        images.append(preprocessor.downscale(image)[0].copy() if kind == "car" else image)
+    return images
+
+
+def iou(box, boxes):
+    width = (np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0])).clip(0)
+    height = (np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1])).clip(0)
+    intersection = width * height
+    areas = (box[2] - box[0]) * (box[3] - box[1]) + (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / (areas - intersection + 1e-9)
+
+
+def match(reference, candidate):
+    """Жадібний збіг рамок за IoU (той самий клас): (кількість збігів, сума IoU)."""
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0, 0.0
+    used = np.zeros(len(candidate), dtype=bool)
+    matched, total_iou = 0, 0.0
+    for box in reference:
+        overlaps = iou(box, candidate)
+        overlaps[used | (candidate[:, 5] != box[5])] = 0
+        best = int(overlaps.argmax())
+        if overlaps[best] >= MATCH_IOU:
+            used[best] = True
+            matched += 1
+            total_iou += float(overlaps[best])
+    return matched, total_iou
+
+
+def run_variant(variant, images, input_size, threads, repeats):
+    if variant.endswith(".pt"):
+        # Еталон завжди PyTorch, навіть якщо поруч лежить експортована модель
+        model = detector.TorchDetector(variant, input_size, threads)
+    else:
+        model = detector.load_detector(variant, input_size, threads=threads)
+    model.detect(images[:1])
+    timings, detections = [], []
+    for _ in range(repeats):
+        detections = []
+        for image in images:
+            started = time.perf_counter()
+            detections.append(model.detect([image])[0])
+            timings.append(time.perf_counter() - started)
+    ordered = sorted(timings)
+    return model.describe(), detections, {
+        "mean_ms": round(statistics.mean(timings) * 1000, 2),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "per_sec": round(len(timings) / sum(timings), 2),
+    }
+
+
+def compare(reference, candidate):
+    reference_boxes = sum(len(boxes) for boxes in reference)
+    candidate_boxes = sum(len(boxes) for boxes in candidate)
+    matched, total_iou, first_agree = 0, 0.0, 0
+    for expected, actual in zip(reference, candidate):
+        count, iou_sum = match(expected, actual)
+        matched += count
+        total_iou += iou_sum
+        if len(expected) == 0 and len(actual) == 0:
+            first_agree += 1
+        elif len(expected) and len(actual) and match(expected[:1], actual[:1])[0]:
+            first_agree += 1
+    return {
+        "reference_boxes": reference_boxes,
+        "boxes": candidate_boxes,
+        "recall": round(matched / reference_boxes, 4) if reference_boxes else None,
+        "precision": round(matched / candidate_boxes, 4) if candidate_boxes else None,
+        "mean_iou": round(total_iou / matched, 4) if matched else None,
+        "first_box_agreement": round(first_agree / len(reference), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--model", default="yolov8n.pt", help="еталонна модель .pt")
+    parser.add_argument("--variants", nargs="*", default=[], help="експортовані моделі для порівняння")
+    parser.add_argument("--kind", choices=["car", "plate"], default="car")
+    parser.add_argument("--threads", type=int, default=detector.DETECTOR_THREADS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=200, help="максимум зображень")
+    args = parser.parse_args()
+
+    images = load_images(args.directory, args.kind, args.limit)
+    input_size = PLATE_INPUT_SIZE if args.kind == "plate" else None
+    results = []
+    reference = None
+    for variant in [args.model] + args.variants:
+        try:
+            description, detections, latency = run_variant(variant, images, input_size, args.threads, args.repeats)
+        except ImportError as e:
+            print(f"{variant}: пропущено ({e})", file=sys.stderr)
+            continue
+        entry = {**description, "latency": latency}
+        if reference is None:
+            reference = detections
+            entry["reference"] = True
+        else:
+            entry["accuracy"] = compare(reference, detections)
+        results.append(entry)
+        print(f"{variant}: {latency}", file=sys.stderr)
+    print(json.dumps({"kind": args.kind, "images": len(images), "threads": args.threads,
+                      "repeats": args.repeats, "results": results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
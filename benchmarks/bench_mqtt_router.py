@@ -0,0 +1,180 @@
+"""Навантажувальний тест маршрутизації MQTT: затримка відповіді дверям під час
+потоку телеметрії кімнат.
+
+Фальшивий брокер у процесі доставляє повідомлення з одного мережевого потоку,
+як paho. Телеметрія записується в синтетичну базу окремим UPDATE і COMMIT на
+кожне повідомлення (найгірший випадок). Порівнюються попередній ланцюжок
+if/elif у мережевому потоці та mqtt_router.MqttRouter зі смугами "security" і "bulk".
+
+Запуск: python3 benchmarks/bench_mqtt_router.py [--telemetry-rate 3000] [--seconds 5] [--door-rate 20]
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+
+from synthetic_db import ROOM_TABLES, create_database, room_payload
+
+import db
+from mqtt_router import MqttRouter
+
+TABLE_MAP = {table.lower(): table for table in ROOM_TABLES}
+ROOMS = list(TABLE_MAP)
+_STOP = object()
+
+
+class FakeMessage:
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload.encode("utf-8")
+
+
+class FakeBroker:
+    """Доставка повідомлень клієнту з одного потоку (як мережевий цикл paho)."""
+
+    def __init__(self, on_message):
+        self.on_message = on_message
+        self.inbox = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def publish(self, topic, payload):
+        self.inbox.put(FakeMessage(topic, payload))
+
+    def _run(self):
+        while True:
+            message = self.inbox.get()
+            if message is _STOP:
+                break
+            self.on_message(None, None, message)
+
+    def close(self):
+        self.inbox.put(_STOP)
+        self.thread.join()
+
+
+class DoorProbe:
+    """Запити home/door/check_password з міткою часу та вимір затримки відповіді."""
+
+    def __init__(self):
+        self.sent = {}
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    def request(self, broker, index):
+        with self.lock:
+            self.sent[str(index)] = time.perf_counter()
+        broker.publish("home/door/check_password", str(index))
+
+    def respond(self, payload):
+        # Та сама перевірка в пам'яті, що й access_cache; відповідь - момент publish
+        with self.lock:
+            self.latencies.append(time.perf_counter() - self.sent.pop(payload))
+
+
+def make_telemetry_writer(path):
+    conn = db.open_connection(path)
+    lock = threading.Lock()
+
+    def write(topic, payload):
+        room = topic.split("/")[2]
+        data = json.loads(payload)
+        with lock:
+            conn.execute(
+                f"UPDATE {TABLE_MAP[room]} "
+                f"SET light_state = ?, current_temperature = ?, timestamp = CURRENT_TIMESTAMP WHERE id = 2",
+                (data.get("light"), data.get("temp")),
+            )
+            conn.commit()
+    return write
+
+
+def legacy_handler(write, probe):
+    def on_message(client, userdata, message):
+        topic = message.topic
+        payload = message.payload.decode("utf-8")
+        if topic.startswith("home/room/"):
+            write(topic, payload)
+        elif topic == "home/door/check_password":
+            probe.respond(payload)
+    return on_message
+
+
+def router_handler(write, probe):
+    router = MqttRouter().add_lane("security", workers=1).add_lane("bulk", workers=1, max_queue=5000)
+    router.add_route("home/room/#", write, "bulk")
+    router.add_route("home/door/check_password", lambda topic, payload: probe.respond(payload), "security")
+    return router
+
+
+def run(mode, path, telemetry_rate, seconds, door_rate):
+    write = make_telemetry_writer(path)
+    probe = DoorProbe()
+    router = None
+    if mode == "legacy":
+        broker = FakeBroker(legacy_handler(write, probe))
+    else:
+        router = router_handler(write, probe).start()
+        broker = FakeBroker(router.on_message)
+
+    rng = random.Random(1)
+    started = time.perf_counter()
+    sent_telemetry = 0
+    door_index = 0
+    while True:
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            break
+        while sent_telemetry < elapsed * telemetry_rate:
+            room = rng.choice(ROOMS)
+            broker.publish(f"home/room/{room}", json.dumps(room_payload(room, rng)))
+            sent_telemetry += 1
+        while door_index < elapsed * door_rate:
+            probe.request(broker, door_index)
+            door_index += 1
+        time.sleep(0.001)
+
+    # Очікування відповідей на всі запити дверей (але не довше 30 с)
+    deadline = time.perf_counter() + 30
+    while probe.sent and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    backlog = broker.inbox.qsize()
+    broker.close()
+    result = {"telemetry_sent": sent_telemetry, "door_requests": door_index,
+              "door_unanswered": len(probe.sent), "broker_backlog_at_end": backlog}
+    if router is not None:
+        stats = router.stats()["lanes"]
+        result["bulk_dropped"] = stats["bulk"]["dropped"]
+        result["bulk_high_watermark"] = stats["bulk"]["queue_high_watermark"]
+        router.stop()
+    ordered = sorted(probe.latencies)
+    if ordered:
+        result["door_p50_ms"] = round(ordered[len(ordered) // 2] * 1000, 2)
+        result["door_p99_ms"] = round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 2)
+        result["door_max_ms"] = round(ordered[-1] * 1000, 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--telemetry-rate", type=float, default=3000, help="повідомлень телеметрії/с")
+    parser.add_argument("--seconds", type=float, default=5, help="тривалість кожного варіанта")
+    parser.add_argument("--door-rate", type=float, default=20, help="запитів дверей/с")
+    args = parser.parse_args()
+    telemetry_rate, seconds, door_rate = args.telemetry_rate, args.seconds, args.door_rate
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for mode in ("legacy", "router"):
+            path = os.path.join(tmp, f"{mode}.db")
+            create_database(path, journal_mode="WAL")
+            results[mode] = run(mode, path, telemetry_rate, seconds, door_rate)
+    print(json.dumps({"telemetry_per_sec": telemetry_rate, "seconds": seconds,
+                      "door_per_sec": door_rate, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Мікробенчмарк OCR номерних знаків: попередній спосіб (pytesseract.image_to_string
+послідовно, новий процес tesseract на кожен номер) проти пулу ocr_pool.OcrPool.
+
+Запуск: python3 benchmarks/bench_ocr.py <каталог_вирізаних_номерів> [воркерів] [проходів]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+
+from camera import IMAGE_EXTENSIONS
+from ocr_pool import TESSERACT_CONFIG, OcrPool, prepare_plate_image
+
+
+def load_corpus(directory):
+    images = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            image = cv2.imread(os.path.join(directory, name))
+            if image is not None:
+                images.append(prepare_plate_image(image))
+    if not images:
+        raise SystemExit(f"У каталозі {directory} немає зображень")
+    return images
+
+
+def summarize(latencies, elapsed):
+    ordered = sorted(latencies)
+    return {
+        "plates": len(ordered),
+        "plates_per_sec": round(len(ordered) / elapsed, 2),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+    }
+
+
+def bench_spawn(images):
+    import pytesseract
+
+    latencies = []
+    started = time.perf_counter()
+    for image in images:
+        t0 = time.perf_counter()
+        pytesseract.image_to_string(image, config=TESSERACT_CONFIG)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def bench_pool(images, workers):
+    pool = OcrPool(workers)
+    # Прогрів: по одному розпізнаванню в кожному потоці, щоб завантажити моделі
+    for future in [pool.submit(images[0]) for _ in range(workers)]:
+        future.result()
+    submitted = []
+    started = time.perf_counter()
+    for image in images:
+        submitted.append((time.perf_counter(), pool.submit(image)))
+    latencies = []
+    for t0, future in submitted:
+        future.result()
+        latencies.append(time.perf_counter() - t0)
+    result = summarize(latencies, time.perf_counter() - started)
+    result["backend"] = pool.backend
+    result["engine_p95_ms"] = pool.stats()["p95_ms"]
+    pool.close()
+    return result
+
+
+def main():
+    if len(sys.argv) < 2:
+        raise SystemExit(__doc__)
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    passes = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    images = load_corpus(sys.argv[1]) * passes
+    print(json.dumps({
+        "workers": workers,
+        "spawn_per_plate": bench_spawn(images),
+        "pool": bench_pool(images, workers),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Бенчмарк виявлення номерів: окремий виклик model_plates на кожен автомобіль
+проти одного пакетного виклику (batch_detect.detect_batch) для 1, 2, 4 і 8 автомобілів.
+
+Зображення з каталогу використовуються як вирізані області автомобілів.
+Поле parity показує, чи пакетний шлях знаходить ті самі номери, що й окремі
+виклики: частку рамок окремих викликів, для яких у пакеті є рамка з
+IoU >= PARITY_IOU, і частку автомобілів, де перша рамка (її бере розпізнавач)
+збігається. Розмір входу пакета - PLATE_INPUT_SIZE (змінна середовища).
+
+Запуск: python3 benchmarks/bench_plate_batch.py <каталог_зображень> [модель.pt] [повторів]
+"""
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_detect import PLATE_INPUT_SIZE, detect_batch
+from camera import ImageDirectorySource
+from plate_tracker import iou
+
+VEHICLE_COUNTS = [1, 2, 4, 8]
+PARITY_IOU = 0.5
+
+
+def load_crops(directory, count):
+    source = ImageDirectorySource(directory, loop=True)
+    if not source.paths:
+        raise SystemExit(f"У каталозі {directory} немає зображень")
+    return [source.read() for _ in range(count)]
+
+
+def measure(func, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {
+        "mean_ms": round(statistics.mean(timings) * 1000, 2),
+        "p95_ms": round(sorted(timings)[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 2),
+    }
+
+
+def per_crop_boxes(model, crops):
+    """Рамки [x1, y1, x2, y2, conf, cls] окремих викликів model_plates для кожного автомобіля."""
+    boxes = []
+    for crop in crops:
+        result = model(crop, verbose=False)[0]
+        boxes.append(result.boxes.data.cpu().numpy() if result.boxes is not None else [])
+    return boxes
+
+
+def parity(expected, actual):
+    """Збіг рамок пакетного шляху (actual) з рамками окремих викликів (expected)."""
+    matched = total = first_matched = 0
+    for reference, boxes in zip(expected, actual):
+        total += len(reference)
+        matched += sum(
+            any(iou(box[:4], candidate[:4]) >= PARITY_IOU for candidate in boxes) for box in reference)
+        if len(reference) == 0 or len(boxes) == 0:
+            first_matched += int(len(reference) == len(boxes))
+        else:
+            first_matched += int(iou(reference[0][:4], boxes[0][:4]) >= PARITY_IOU)
+    return {
+        "per_crop_boxes": total,
+        "batched_boxes": sum(len(boxes) for boxes in actual),
+        "box_recall": round(matched / total, 3) if total else None,
+        "first_plate_agreement": round(first_matched / len(expected), 3) if expected else None,
+    }
+
+
+def main():
+    if len(sys.argv) < 2:
+        raise SystemExit(__doc__)
+    directory = sys.argv[1]
+    model_path = sys.argv[2] if len(sys.argv) > 2 else "license_plate_detector.pt"
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    crops = load_crops(directory, max(VEHICLE_COUNTS))
+    # Прогрів моделі для обох режимів
+    model(crops[0], verbose=False)
+    detect_batch(model, crops[:2], PLATE_INPUT_SIZE)
+
+    results = []
+    for count in VEHICLE_COUNTS:
+        batch = crops[:count]
+        per_crop = measure(lambda: [model(crop, verbose=False) for crop in batch], repeats)
+        batched = measure(lambda: detect_batch(model, batch, PLATE_INPUT_SIZE), repeats)
+        results.append({
+            "vehicles": count,
+            "per_crop": per_crop,
+            "batched": batched,
+            "speedup": round(per_crop["mean_ms"] / batched["mean_ms"], 2) if batched["mean_ms"] else None,
+            "parity": parity(per_crop_boxes(model, batch), detect_batch(model, batch, PLATE_INPUT_SIZE)),
+        })
+    print(json.dumps({"model": model_path, "input_size": PLATE_INPUT_SIZE, "repeats": repeats, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
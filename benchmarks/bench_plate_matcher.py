@@ -0,0 +1,127 @@
+"""Нечіткий пошук номерів plate_matcher на синтетичному корпусі з помилками OCR:
+точність рішень проти затримки для різних порогів.
+
+Дозволені номери генеруються у форматі АА1234ВВ. Запити:
+- "allowed" - дозволений номер з типовими помилками OCR (плутанини O/0, I/1,
+  B/8, ..., кирилиця замість латиниці, зрідка довільна заміна або пропуск символу);
+- "stranger" - випадковий номер, якого немає у списку;
+- "neighbour" - дозволений номер з однією довільною заміною (інший автомобіль).
+Для кожного MAX_DISTANCE рахується частка впущених дозволених, помилково
+впущених чужих, затримка p50/p99 і час побудови індексу; для порівняння -
+точний збіг і лінійний перебір зваженою відстанню.
+
+Запуск: python3 benchmarks/bench_plate_matcher.py [--plates 5000] [--queries 5000]
+"""
+import argparse
+import json
+import random
+import time
+
+from synthetic_db import UA_PLATE_LETTERS, random_plate
+
+import plate_matcher
+from plate_matcher import CONFUSION_GROUPS, PlateMatcher, normalize, weighted_distance
+
+LATIN_TO_CYRILLIC = dict(zip("ABEKMHOPCTXI", "АВЕКМНОРСТХІ"))
+CONFUSABLE = {char: group.replace(char, "") for group in CONFUSION_GROUPS for char in group}
+THRESHOLDS = [0.3, 0.6, 1.0, 1.3]
+
+
+def add_ocr_noise(plate, rng):
+    chars = []
+    for char in plate:
+        roll = rng.random()
+        if roll < 0.06 and char in CONFUSABLE:
+            chars.append(rng.choice(CONFUSABLE[char]))
+        elif roll < 0.12 and char in LATIN_TO_CYRILLIC:
+            chars.append(LATIN_TO_CYRILLIC[char])
+        elif roll < 0.13:
+            chars.append(rng.choice(UA_PLATE_LETTERS + "0123456789"))
+        elif roll < 0.135:
+            continue
+        else:
+            chars.append(char)
+    return "".join(chars)
+
+
+def neighbour(plate, allowed, rng):
+    while True:
+        index = rng.randrange(len(plate))
+        pool = "0123456789" if plate[index].isdigit() else UA_PLATE_LETTERS
+        candidate = plate[:index] + rng.choice(pool) + plate[index + 1:]
+        if candidate not in allowed:
+            return candidate
+
+
+def build_corpus(allowed, count, rng):
+    plates = sorted(allowed)
+    corpus = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.7:
+            corpus.append(("allowed", add_ocr_noise(rng.choice(plates), rng)))
+        elif roll < 0.85:
+            plate = random_plate(rng)
+            if plate not in allowed:
+                corpus.append(("stranger", plate))
+        else:
+            corpus.append(("neighbour", neighbour(rng.choice(plates), allowed, rng)))
+    return corpus
+
+
+def evaluate(name, decide, corpus):
+    outcomes = {kind: [0, 0] for kind in ("allowed", "stranger", "neighbour")}
+    latencies = []
+    for kind, text in corpus:
+        started = time.perf_counter()
+        granted = decide(text)
+        latencies.append(time.perf_counter() - started)
+        outcomes[kind][0 if granted else 1] += 1
+    latencies.sort()
+    rate = lambda counts: round(counts[0] / max(1, sum(counts)), 4)
+    return {
+        "mode": name,
+        "allowed_granted": rate(outcomes["allowed"]),
+        "stranger_granted": rate(outcomes["stranger"]),
+        "neighbour_granted": rate(outcomes["neighbour"]),
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "p99_us": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plates", type=int, default=5000, help="дозволених номерів")
+    parser.add_argument("--queries", type=int, default=5000, help="розпізнаних номерів у корпусі")
+    args = parser.parse_args()
+    plate_count, query_count = args.plates, args.queries
+    rng = random.Random(5)
+    allowed = set()
+    while len(allowed) < plate_count:
+        allowed.add(random_plate(rng))
+    corpus = build_corpus(allowed, query_count, rng)
+
+    results = [evaluate("exact", lambda text: text in allowed, corpus)]
+    for threshold in THRESHOLDS:
+        started = time.perf_counter()
+        matcher = PlateMatcher(allowed, max_distance=threshold)
+        build_ms = round((time.perf_counter() - started) * 1000, 1)
+        result = evaluate(f"index max_distance={threshold}", lambda text: matcher.match(text)[1] is not None, corpus)
+        results.append({**result, "build_ms": build_ms, "matches": dict(matcher.counters)})
+
+    # Лінійний перебір на частині корпусу: та сама відстань без індексу
+    # (і перевірка, що індекс не пропускає кандидатів)
+    normalized = [normalize(plate) for plate in allowed]
+    linear_threshold = plate_matcher.MAX_DISTANCE
+    sample = corpus[:100]
+    matcher = PlateMatcher(allowed, max_distance=linear_threshold, min_margin=0.0)
+    linear = lambda text: min(weighted_distance(normalize(text), plate) for plate in normalized) <= linear_threshold
+    results.append({
+        **evaluate(f"linear_scan max_distance={linear_threshold}", linear, sample),
+        "disagreements_with_index": sum(linear(text) != (matcher.match(text)[1] is not None) for _, text in sample),
+    })
+    print(json.dumps({"allowed_plates": plate_count, "queries": len(corpus), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
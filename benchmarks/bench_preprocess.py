@@ -0,0 +1,115 @@
+"""Бенчмарк підготовки кадру: попередній спосіб (convertScaleAbs на всьому кадрі,
+виявлення на повному кадрі, вирізання з освітленого кадру) проти preprocess.FramePreprocessor
+(виявлення на зменшеному кадрі, LUT лише для вирізаних областей, повторне використання буфера).
+
+Вимірюються затримка на кадр і пік виділеної пам'яті (tracemalloc). Без моделі
+вимірюється лише підготовка з letterbox до 640, як це робить YOLO; з моделлю -
+також сам виклик model_cars.
+
+Запуск: python3 benchmarks/bench_preprocess.py <каталог_кадрів> [--model yolov8n.pt] [--frames 30]
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+
+from batch_detect import letterbox
+from camera import ImageDirectorySource
+from preprocess import FramePreprocessor
+
+YOLO_INPUT_SIZE = 640
+# Рамки автомобілів у частках кадру, якщо модель не задана
+SYNTHETIC_BOXES = [(0.1, 0.4, 0.45, 0.9), (0.55, 0.35, 0.95, 0.95)]
+
+
+def boxes_for(frame, detect):
+    if detect is not None:
+        return detect(frame)
+    height, width = frame.shape[:2]
+    return [(x1 * width, y1 * height, x2 * width, y2 * height) for x1, y1, x2, y2 in SYNTHETIC_BOXES]
+
+
+def legacy_path(frame, model):
+    bright = cv2.convertScaleAbs(frame, alpha=1.2, beta=50)
+    if model is None:
+        letterbox(bright, YOLO_INPUT_SIZE)
+        boxes = boxes_for(bright, None)
+    else:
+        result = model(bright, verbose=False)[0]
+        boxes = result.boxes.data.cpu().numpy()[:, :4] if result.boxes is not None else []
+    return [bright[int(y1):int(y2), int(x1):int(x2)] for x1, y1, x2, y2 in boxes]
+
+
+def preprocessed_path(preprocessor, frame, model):
+    small, scale = preprocessor.downscale(frame)
+    if model is None:
+        letterbox(small, YOLO_INPUT_SIZE)
+        boxes = boxes_for(frame, None)
+    else:
+        result = model(small, verbose=False)[0]
+        data = result.boxes.data.cpu().numpy() if result.boxes is not None else []
+        boxes = [box[:4] for box in preprocessor.to_full(data, scale, frame.shape[:2])]
+    return [preprocessor.crop(frame, box) for box in boxes]
+
+
+def measure(func, frames):
+    timings = []
+    peaks = []
+    for frame in frames:
+        tracemalloc.start()
+        started = time.perf_counter()
+        func(frame)
+        timings.append(time.perf_counter() - started)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    ordered = sorted(timings)
+    return {
+        "mean_ms": round(statistics.mean(timings) * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "peak_alloc_mb": round(max(peaks) / (1024 * 1024), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("frames_dir", help="каталог кадрів")
+    parser.add_argument("--model", help="модель автомобілів (наприклад, yolov8n.pt); без неї - лише підготовка")
+    parser.add_argument("--frames", type=int, default=30, help="кадрів у вимірюванні")
+    args = parser.parse_args()
+    source = ImageDirectorySource(args.frames_dir, loop=True)
+    if not source.paths:
+        raise SystemExit(f"У каталозі {args.frames_dir} немає зображень")
+    model = None
+    if args.model:
+        from ultralytics import YOLO
+
+        model = YOLO(args.model)
+    count = args.frames
+    frames = [source.read() for _ in range(min(count, len(source.paths)))]
+
+    preprocessor = FramePreprocessor()
+    # Прогрів (ініціалізація моделі та буфера)
+    legacy_path(frames[0], model)
+    preprocessed_path(preprocessor, frames[0], model)
+
+    frames = [frames[i % len(frames)] for i in range(count)]
+    print(json.dumps({
+        "frame_shape": list(frames[0].shape),
+        "detect_width": preprocessor.detect_width,
+        "model": args.model,
+        "legacy": measure(lambda frame: legacy_path(frame, model), frames),
+        "preprocessed": measure(lambda frame: preprocessed_path(preprocessor, frame, model), frames),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Час запуску API_server.py, WEB-interface.py і (з --plates) license plate recognition.py.
+
+Для кожної програми вимірюється:
+- import_s - імпорт модуля без брокера (порт, на якому ніхто не слухає): до
+  відкладеного запуску імпорт падав на connect(), тепер лише описує сервіс;
+- http_s - від запуску процесу до першої HTTP-відповіді;
+- ready_s - до 200 на /readyz (брокер підключено, база і моделі готові),
+  а також готовність окремих компонентів зі звіту /readyz.
+
+З --baseline <коміт> ті самі вимірювання виконуються для дерева цього коміту
+(git archive у тимчасовий каталог), щоб порівняти з попереднім запуском;
+у старому дереві /readyz немає, тому там http_s - перша відповідь маршруту API.
+
+Запуск: python3 benchmarks/bench_startup.py [--runs 5] [--baseline HEAD~1] [--plates каталог]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from synthetic_db import ROOT_DIR, create_database
+from fake_mqtt import FakeBroker
+from loadgen import free_port
+
+# Програма -> (змінна середовища порту, маршрут, що відповідає і в старому дереві)
+SERVICES = {
+    "API_server.py": ("API_PORT", "/api/mqtt/stats"),
+    "WEB-interface.py": ("WEB_PORT", "/events/stats"),
+}
+RECOGNIZER = "license plate recognition.py"
+
+IMPORT_SNIPPET = """
+import importlib.util, sys, time
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("service", sys.argv[1])
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+print(time.perf_counter() - started)
+"""
+
+
+def measure_import(root, script, env, timeout):
+    """Час імпорту модуля (с) або рядок з причиною невдачі."""
+    started = time.perf_counter()
+    try:
+        completed = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET, os.path.join(root, script)],
+                                   cwd=root, env=env, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return f"hang > {timeout:.0f} s"
+    if completed.returncode != 0:
+        return "error: " + (completed.stderr.strip().splitlines() or ["?"])[-1]
+    return round(time.perf_counter() - started, 3)
+
+
+def fetch(url):
+    """(код, тіло) або None, якщо сервер ще не слухає."""
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except (urllib.error.URLError, OSError):
+        return None
+
+
+def measure_run(root, script, env, base_url, probe_path, timeout):
+    """Запускає програму і опитує HTTP кожні 10 мс до готовності."""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(root, script)], cwd=root, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = {"http_s": None, "ready_s": None}
+    has_readyz = True
+    try:
+        while time.perf_counter() - started < timeout and process.poll() is None:
+            if result["http_s"] is None:
+                response = fetch(base_url + (probe_path or "/healthz"))
+                if response is not None and (probe_path or response[0] == 200):
+                    result["http_s"] = round(time.perf_counter() - started, 3)
+                    has_readyz = fetch(base_url + "/readyz")[0] != 404
+            if result["http_s"] is not None:
+                if not has_readyz:
+                    break
+                status, body = fetch(base_url + "/readyz")
+                if status == 200:
+                    result["ready_s"] = round(time.perf_counter() - started, 3)
+                    result["components"] = {name: component.get("ready_after_s")
+                                            for name, component in json.loads(body)["components"].items()}
+                    break
+            time.sleep(0.01)
+        if process.poll() is not None:
+            result["exit_code"] = process.returncode
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return result
+
+
+def median(values):
+    values = [value for value in values if isinstance(value, (int, float))]
+    return round(statistics.median(values), 3) if values else None
+
+
+def bench_tree(root, label, args, workdir, broker):
+    db_path = os.path.join(workdir, f"{label}.db")
+    create_database(db_path, journal_mode="WAL")
+    base_env = {**os.environ, "SMART_HOME_DB": db_path, "MQTT_BROKER": broker.host, "MQTT_PORT": str(broker.port),
+                "PYTHONDONTWRITEBYTECODE": "1"}
+    results = {}
+    services = dict(SERVICES)
+    if args.plates:
+        services[RECOGNIZER] = ("METRICS_PORT", "/metrics")
+    for script, (port_variable, legacy_path) in services.items():
+        if not os.path.exists(os.path.join(root, script)):
+            continue
+        no_broker_env = {**base_env, "MQTT_PORT": str(free_port()), port_variable: str(free_port())}
+        runs = []
+        for _ in range(args.runs):
+            port = free_port()
+            env = {**base_env, port_variable: str(port)}
+            if script == RECOGNIZER:
+                env.update(CAMERA_SOURCE=f"dir:{os.path.abspath(args.plates)}", CAR_MODEL=args.car_model,
+                           PLATE_MODEL=args.plate_model, PIPELINE_REPORT_INTERVAL="0")
+            probe_path = legacy_path if label == "baseline" else None
+            runs.append(measure_run(root, script, env, f"http://127.0.0.1:{port}", probe_path, args.timeout))
+        results[script] = {
+            "import_s": measure_import(root, script, no_broker_env, args.timeout),
+            "http_s": median([run["http_s"] for run in runs]),
+            "ready_s": median([run["ready_s"] for run in runs]),
+            "components": runs[-1].get("components"),
+            "failed_runs": sum(1 for run in runs if run["http_s"] is None),
+        }
+        print(f"{label:9s} {script:30s} import {results[script]['import_s']}  http {results[script]['http_s']} s  "
+              f"ready {results[script]['ready_s']} s", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--baseline", metavar="REV", help="коміт для порівняння (наприклад, HEAD~1)")
+    parser.add_argument("--plates", metavar="DIR", help="каталог кадрів: вимірювати також розпізнавач")
+    parser.add_argument("--car-model", default=os.path.join(ROOT_DIR, "yolov8n.pt"))
+    parser.add_argument("--plate-model", default=os.path.join(ROOT_DIR, "license_plate_detector.pt"))
+    args = parser.parse_args()
+
+    broker = FakeBroker().start()
+    with tempfile.TemporaryDirectory() as workdir:
+        report = {"current": bench_tree(ROOT_DIR, "current", args, workdir, broker)}
+        if args.baseline:
+            baseline_root = os.path.join(workdir, "baseline")
+            os.makedirs(baseline_root)
+            archive = subprocess.run(["git", "archive", args.baseline], cwd=ROOT_DIR, capture_output=True, check=True)
+            subprocess.run(["tar", "-x", "-C", baseline_root], input=archive.stdout, check=True)
+            report["baseline"] = {"rev": args.baseline, **bench_tree(baseline_root, "baseline", args, workdir, broker)}
+    broker.stop()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Локальний MQTT-брокер і простий клієнт для бенчмарків (підмножина MQTT 3.1.1).
+
+Брокер слухає TCP на 127.0.0.1, тож API_server.py, WEB-interface.py і
+license plate recognition.py підключаються до нього звичайним paho з
+MQTT_BROKER=127.0.0.1 і MQTT_PORT=<порт>. Підтримуються CONNECT (облікові дані
+не перевіряються), SUBSCRIBE/UNSUBSCRIBE з + і #, PUBLISH з QoS 0 і 1, retained,
+PINGREQ і DISCONNECT. QoS 1 не гарантує повторної доставки - для
+вимірювань затримки в локальній мережі цього досить.
+
+Окремий запуск: python3 benchmarks/fake_mqtt.py [порт]
+"""
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mqtt_router import topic_matches
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def encode_length(length):
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+
+def encode_string(text):
+    data = text.encode("utf-8")
+    return struct.pack("!H", len(data)) + data
+
+
+def packet(packet_type, flags, body):
+    return bytes([packet_type << 4 | flags]) + encode_length(len(body)) + body
+
+
+def publish_packet(topic, payload, qos=0, retain=False, packet_id=1):
+    body = encode_string(topic)
+    if qos:
+        body += struct.pack("!H", packet_id)
+    return packet(PUBLISH, qos << 1 | int(retain), body + payload)
+
+
+def read_packet(stream):
+    """(тип, прапорці, тіло) або None, якщо з'єднання закрито."""
+    header = stream.read(1)
+    if not header:
+        return None
+    length, shift = 0, 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            return None
+        length |= (byte[0] & 0x7F) << shift
+        shift += 7
+        if not byte[0] & 0x80:
+            break
+    body = stream.read(length) if length else b""
+    if len(body) < length:
+        return None
+    return header[0] >> 4, header[0] & 0x0F, body
+
+
+def parse_publish(flags, body):
+    """(топік, вміст, qos, retain, packet_id)."""
+    topic_length = struct.unpack("!H", body[:2])[0]
+    topic = body[2:2 + topic_length].decode("utf-8")
+    offset = 2 + topic_length
+    qos = (flags >> 1) & 0x03
+    packet_id = None
+    if qos:
+        packet_id = struct.unpack("!H", body[offset:offset + 2])[0]
+        offset += 2
+    return topic, body[offset:], qos, bool(flags & 0x01), packet_id
+
+
+class _Session:
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+        self.next_packet_id = 0
+
+    def send(self, data):
+        with self.lock:
+            self.sock.sendall(data)
+
+    def deliver(self, topic, payload, qos, retain=False):
+        with self.lock:
+            self.next_packet_id = self.next_packet_id % 65535 + 1
+            self.sock.sendall(publish_packet(topic, payload, qos, retain, self.next_packet_id))
+
+
+class FakeBroker:
+    """MQTT-брокер у фоновому потоці; port=0 - вільний порт (див. .port)."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        broker = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                broker._serve(self.connection, self.rfile)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address
+        self._lock = threading.Lock()
+        self._sessions = set()
+        self._retained = {}
+        self.counters = {"connections": 0, "published": 0, "delivered": 0}
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-mqtt", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            try:
+                session.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "clients": len(self._sessions), "retained": len(self._retained)}
+
+    def _serve(self, sock, stream):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        session = _Session(sock)
+        with self._lock:
+            self._sessions.add(session)
+            self.counters["connections"] += 1
+        try:
+            while True:
+                received = read_packet(stream)
+                if received is None:
+                    break
+                packet_type, flags, body = received
+                if packet_type == CONNECT:
+                    session.send(packet(CONNACK, 0, b"\x00\x00"))
+                elif packet_type == PUBLISH:
+                    topic, payload, qos, retain, packet_id = parse_publish(flags, body)
+                    if qos == 1:
+                        session.send(packet(PUBACK, 0, struct.pack("!H", packet_id)))
+                    self._route(topic, payload, qos, retain)
+                elif packet_type == SUBSCRIBE:
+                    self._subscribe(session, body)
+                elif packet_type == UNSUBSCRIBE:
+                    offset = 2
+                    while offset < len(body):
+                        length = struct.unpack("!H", body[offset:offset + 2])[0]
+                        session.subscriptions.pop(body[offset + 2:offset + 2 + length].decode("utf-8"), None)
+                        offset += 2 + length
+                    session.send(packet(UNSUBACK, 0, body[:2]))
+                elif packet_type == PINGREQ:
+                    session.send(packet(PINGRESP, 0, b""))
+                elif packet_type == DISCONNECT:
+                    break
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._sessions.discard(session)
+
+    def _subscribe(self, session, body):
+        granted = bytearray()
+        filters = []
+        offset = 2
+        while offset < len(body):
+            length = struct.unpack("!H", body[offset:offset + 2])[0]
+            topic_filter = body[offset + 2:offset + 2 + length].decode("utf-8")
+            qos = min(body[offset + 2 + length] & 0x03, 1)
+            offset += 3 + length
+            session.subscriptions[topic_filter] = qos
+            filters.append((topic_filter, qos))
+            granted.append(qos)
+        session.send(packet(SUBACK, 0, body[:2] + bytes(granted)))
+        with self._lock:
+            retained = list(self._retained.items())
+        for topic_filter, qos in filters:
+            for topic, payload in retained:
+                if topic_matches(topic_filter, topic):
+                    session.deliver(topic, payload, qos, retain=True)
+
+    def _route(self, topic, payload, qos, retain):
+        with self._lock:
+            self.counters["published"] += 1
+            if retain:
+                if payload:
+                    self._retained[topic] = payload
+                else:
+                    self._retained.pop(topic, None)
+            sessions = list(self._sessions)
+        for session in sessions:
+            granted = [sub_qos for topic_filter, sub_qos in list(session.subscriptions.items())
+                       if topic_matches(topic_filter, topic)]
+            if not granted:
+                continue
+            try:
+                session.deliver(topic, payload, min(qos, max(granted)))
+            except OSError:
+                continue
+            with self._lock:
+                self.counters["delivered"] += 1
+
+
+class MqttTestClient:
+    """Мінімальний клієнт для генераторів навантаження: publish/subscribe і
+    on_message(topic, payload: bytes) у потоці читання."""
+
+    def __init__(self, host, port, client_id="bench", on_message=None):
+        self.on_message = on_message
+        self._sock = socket.create_connection((host, port))
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._stream = self._sock.makefile("rb")
+        self._lock = threading.Lock()
+        self._packet_id = 0
+        self._subscribed = threading.Event()
+        body = encode_string("MQTT") + bytes([4, 0x02]) + struct.pack("!H", 60) + encode_string(client_id)
+        self._sock.sendall(packet(CONNECT, 0, body))
+        received = read_packet(self._stream)
+        if received is None or received[0] != CONNACK:
+            raise ConnectionError("MQTT broker did not accept the connection")
+        self._thread = threading.Thread(target=self._run, name=f"mqtt-{client_id}", daemon=True)
+        self._thread.start()
+
+    def _next_id(self):
+        self._packet_id = self._packet_id % 65535 + 1
+        return self._packet_id
+
+    def subscribe(self, topic_filter, qos=0, timeout=5.0):
+        self._subscribed.clear()
+        with self._lock:
+            body = struct.pack("!H", self._next_id()) + encode_string(topic_filter) + bytes([qos])
+            self._sock.sendall(packet(SUBSCRIBE, 0x02, body))
+        self._subscribed.wait(timeout)
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        with self._lock:
+            self._sock.sendall(publish_packet(topic, payload, qos, retain, self._next_id()))
+
+    def close(self):
+        try:
+            with self._lock:
+                self._sock.sendall(packet(DISCONNECT, 0, b""))
+            self._sock.close()
+        except OSError:
+            pass
+
+    def _run(self):
+        try:
+            while True:
+                received = read_packet(self._stream)
+                if received is None:
+                    return
+                packet_type, flags, body = received
+                if packet_type == PUBLISH:
+                    topic, payload, qos, _, packet_id = parse_publish(flags, body)
+                    if qos == 1:
+                        with self._lock:
+                            self._sock.sendall(packet(PUBACK, 0, struct.pack("!H", packet_id)))
+                    if self.on_message is not None:
+                        self.on_message(topic, payload)
+                elif packet_type == SUBACK:
+                    self._subscribed.set()
+        except (OSError, ValueError):
+            return
+
+
+def main():
+    broker = FakeBroker(port=int(sys.argv[1]) if len(sys.argv) > 1 else 1883).start()
+    print(f"[INFO] Fake MQTT broker on {broker.host}:{broker.port}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        broker.stop()
+
+
+if __name__ == "__main__":
+    main()
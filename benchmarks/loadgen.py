@@ -0,0 +1,464 @@
+"""Навантажувальний стенд: API_server.py (і за бажанням WEB-interface.py та
+license plate recognition.py) на локальному брокері fake_mqtt, тимчасовій
+синтетичній базі та каталозі тестових зображень.
+
+Компоненти запускаються окремими процесами з MQTT_BROKER=127.0.0.1,
+MQTT_PORT, SMART_HOME_DB, API_PORT і WEB_PORT. Генератори навантаження:
+- ESP32 кімнат: N пристроїв публікують телеметрію home/room/<кімната>; окрема
+  "зондова" кімната отримує значення-мітки, а потік читання бази фіксує,
+  коли мітка з'явилась у базі (затримка запису телеметрії);
+- контролери дверей: пачки прикладань карток і введень пароля в протоколі
+  door_protocol (JSON з request_id), затримка до відповіді на
+  home/door/<device_id>/response;
+- REST: запити до API (історія, журнал доступу, перевірка картки) і, з
+  --web, до WEB-інтерфейсу (/api/state; шаблон index.html у репозиторії
+  відсутній, тому / не запитується).
+З --plates розпізнавач читає кадри з каталогу (CAMERA_SOURCE=dir:...), а звіт
+конвеєра (час етапів) береться з PIPELINE_STATS_PATH.
+
+Результат - JSON (stdout або --output) з комітом, налаштуваннями,
+пропускною здатністю і p50/p95/p99 для порівняння між комітами.
+
+Запуск: python3 benchmarks/loadgen.py [--seconds 30] [--rooms 20] [--web] [--plates каталог] [--output файл]
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from synthetic_db import ROOT_DIR, create_database, room_payload
+from fake_mqtt import FakeBroker, MqttTestClient
+
+from db import ROOM_TABLES
+
+PROBE_ROOM = "bathroom"
+PROBE_MARKER_BASE = 1000.0
+
+
+def summarize(samples, seconds=None):
+    """Кількість, пропускна здатність і перцентилі затримки (мс)."""
+    ordered = sorted(samples)
+    result = {"count": len(ordered)}
+    if seconds:
+        result["per_sec"] = round(len(ordered) / seconds, 2)
+    if ordered:
+        for name, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            result[name] = round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 2)
+        result["max_ms"] = round(ordered[-1] * 1000, 2)
+    return result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Component:
+    """Компонент проєкту в окремому процесі з журналом у робочому каталозі."""
+
+    def __init__(self, name, script, workdir, env):
+        self.name = name
+        self.log_path = os.path.join(workdir, f"{name}.log")
+        self._log = open(self.log_path, "w", encoding="utf-8")
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT_DIR, script)],
+            cwd=workdir, env={**os.environ, **env, "PYTHONUNBUFFERED": "1"},
+            stdout=self._log, stderr=subprocess.STDOUT,
+        )
+
+    def check_alive(self):
+        if self.process.poll() is not None:
+            raise RuntimeError(f"{self.name} exited with code {self.process.returncode}:\n{self.log_tail()}")
+
+    def log_tail(self, lines=20):
+        with open(self.log_path, encoding="utf-8", errors="replace") as log_file:
+            return "".join(log_file.readlines()[-lines:])
+
+    def stop(self, timeout=10.0):
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._log.close()
+
+
+def wait_http(component, url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        component.check_alive()
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                response.read()
+                return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    raise RuntimeError(f"{component.name} did not answer {url} in {timeout:.0f} s:\n{component.log_tail()}")
+
+
+def http_request(url, data=None, timeout=10):
+    """GET або, з data, POST JSON; повертає тіло відповіді."""
+    body = json.dumps(data).encode("utf-8") if data is not None else None
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"} if body else {})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def http_json(url, data=None, timeout=10):
+    return json.loads(http_request(url, data, timeout) or b"null")
+
+
+def run_paced(stop, rate, action):
+    """Викликає action(index) з частотою rate/с, доганяючи пропущені виклики."""
+    started = time.perf_counter()
+    index = 0
+    while not stop.is_set():
+        due = int((time.perf_counter() - started) * rate)
+        while index < due and not stop.is_set():
+            action(index)
+            index += 1
+        time.sleep(0.001)
+    return index
+
+
+class TelemetryLoad:
+    """N пристроїв ESP32, що публікують телеметрію кімнат (крім зондової)."""
+
+    def __init__(self, client, devices, hz, rng):
+        self.client = client
+        self.devices = devices
+        self.hz = hz
+        self.rng = rng
+        self.rooms = [room for room in ROOM_TABLES if room != PROBE_ROOM] or list(ROOM_TABLES)
+        self.sent = 0
+
+    def run(self, stop):
+        def publish(index):
+            room = self.rooms[index % self.devices % len(self.rooms)]
+            self.client.publish(f"home/room/{room}", json.dumps(room_payload(room, self.rng)))
+        self.sent = run_paced(stop, self.devices * self.hz, publish)
+
+
+class TelemetryProbe:
+    """Мітки в зондовій кімнаті та потік, що чекає їх появи в базі."""
+
+    def __init__(self, client, db_path, hz):
+        self.client = client
+        self.db_path = db_path
+        self.hz = hz
+        self.sent_at = {}
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def run(self, stop):
+        def publish(index):
+            marker = PROBE_MARKER_BASE + index
+            payload = {**room_payload(PROBE_ROOM), "temp": marker}
+            with self._lock:
+                self.sent_at[marker] = time.perf_counter()
+            self.client.publish(f"home/room/{PROBE_ROOM}", json.dumps(payload))
+        run_paced(stop, self.hz, publish)
+
+    def watch(self, stop):
+        conn = sqlite3.connect(self.db_path)
+        sql = f"SELECT current_temperature FROM {ROOM_TABLES[PROBE_ROOM]} WHERE id = 2"
+        while not stop.is_set():
+            try:
+                value = conn.execute(sql).fetchone()[0] or 0
+            except sqlite3.OperationalError:
+                value = 0
+            now = time.perf_counter()
+            with self._lock:
+                # Пакетний запис залишає лише останнє значення кімнати, тому
+                # мітка вважається записаною, щойно в базі з'явилась вона або новіша
+                for marker in [marker for marker in self.sent_at if marker <= value]:
+                    self.latencies.append(now - self.sent_at.pop(marker))
+            time.sleep(0.001)
+        conn.close()
+
+    def pending(self):
+        with self._lock:
+            return len(self.sent_at)
+
+
+class DoorLoad:
+    """Пачки запитів контролерів дверей; затримка до відповіді з тим самим request_id."""
+
+    def __init__(self, client, doors, burst_size, burst_interval, cards, rng):
+        self.client = client
+        self.doors = doors
+        self.burst_size = burst_size
+        self.burst_interval = burst_interval
+        self.cards = cards
+        self.rng = rng
+        self.sent_at = {}
+        self.latencies = {"rfid": [], "password": []}
+        self.verdicts = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def on_message(self, topic, payload):
+        if not topic.endswith("/response"):
+            return
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            sent = self.sent_at.pop(data.get("request_id"), None)
+            if sent is None:
+                return
+            kind, started = sent
+            self.latencies[kind].append(now - started)
+            self.verdicts[data.get("status")] = self.verdicts.get(data.get("status"), 0) + 1
+
+    def _request(self):
+        self._next_id += 1
+        request_id = f"r{self._next_id}"
+        device_id = f"bench-door-{self._next_id % self.doors}"
+        if self.rng.random() < 0.15:
+            kind, topic = "password", "home/door/check_password"
+            body = {"password": self.rng.choice(["1234", "0000"])}
+        else:
+            kind, topic = "rfid", "home/door/check_rfid"
+            card = self.rng.choice(self.cards) if self.rng.random() < 0.8 else f"{self.rng.getrandbits(32):08X}"
+            body = {"card_id": card}
+        with self._lock:
+            self.sent_at[request_id] = (kind, time.perf_counter())
+        self.client.publish(topic, json.dumps({"device_id": device_id, "request_id": request_id, **body}))
+
+    def run(self, stop):
+        while not stop.wait(self.rng.uniform(0.5, 1.5) * self.burst_interval):
+            for _ in range(self.burst_size):
+                self._request()
+                time.sleep(self.rng.uniform(0.0, 0.01))
+
+    def pending(self):
+        with self._lock:
+            return len(self.sent_at)
+
+
+class RestLoad:
+    """Запити до REST API з частотою rps, розподілені між кількома потоками."""
+
+    def __init__(self, endpoints, rps, threads, rng):
+        self.endpoints = endpoints
+        self.rps = rps
+        self.threads = threads
+        self.rng = rng
+        self.latencies = {name: [] for name, _, _ in endpoints}
+        self.errors = {name: 0 for name, _, _ in endpoints}
+        self._lock = threading.Lock()
+
+    def _call(self, index):
+        name, url, data = self.endpoints[index % len(self.endpoints)]
+        started = time.perf_counter()
+        try:
+            http_request(url, data() if callable(data) else data)
+            failed = False
+        except (urllib.error.URLError, OSError):
+            failed = True
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            if failed:
+                self.errors[name] += 1
+            else:
+                self.latencies[name].append(elapsed)
+
+    def run(self, stop):
+        workers = [
+            threading.Thread(target=run_paced, args=(stop, self.rps / self.threads,
+                                                     lambda index, offset=offset: self._call(index * self.threads + offset)),
+                             daemon=True)
+            for offset in range(self.threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+
+def collect_plates(component, stats_path, gate_opens):
+    """Зупиняє розпізнавач (SIGINT - конвеєр записує підсумковий звіт) і читає звіт."""
+    crashed = component.process.poll() is not None
+    component.stop()
+    result = {"gate_open_commands": gate_opens[0], "pipeline": None}
+    if os.path.exists(stats_path):
+        with open(stats_path, encoding="utf-8") as stats_file:
+            result["pipeline"] = json.load(stats_file)
+    if crashed:
+        result["error"] = component.log_tail()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--rooms", type=int, default=20, help="кількість ESP32, що публікують телеметрію")
+    parser.add_argument("--telemetry-hz", type=float, default=2, help="повідомлень/с від кожного ESP32")
+    parser.add_argument("--probe-hz", type=float, default=10, help="частота міток затримки запису телеметрії")
+    parser.add_argument("--doors", type=int, default=4)
+    parser.add_argument("--burst-size", type=int, default=10)
+    parser.add_argument("--burst-interval", type=float, default=2.0)
+    parser.add_argument("--rest-rps", type=float, default=20)
+    parser.add_argument("--rest-threads", type=int, default=4)
+    parser.add_argument("--cards", type=int, default=200)
+    parser.add_argument("--vehicles", type=int, default=200)
+    parser.add_argument("--web", action="store_true", help="запустити також WEB-interface.py")
+    parser.add_argument("--plates", metavar="DIR", help="каталог кадрів для license plate recognition.py")
+    parser.add_argument("--car-model", default=os.path.join(ROOT_DIR, "yolov8n.pt"))
+    parser.add_argument("--plate-model", default=os.path.join(ROOT_DIR, "license_plate_detector.pt"))
+    parser.add_argument("--output", help="файл для JSON-результату (інакше stdout)")
+    args = parser.parse_args()
+    rng = random.Random(11)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "smart_home.db")
+        create_database(db_path, cards=args.cards, vehicles=args.vehicles, journal_mode="WAL")
+        with sqlite3.connect(db_path) as conn:
+            cards = [row[0] for row in conn.execute("SELECT card_id FROM rfid_cards WHERE type = 'user'")]
+        broker = FakeBroker().start()
+        env = {
+            "SMART_HOME_DB": db_path,
+            "MQTT_BROKER": broker.host,
+            "MQTT_PORT": str(broker.port),
+            "API_PORT": str(free_port()),
+            "WEB_PORT": str(free_port()),
+        }
+        api_url = f"http://127.0.0.1:{env['API_PORT']}"
+        web_url = f"http://127.0.0.1:{env['WEB_PORT']}"
+        components = []
+        result = {"commit": git_commit(), "config": vars(args)}
+        try:
+            api = Component("api_server", "API_server.py", workdir, env)
+            components.append(api)
+            wait_http(api, f"{api_url}/readyz")
+            if args.web:
+                web = Component("web_interface", "WEB-interface.py", workdir, env)
+                components.append(web)
+                wait_http(web, f"{web_url}/readyz")
+            plates_component = None
+            gate_opens = [0]
+
+            def count_gate_command(topic, payload):
+                gate_opens[0] += 1
+            if args.plates:
+                stats_path = os.path.join(workdir, "pipeline_stats.json")
+                plates_component = Component("plate_recognition", "license plate recognition.py", workdir, {
+                    **env,
+                    "CAMERA_SOURCE": f"dir:{os.path.abspath(args.plates)}",
+                    "CAR_MODEL": args.car_model,
+                    "PLATE_MODEL": args.plate_model,
+                    "ARTIFACT_POLICY": "none",
+                    "ARTIFACT_SAMPLE_RATE": "0",
+                    "PIPELINE_STATS_PATH": stats_path,
+                    "PIPELINE_REPORT_INTERVAL": "5",
+                })
+                components.append(plates_component)
+
+            telemetry_client = MqttTestClient(broker.host, broker.port, "bench-esp32")
+            probe_client = MqttTestClient(broker.host, broker.port, "bench-probe")
+            door_load = DoorLoad(None, args.doors, args.burst_size, args.burst_interval, cards, rng)
+            door_client = MqttTestClient(broker.host, broker.port, "bench-doors", door_load.on_message)
+            door_client.subscribe("home/door/+/response", qos=1)
+            door_load.client = door_client
+            gate_client = MqttTestClient(broker.host, broker.port, "bench-gate", count_gate_command)
+            gate_client.subscribe("home/gate")
+
+            telemetry = TelemetryLoad(telemetry_client, args.rooms, args.telemetry_hz, random.Random(12))
+            probe = TelemetryProbe(probe_client, db_path, args.probe_hz)
+            endpoints = [
+                ("history", f"{api_url}/api/kitchen/history?resolution=1m", None),
+                ("access_events", f"{api_url}/api/access-events?limit=50", None),
+                ("check_rfid", f"{api_url}/api/check-rfid", lambda: {"card_id": rng.choice(cards)}),
+            ]
+            if args.web:
+                endpoints += [("web_state", f"{web_url}/api/state", None)]
+            rest = RestLoad(endpoints, args.rest_rps, args.rest_threads, rng)
+
+            stop = threading.Event()
+            watch_stop = threading.Event()
+            watcher = threading.Thread(target=probe.watch, args=(watch_stop,), daemon=True)
+            watcher.start()
+            loads = [threading.Thread(target=load.run, args=(stop,), daemon=True)
+                     for load in (telemetry, probe, door_load, rest)]
+            started = time.perf_counter()
+            for load in loads:
+                load.start()
+            stop.wait(args.seconds)
+            stop.set()
+            for load in loads:
+                load.join()
+            elapsed = time.perf_counter() - started
+            # Очікування відповідей і записів, що ще в дорозі (не довше 10 с)
+            deadline = time.perf_counter() + 10
+            while (door_load.pending() or probe.pending()) and time.perf_counter() < deadline:
+                time.sleep(0.05)
+            watch_stop.set()
+            watcher.join()
+            for component in components:
+                if component is not plates_component:
+                    component.check_alive()
+
+            result.update({
+                "seconds": round(elapsed, 2),
+                "door": {
+                    **{kind: summarize(samples, elapsed) for kind, samples in door_load.latencies.items()},
+                    "unanswered": door_load.pending(),
+                    "verdicts": door_load.verdicts,
+                },
+                "telemetry": {
+                    "published_per_sec": round(telemetry.sent / elapsed, 2),
+                    "ingest": summarize(probe.latencies),
+                    "probe_not_written": probe.pending(),
+                },
+                "rest": {name: {**summarize(samples, elapsed), "errors": rest.errors[name]}
+                         for name, samples in rest.latencies.items()},
+                "server": {
+                    "mqtt": http_json(f"{api_url}/api/mqtt/stats"),
+                    "telemetry_writer": http_json(f"{api_url}/api/telemetry/stats"),
+                    "access_cache": http_json(f"{api_url}/api/access-cache/stats"),
+                },
+                "broker": broker.stats(),
+            })
+            if plates_component is not None:
+                result["plates"] = collect_plates(plates_component, stats_path, gate_opens)
+            for client in (telemetry_client, probe_client, door_client, gate_client):
+                client.close()
+        finally:
+            for component in components:
+                component.stop()
+            broker.stop()
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
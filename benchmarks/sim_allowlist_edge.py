@@ -0,0 +1,198 @@
+"""Симулятор контролерів дверей для allowlist_sync: перевірка коректності
+синхронізації та обсягу переданих даних.
+
+Синтетична база змінюється випадково (додавання і видалення карток, зміна
+пароля), AllowlistPublisher публікує дельти у фальшивий брокер, який
+губить частину повідомлень і на час "вимикає" окремі контролери. Після кожного
+кроку список карток і хеш пароля кожного контролера порівнюються з базою.
+Для порівняння рахується обсяг, якби після кожної зміни розсилався повний знімок.
+
+Запуск: python3 benchmarks/sim_allowlist_edge.py [--changes 500] [--clients 5] [--cards 200] [--loss 0.05]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+from synthetic_db import create_database
+
+import allowlist_sync
+import db
+
+
+class FakeBroker:
+    """Брокер у процесі: retained-повідомлення, підписки та втрата дельт."""
+
+    def __init__(self, loss, rng):
+        self.loss = loss
+        self.rng = rng
+        self.retained = {}
+        self.subscribers = {}
+
+    def subscribe(self, topic, client):
+        self.subscribers.setdefault(topic, set()).add(client)
+        if topic in self.retained:
+            client.on_message(topic, self.retained[topic])
+
+    def unsubscribe(self, topic, client):
+        self.subscribers.get(topic, set()).discard(client)
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        if retain:
+            self.retained[topic] = payload
+        for client in list(self.subscribers.get(topic, ())):
+            if client.online and self.rng.random() >= self.loss:
+                client.on_message(topic, payload)
+
+
+class EdgeClient:
+    """Модель контролера дверей: локальна перевірка та звірка версій."""
+
+    def __init__(self, name, broker, rest):
+        self.name = name
+        self.broker = broker
+        self.rest = rest
+        self.online = True
+        self.version = None
+        self.cards = {}
+        self.password = None
+        self.bytes_received = 0
+        self.rest_calls = 0
+
+    def boot(self):
+        self.broker.subscribe(allowlist_sync.SNAPSHOT_TOPIC, self)
+        self.broker.subscribe(allowlist_sync.DELTA_TOPIC, self)
+
+    def _apply_snapshot(self, snapshot):
+        self.version = snapshot["version"]
+        self.cards = dict(snapshot["cards"])
+        self.password = snapshot["password"]
+
+    def _apply_delta(self, delta):
+        for card_id in delta["remove"]:
+            self.cards.pop(card_id, None)
+        self.cards.update(delta["add"])
+        if "password" in delta:
+            self.password = delta["password"]
+        self.version = delta["to"]
+
+    def reconcile(self):
+        """Звірка через REST: diff від власної версії."""
+        payload = self.rest(self.version)
+        self.bytes_received += len(payload)
+        self.rest_calls += 1
+        data = json.loads(payload)
+        if data.get("full"):
+            self._apply_snapshot(data)
+        else:
+            self._apply_delta(data)
+
+    def on_message(self, topic, payload):
+        self.bytes_received += len(payload)
+        data = json.loads(payload)
+        if topic == allowlist_sync.SNAPSHOT_TOPIC:
+            self._apply_snapshot(data)
+            # Далі лише дельти: знімок більше не потрібен
+            self.broker.unsubscribe(allowlist_sync.SNAPSHOT_TOPIC, self)
+        elif data["to"] <= (self.version or 0):
+            return
+        elif data["from"] == self.version:
+            self._apply_delta(data)
+        else:
+            self.reconcile()
+
+    def set_online(self, online):
+        if online and not self.online:
+            self.online = True
+            # Після відновлення зв'язку контролер звіряється сам
+            self.reconcile()
+        self.online = online
+
+    def check_card(self, card_id, key):
+        return allowlist_sync.card_hash(key, card_id) in self.cards
+
+    def check_password(self, password):
+        return (self.password is not None and
+                allowlist_sync.hash_password(password, self.password["salt"], self.password["iterations"])
+                == self.password["pbkdf2_sha256"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--changes", type=int, default=500, help="змін списку доступу")
+    parser.add_argument("--clients", type=int, default=5, help="контролерів дверей")
+    parser.add_argument("--cards", type=int, default=200, help="карток у початковій базі")
+    parser.add_argument("--loss", type=float, default=0.05, help="частка втрачених MQTT-повідомлень")
+    args = parser.parse_args()
+    changes, client_count, card_count, loss = args.changes, args.clients, args.cards, args.loss
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "smart_home.db")
+        create_database(path, cards=card_count, journal_mode="WAL")
+        server = db.open_connection(path)
+        writer = db.open_connection(path)
+        allowlist_sync.ensure_schema(server)
+
+        broker = FakeBroker(loss, rng)
+        publisher = allowlist_sync.AllowlistPublisher(broker)
+        publisher.sync(server)
+
+        def rest(since):
+            return json.dumps(allowlist_sync.diff_since(server, since), separators=(",", ":"))
+
+        clients = [EdgeClient(f"door{i}", broker, rest) for i in range(client_count)]
+        for client in clients:
+            client.boot()
+
+        full_snapshot_bytes = 0
+        mismatches = 0
+        next_card = 0
+        for step in range(changes):
+            action = rng.random()
+            if action < 0.6:
+                writer.execute("INSERT INTO rfid_cards (card_id, type) VALUES (?, 'user')", (f"NEW{next_card:06d}",))
+                next_card += 1
+            elif action < 0.95:
+                writer.execute("DELETE FROM rfid_cards WHERE id = (SELECT id FROM rfid_cards WHERE type = 'user' "
+                               "ORDER BY random() LIMIT 1)")
+            else:
+                writer.execute("UPDATE door_passwords SET password = ? WHERE id = 1", (f"{rng.randint(0, 9999):04d}",))
+            writer.commit()
+
+            for client in clients:
+                if rng.random() < 0.02:
+                    client.set_online(not client.online)
+            publisher.sync(server)
+            snapshot = allowlist_sync.build_snapshot(server)
+            full_snapshot_bytes += len(json.dumps(snapshot, separators=(",", ":"))) * client_count
+
+            for client in clients:
+                if client.online and (client.cards != snapshot["cards"] or client.password != snapshot["password"]):
+                    mismatches += 1
+
+        for client in clients:
+            client.set_online(True)
+        final = allowlist_sync.build_snapshot(server)
+        password = writer.execute("SELECT password FROM door_passwords WHERE id = 1").fetchone()["password"]
+        converged = all(client.cards == final["cards"] and client.check_password(password) for client in clients)
+        server.really_close()
+        writer.really_close()
+
+    print(json.dumps({
+        "changes": changes,
+        "clients": client_count,
+        "cards": card_count,
+        "message_loss": loss,
+        "converged": converged,
+        "online_mismatches": mismatches,
+        "rest_calls": sum(client.rest_calls for client in clients),
+        "bytes_delta_sync": sum(client.bytes_received for client in clients),
+        "bytes_full_snapshot_each_change": full_snapshot_bytes,
+        "publisher": publisher.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
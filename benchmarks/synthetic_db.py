@@ -0,0 +1,104 @@
+"""Синтетична база smart_home.db для бенчмарків (та сама схема, що й на Raspberry Pi)."""
+import os
+import random
+import sqlite3
+import string
+import sys
+
+# Бенчмарки запускаються з каталогу benchmarks/, а модулі проєкту лежать у корені
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+ROOM_TABLES = ["Corridor", "Kitchen", "LivingRoom", "Bedroom", "Bathroom"]
+
+ROOM_EXTRA_COLUMNS = {
+    "Kitchen": "fire_detected TEXT DEFAULT 'no',",
+    "Bedroom": "curtains_state TEXT DEFAULT 'closed',",
+    "Bathroom": "fan_state TEXT DEFAULT 'off',",
+}
+
+UA_PLATE_LETTERS = "ABCEHIKMOPTX"
+
+
+def random_plate(rng=random):
+    """Номер у форматі АА1234ВВ (латинські літери, що збігаються з кириличними)."""
+    letters = lambda: "".join(rng.choice(UA_PLATE_LETTERS) for _ in range(2))
+    return f"{letters()}{rng.randint(0, 9999):04d}{letters()}"
+
+
+def create_database(path, cards=50, vehicles=200, journal_mode=None, seed=1):
+    """Створює базу зі схемою smart_home.db та тестовими даними."""
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    if journal_mode:
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    for table in ROOM_TABLES:
+        conn.execute(f"""
+            CREATE TABLE {table} (
+                id INTEGER PRIMARY KEY,
+                desired_temperature REAL,
+                current_temperature REAL,
+                light_state TEXT,
+                {ROOM_EXTRA_COLUMNS.get(table, "")}
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute(f"INSERT INTO {table} (id, desired_temperature) VALUES (1, 22.0)")
+        conn.execute(f"INSERT INTO {table} (id, current_temperature, light_state) VALUES (2, 21.5, 'off')")
+    conn.execute("""
+        CREATE TABLE door_passwords (
+            id INTEGER PRIMARY KEY,
+            password TEXT NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("INSERT INTO door_passwords (id, password) VALUES (1, '1234')")
+    conn.execute("""
+        CREATE TABLE rfid_cards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            card_id TEXT UNIQUE NOT NULL,
+            type TEXT NOT NULL
+        )
+    """)
+    conn.execute("INSERT INTO rfid_cards (card_id, type) VALUES ('MASTER01', 'master')")
+    conn.executemany(
+        "INSERT INTO rfid_cards (card_id, type) VALUES (?, 'user')",
+        [(f"{i:08X}",) for i in range(cards)],
+    )
+    conn.execute("""
+        CREATE TABLE allowed_vehicles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            plate_number TEXT UNIQUE NOT NULL,
+            owner_name TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    plates = set()
+    while len(plates) < vehicles:
+        plates.add(random_plate(rng))
+    conn.executemany(
+        "INSERT INTO allowed_vehicles (plate_number, owner_name) VALUES (?, ?)",
+        [(plate, "".join(rng.choice(string.ascii_letters) for _ in range(8))) for plate in sorted(plates)],
+    )
+    conn.commit()
+    conn.close()
+    return sorted(plates)
+
+
+def room_payload(room, rng=random):
+    """JSON-повідомлення, яке публікує ESP32 кімнати."""
+    data = {
+        "light": rng.choice(["on", "off"]),
+        "temp": round(rng.uniform(18, 26), 2),
+        "desired_temp": 22.0,
+    }
+    if room == "kitchen":
+        data["fire"] = "no"
+    elif room == "bedroom":
+        data["curtains"] = rng.choice(["open", "closed"])
+    elif room == "bathroom":
+        data["fan"] = rng.choice(["on", "off"])
+    return data
@@ -0,0 +1,201 @@
+import os
+import subprocess
+import time
+
+import cv2
+
+import log
+
+# Розширення файлів для джерела-каталогу зображень
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FrameSource:
+    """Базове джерело кадрів: read() повертає кадр BGR (numpy) або None.
+
+    Якщо задано fps, read() не віддає кадри частіше, ніж потрібно.
+    """
+
+    def __init__(self, fps=None):
+        self.fps = fps
+        self._next_frame_at = 0.0
+        self.frames = 0
+
+    def _pace(self):
+        if self.fps:
+            delay = self._next_frame_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_frame_at = time.monotonic() + 1.0 / self.fps
+
+    def read(self):
+        self._pace()
+        frame = self._read()
+        if frame is not None:
+            self.frames += 1
+        return frame
+
+    def _read(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LibcameraStillSource(FrameSource):
+    """Резервний режим: окремий процес libcamera-still на кожен кадр (як раніше)."""
+
+    def __init__(self, output_path="current_image.jpg", width=3280, height=2464, fps=None):
+        super().__init__(fps)
+        self.output_path = output_path
+        self.width = width
+        self.height = height
+
+    def _read(self):
+        try:
+            subprocess.run(
+                ["libcamera-still", "-o", self.output_path, "-n",
+                 "--width", str(self.width), "--height", str(self.height)],
+                check=True,
+            )
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            log.error("Помилка виконання команди libcamera-still: %s", e)
+            return None
+        return cv2.imread(self.output_path)
+
+
+class Picamera2Source(FrameSource):
+    """Безперервний потік libcamera через picamera2: камера відкривається один раз,
+    кадри передаються в пам'яті без кодування JPEG."""
+
+    def __init__(self, width=1640, height=1232, fps=10):
+        super().__init__(None)
+        from picamera2 import Picamera2
+
+        self.camera = Picamera2()
+        config = self.camera.create_video_configuration(
+            main={"size": (width, height), "format": "RGB888"},
+            controls={"FrameRate": fps},
+            buffer_count=2,
+        )
+        self.camera.configure(config)
+        self.camera.start()
+
+    def _read(self):
+        # Формат RGB888 у picamera2 має порядок байтів BGR, як очікує OpenCV
+        return self.camera.capture_array("main")
+
+    def close(self):
+        self.camera.stop()
+        self.camera.close()
+
+
+class VideoCaptureSource(FrameSource):
+    """Потік через cv2.VideoCapture: пристрій V4L2, конвеєр GStreamer (libcamerasrc)
+    або відеофайл для тестування. Після помилки читання джерело перевідкривається."""
+
+    def __init__(self, uri, width=None, height=None, fps=None, backend=cv2.CAP_ANY, loop=False):
+        super().__init__(fps if isinstance(uri, str) and os.path.isfile(uri) else None)
+        self.uri = uri
+        self.width = width
+        self.height = height
+        self.capture_fps = fps
+        self.backend = backend
+        self.loop = loop
+        self.capture = None
+        self._open()
+
+    def _open(self):
+        self.capture = cv2.VideoCapture(self.uri, self.backend)
+        if self.width and self.height:
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.capture_fps:
+            self.capture.set(cv2.CAP_PROP_FPS, self.capture_fps)
+        # Мінімальний буфер драйвера, щоб не обробляти застарілі кадри
+        self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if not self.capture.isOpened():
+            log.error("Не вдалося відкрити джерело відео: %s", self.uri)
+
+    def _read(self):
+        ok, frame = self.capture.read()
+        if ok:
+            return frame
+        if self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read()
+            if ok:
+                return frame
+        self.capture.release()
+        time.sleep(0.5)
+        self._open()
+        return None
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Замінник камери для тестів: по черзі повертає зображення з каталогу."""
+
+    def __init__(self, directory, fps=None, loop=True):
+        super().__init__(fps)
+        self.paths = sorted(
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.loop = loop
+        self.index = 0
+
+    def _read(self):
+        if self.index >= len(self.paths):
+            if not self.loop or not self.paths:
+                return None
+            self.index = 0
+        path = self.paths[self.index]
+        self.index += 1
+        return cv2.imread(path)
+
+
+def gstreamer_libcamera_pipeline(width, height, fps):
+    return (
+        f"libcamerasrc ! video/x-raw,width={width},height={height},framerate={int(fps)}/1 "
+        "! videoconvert ! video/x-raw,format=BGR ! appsink drop=true max-buffers=1"
+    )
+
+
+def open_source(spec, width=1640, height=1232, fps=10, still_path="current_image.jpg"):
+    """Створює джерело кадрів за рядком конфігурації:
+
+    - "libcamera" - потік picamera2 (або GStreamer libcamerasrc, якщо picamera2 немає;
+      якщо жоден потік не відкрився - libcamera-still);
+    - "libcamera-still" - окремий знімок на кожен кадр (резервний режим);
+    - "v4l2:/dev/video0" - камера V4L2;
+    - "video:шлях.mp4" - відеофайл (по колу);
+    - "dir:шлях" - каталог зображень (по колу).
+    """
+    if spec == "libcamera-still":
+        return LibcameraStillSource(still_path, width, height, fps=fps)
+    if spec == "libcamera":
+        try:
+            return Picamera2Source(width, height, fps)
+        except ImportError:
+            source = VideoCaptureSource(gstreamer_libcamera_pipeline(width, height, fps), backend=cv2.CAP_GSTREAMER)
+            if source.capture.isOpened():
+                return source
+            source.close()
+        except Exception as e:
+            log.error("Не вдалося запустити потік камери: %s", e)
+        log.info("Використовується резервний режим libcamera-still.")
+        return LibcameraStillSource(still_path, width, height, fps=fps)
+    kind, _, target = spec.partition(":")
+    if kind == "v4l2":
+        device = int(target) if target.isdigit() else target
+        return VideoCaptureSource(device, width, height, fps, backend=cv2.CAP_V4L2)
+    if kind == "video":
+        return VideoCaptureSource(target, fps=fps, loop=True)
+    if kind == "dir":
+        return ImageDirectorySource(target, fps=fps)
+    raise ValueError(f"Невідоме джерело кадрів: {spec}")
@@ -0,0 +1,64 @@
+import json
+import os
+
+from motion_gate import parse_roi
+
+# Поля опису камери: назва, джерело кадрів (camera.open_source), топік
+# команди воротам, область руху "x1,y1,x2,y2" та параметри потоку
+CAMERA_FIELDS = ("name", "camera", "topic", "roi", "width", "height", "fps")
+
+
+class GateCamera:
+    """Камера на в'їзді та ворота, яким вона надсилає команду відкриття."""
+
+    def __init__(self, name, camera, topic, roi=None, width=1640, height=1232, fps=5.0):
+        self.name = name
+        self.camera = camera
+        self.topic = topic
+        self.roi = parse_roi(roi) if isinstance(roi, str) else roi
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = float(fps)
+
+    def describe(self):
+        return {"camera": self.camera, "topic": self.topic, "roi": self.roi,
+                "width": self.width, "height": self.height, "fps": self.fps}
+
+
+def parse_cameras(entries, defaults):
+    """Список GateCamera з JSON-списку словників; відсутні поля беруться з defaults.
+
+    Назва за замовчуванням - gate<номер>; назви мають бути унікальними, бо за
+    ними розрізняються черги, треки та статистика камер.
+    """
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("Конфігурація камер має бути непорожнім списком")
+    cameras = []
+    for index, entry in enumerate(entries, 1):
+        unknown = set(entry) - set(CAMERA_FIELDS)
+        if unknown:
+            raise ValueError(f"Невідомі поля камери {index}: {', '.join(sorted(unknown))}")
+        options = {**defaults, "name": f"gate{index}", **entry}
+        if not options.get("camera") or not options.get("topic"):
+            raise ValueError(f"Камера {options['name']}: потрібні camera і topic")
+        cameras.append(GateCamera(**options))
+    names = [camera.name for camera in cameras]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Назви камер повторюються: {names}")
+    return cameras
+
+
+def load_cameras(value, defaults):
+    """Камери з CAMERAS_CONFIG: шлях до JSON-файлу або сам JSON-список.
+
+    Без конфігурації - одна камера з defaults (попередні змінні CAMERA_SOURCE,
+    MOTION_ROI тощо), тобто поведінка з однією камерою не змінюється.
+    """
+    if not value:
+        return [GateCamera(**{"name": "gate", **defaults})]
+    if value.lstrip().startswith("["):
+        entries = json.loads(value)
+    else:
+        with open(os.path.expanduser(value), encoding="utf-8") as config_file:
+            entries = json.load(config_file)
+    return parse_cameras(entries, defaults)
@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+
+# Конфігурація бази даних
+DB_PATH = os.environ.get("SMART_HOME_DB", "/home/marko/SQliteDB_Stuff/smart_home.db")
+BUSY_TIMEOUT_MS = 5000
+CACHED_STATEMENTS = 256
+POOL_SIZE = 8
+
+# Таблиці кімнат: назва кімнати в MQTT-топіку -> таблиця в базі даних
+ROOM_TABLES = {
+    "corridor": "Corridor",
+    "kitchen": "Kitchen",
+    "livingroom": "LivingRoom",
+    "bedroom": "Bedroom",
+    "bathroom": "Bathroom",
+}
+
+
+# Час викликів SQLite за операцією (для execute - до першого рядка результату)
+_call_seconds = metrics.histogram("db_call_seconds", "SQLite call time by operation", ("op",))
+
+
+class PooledConnection(sqlite3.Connection):
+    """З'єднання з пулу: close() повертає його в пул замість закриття."""
+
+    def execute(self, *args):
+        started = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            _call_seconds.observe(time.perf_counter() - started, op="execute")
+
+    def executemany(self, *args):
+        started = time.perf_counter()
+        try:
+            return super().executemany(*args)
+        finally:
+            _call_seconds.observe(time.perf_counter() - started, op="executemany")
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _call_seconds.observe(time.perf_counter() - started, op="commit")
+
+    def close(self):
+        if not _release(self):
+            super().close()
+
+    def really_close(self):
+        super().close()
+
+
+_pool_lock = threading.Lock()
+_idle = []
+_local = threading.local()
+
+
+def _configure(conn):
+    """Налаштування WAL-журналу та тайм-ауту очікування блокування."""
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+def open_connection(path=None):
+    """Нове налаштоване з'єднання поза пулом (для потоків з власним з'єднанням)."""
+    conn = sqlite3.connect(
+        path or DB_PATH,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=CACHED_STATEMENTS,
+        check_same_thread=False,
+        factory=PooledConnection,
+    )
+    return _configure(conn)
+
+
+def _release(conn):
+    """Повертає з'єднання в пул; False, якщо пул заповнений.
+
+    Вкладений close() лише зменшує глибину: транзакцію зовнішнього виклику
+    не чіпаємо. Незавершена транзакція відкочується, коли з'єднання
+    звільняє останній власник.
+    """
+    if getattr(_local, "conn", None) is conn:
+        _local.depth -= 1
+        if _local.depth > 0:
+            return True
+        _local.conn = None
+    if conn.in_transaction:
+        conn.rollback()
+    with _pool_lock:
+        if len(_idle) < POOL_SIZE:
+            _idle.append(conn)
+            return True
+    return False
+
+
+def get_db_connection():
+    """Повертає з'єднання з пулу, закріплене за поточним потоком.
+
+    Повторний виклик у тому ж потоці до close() повертає те саме з'єднання,
+    тому вкладені виклики не відкривають нових файлових дескрипторів.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _local.depth += 1
+        return conn
+    with _pool_lock:
+        conn = _idle.pop() if _idle else None
+    if conn is None:
+        conn = open_connection()
+    _local.conn = conn
+    _local.depth = 1
+    return conn
+
+
+def close_all():
+    """Закриває всі вільні з'єднання пулу (під час завершення роботи)."""
+    with _pool_lock:
+        idle = list(_idle)
+        _idle.clear()
+    for conn in idle:
+        conn.really_close()
@@ -0,0 +1,346 @@
+import argparse
+import os
+import threading
+
+import numpy as np
+
+import log
+from batch_detect import detect_batch, letterbox, unletterbox
+
+# Бекенди детекторів YOLO: ONNX Runtime, OpenVINO або PyTorch (ultralytics).
+# Експорт і квантування INT8 (калібрування на каталозі зразків кадрів):
+#   python3 detector.py yolov8n.pt --format onnx --imgsz 640 [--int8 каталог]
+#   python3 detector.py license_plate_detector.pt --format openvino --imgsz 320 [--int8 каталог]
+
+# auto - експортована модель поруч з .pt (спершу ONNX, далі OpenVINO), якщо є її рушій;
+# onnx, openvino - лише цей бекенд; torch - попередній шлях ultralytics
+DETECTOR_BACKEND = os.environ.get("DETECTOR_BACKEND", "auto")
+# Квантована INT8-версія експортованої моделі (<назва>_int8.onnx, <назва>_int8_openvino_model)
+DETECTOR_INT8 = os.environ.get("DETECTOR_INT8") == "1"
+# Потоки інференсу; за замовчуванням - кількість ядер
+DETECTOR_THREADS = int(os.environ.get("DETECTOR_THREADS", os.cpu_count() or 1))
+# Пороги постобробки, як у ultralytics predict
+CONF_THRESHOLD = float(os.environ.get("DETECTOR_CONF", 0.25))
+IOU_THRESHOLD = float(os.environ.get("DETECTOR_IOU", 0.7))
+MAX_DETECTIONS = 300
+# Розмір входу, якщо експортована модель має динамічну форму
+DEFAULT_INPUT_SIZE = 640
+
+
+def exported_path(model_path, backend, int8=False):
+    """Шлях експортованої моделі поруч з .pt за іменуванням ultralytics export."""
+    stem = os.path.splitext(model_path)[0] + ("_int8" if int8 else "")
+    return f"{stem}.onnx" if backend == "onnx" else f"{stem}_openvino_model"
+
+
+def _runtime_available(backend):
+    try:
+        if backend == "onnx":
+            import onnxruntime  # noqa: F401
+        else:
+            import openvino  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def resolve(model_path, backend=DETECTOR_BACKEND, int8=DETECTOR_INT8):
+    """(бекенд, шлях) для моделі; без експортованого файлу чи рушія - torch з .pt."""
+    if model_path.endswith(".onnx"):
+        return "onnx", model_path
+    if os.path.isdir(model_path) or model_path.endswith(".xml"):
+        return "openvino", model_path
+    if backend == "torch":
+        return "torch", model_path
+    candidates = ["onnx", "openvino"] if backend == "auto" else [backend]
+    for candidate in candidates:
+        path = exported_path(model_path, candidate, int8)
+        if os.path.exists(path) and _runtime_available(candidate):
+            return candidate, path
+    if backend != "auto":
+        log.warning("Експортована модель %s (%s) недоступна, використовується PyTorch",
+                    exported_path(model_path, backend, int8), backend)
+    return "torch", model_path
+
+
+def nms(boxes, scores, iou_threshold):
+    """Жадібне придушення немаксимумів; повертає індекси рамок за спаданням впевненості."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        width = (np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest])).clip(0)
+        height = (np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest])).clip(0)
+        intersection = width * height
+        iou = intersection / (areas[best] + areas[rest] - intersection + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def postprocess(output, conf_threshold=CONF_THRESHOLD, iou_threshold=IOU_THRESHOLD, max_detections=MAX_DETECTIONS):
+    """Вихід YOLOv8 (4 + класи, кандидати) для одного зображення -> [x1, y1, x2, y2, conf, cls]."""
+    predictions = output.T
+    class_scores = predictions[:, 4:]
+    classes = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(classes)), classes]
+    mask = scores > conf_threshold
+    if not mask.any():
+        return np.empty((0, 6), dtype=np.float32)
+    centers, classes, scores = predictions[mask, :4], classes[mask], scores[mask]
+    boxes = np.empty_like(centers)
+    boxes[:, :2] = centers[:, :2] - centers[:, 2:] / 2
+    boxes[:, 2:] = centers[:, :2] + centers[:, 2:] / 2
+    # Зсув на клас: рамки різних класів не придушують одна одну
+    offsets = classes[:, None].astype(np.float32) * 7680
+    keep = nms(boxes + offsets, scores, iou_threshold)[:max_detections]
+    return np.column_stack([boxes[keep], scores[keep], classes[keep]]).astype(np.float32)
+
+
+def to_input(canvases):
+    """Кадри letterbox (BGR, uint8) -> тензор NCHW RGB float32 0..1."""
+    batch = np.ascontiguousarray(np.stack(canvases)[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32)
+    batch *= 1 / 255.0
+    return batch
+
+
+class Detector:
+    """Спільний інтерфейс бекендів.
+
+    detect(images) повертає для кожного зображення масив рамок
+    [x1, y1, x2, y2, conf, cls] у координатах цього зображення - як
+    results[0].boxes.data у ultralytics. Експортовані моделі мають фіксований
+    квадратний вхід (letterbox як у batch_detect), постобробка (поріг
+    впевненості, NMS за класами) повторює налаштування ultralytics predict.
+    """
+
+    backend = None
+
+    def __init__(self, path, input_size, threads):
+        self.path = path
+        self.input_size = input_size
+        self.threads = threads
+
+    def detect(self, images):
+        raise NotImplementedError
+
+    def describe(self):
+        return {"backend": self.backend, "path": self.path, "input_size": self.input_size, "threads": self.threads}
+
+
+class TorchDetector(Detector):
+    """Попередній шлях: модель ultralytics YOLO у PyTorch.
+
+    Без input_size кожне зображення передається моделі як є (власний
+    letterbox ultralytics), з input_size - пакетом через batch_detect.
+    Предиктор ultralytics не розрахований на одночасні виклики, тому
+    воркери, що ділять модель, викликають її по черзі.
+    """
+
+    backend = "torch"
+
+    def __init__(self, path, input_size=None, threads=DETECTOR_THREADS):
+        super().__init__(path, input_size, threads)
+        import torch
+        from ultralytics import YOLO
+
+        torch.set_num_threads(threads)
+        self.model = YOLO(path)
+        self._lock = threading.Lock()
+
+    def detect(self, images):
+        with self._lock:
+            if self.input_size:
+                return detect_batch(self.model, images, self.input_size)
+            detections = []
+            for image in images:
+                result = self.model(image)[0]
+                detections.append(result.boxes.data.cpu().numpy() if result.boxes is not None
+                                  else np.empty((0, 6), dtype=np.float32))
+            return detections
+
+
+class ExportedDetector(Detector):
+    """Експортована модель з фіксованим квадратним входом; _infer(batch) -> (N, 4 + класи, кандидати)."""
+
+    # Модель з фіксованим пакетом 1 викликається для кожного зображення окремо
+    fixed_batch = True
+
+    def detect(self, images):
+        if not images:
+            return []
+        boxed = [letterbox(image, self.input_size) for image in images]
+        canvases = [canvas for canvas, _, _ in boxed]
+        if self.fixed_batch:
+            outputs = [self._infer(to_input([canvas]))[0] for canvas in canvases]
+        else:
+            outputs = self._infer(to_input(canvases))
+        return [
+            unletterbox(postprocess(output), scale, pad, image.shape[:2])
+            for image, (_, scale, pad), output in zip(images, boxed, outputs)
+        ]
+
+    def _infer(self, batch):
+        raise NotImplementedError
+
+
+def _static_size(shape, default):
+    """Розмір входу з форми [N, 3, H, W]; динамічні виміри - рядки або None."""
+    height, width = shape[2], shape[3]
+    if isinstance(height, int) and isinstance(width, int) and height > 0:
+        if height != width:
+            raise ValueError(f"Очікується квадратний вхід моделі, отримано {height}x{width}")
+        return height
+    return default or DEFAULT_INPUT_SIZE
+
+
+class OnnxDetector(ExportedDetector):
+    backend = "onnx"
+
+    def __init__(self, path, input_size=None, threads=DETECTOR_THREADS):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.fixed_batch = model_input.shape[0] == 1
+        super().__init__(path, _static_size(model_input.shape, input_size), threads)
+
+    def _infer(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoDetector(ExportedDetector):
+    backend = "openvino"
+
+    def __init__(self, path, input_size=None, threads=DETECTOR_THREADS):
+        import openvino as ov
+
+        if os.path.isdir(path):
+            path = next(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".xml"))
+        core = ov.Core()
+        self.compiled = core.compile_model(core.read_model(path), "CPU", {
+            "INFERENCE_NUM_THREADS": threads,
+            "PERFORMANCE_HINT": "LATENCY",
+        })
+        shape = self.compiled.input(0).get_partial_shape()
+        dims = [dim.get_length() if dim.is_static else None for dim in shape]
+        self.fixed_batch = dims[0] == 1
+        # Запит інференсу на потік: запити OpenVINO не можна ділити між потоками
+        self._local = threading.local()
+        super().__init__(path, _static_size(dims, input_size), threads)
+
+    def _infer(self, batch):
+        request = getattr(self._local, "request", None)
+        if request is None:
+            request = self._local.request = self.compiled.create_infer_request()
+        request.infer({0: batch})
+        return request.get_output_tensor(0).data.copy()
+
+
+BACKENDS = {"torch": TorchDetector, "onnx": OnnxDetector, "openvino": OpenVinoDetector}
+
+
+def load_detector(model_path, input_size=None, backend=DETECTOR_BACKEND, int8=DETECTOR_INT8, threads=DETECTOR_THREADS):
+    """Детектор для моделі з урахуванням DETECTOR_BACKEND, DETECTOR_INT8 і DETECTOR_THREADS.
+
+    input_size - розмір входу для PyTorch (None - як у ultralytics) і для
+    експортованих моделей з динамічною формою; статична форма моделі має пріоритет.
+    """
+    backend, path = resolve(model_path, backend, int8)
+    detector = BACKENDS[backend](path, input_size, threads)
+    log.info("Детектор %s: %s", os.path.basename(model_path), detector.describe())
+    return detector
+
+
+def calibration_images(directory, size, limit=300):
+    """Кадри letterbox з каталогу для калібрування INT8."""
+    import cv2
+
+    names = sorted(name for name in os.listdir(directory)
+                   if name.lower().endswith((".jpg", ".jpeg", ".png", ".bmp")))[:limit]
+    if not names:
+        raise SystemExit(f"У каталозі {directory} немає зображень для калібрування")
+    for name in names:
+        image = cv2.imread(os.path.join(directory, name))
+        if image is not None:
+            yield letterbox(image, size)[0]
+
+
+def quantize_onnx(model_path, output_path, calibration_dir, size):
+    """Статичне квантування INT8 (QDQ, ваги по каналах) з калібруванням на зразках."""
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    import onnxruntime as ort
+
+    # Спрощення графа і виведення форм перед квантуванням (рекомендація ONNX Runtime);
+    # вхід експортованої моделі статичний, тож символьне виведення форм не потрібне
+    prepared_path = f"{output_path}.prepared.onnx"
+    quant_pre_process(model_path, prepared_path, skip_symbolic_shape=True)
+    input_name = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.images = calibration_images(calibration_dir, size)
+
+        def get_next(self):
+            canvas = next(self.images, None)
+            return None if canvas is None else {input_name: to_input([canvas])}
+
+    try:
+        quantize_static(prepared_path, output_path, Reader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    finally:
+        os.remove(prepared_path)
+    return output_path
+
+
+def quantize_openvino(model_dir, output_dir, calibration_dir, size):
+    """Квантування INT8 через NNCF з калібруванням на зразках."""
+    import nncf
+    import openvino as ov
+
+    xml_name = next(name for name in sorted(os.listdir(model_dir)) if name.endswith(".xml"))
+    model = ov.Core().read_model(os.path.join(model_dir, xml_name))
+    dataset = nncf.Dataset(list(calibration_images(calibration_dir, size)), lambda canvas: to_input([canvas]))
+    quantized = nncf.quantize(model, dataset, preset=nncf.QuantizationPreset.MIXED)
+    os.makedirs(output_dir, exist_ok=True)
+    ov.save_model(quantized, os.path.join(output_dir, xml_name))
+    return output_dir
+
+
+def export(model_path, backend, size, calibration_dir=None):
+    """Експорт .pt у ONNX або OpenVINO з фіксованим входом size x size і, за бажанням, INT8."""
+    from ultralytics import YOLO
+
+    exported = YOLO(model_path).export(format=backend, imgsz=size, dynamic=False)
+    log.info("Експортовано %s", exported)
+    if calibration_dir:
+        output_path = exported_path(model_path, backend, int8=True)
+        quantize = quantize_onnx if backend == "onnx" else quantize_openvino
+        exported = quantize(str(exported), output_path, calibration_dir, size)
+        log.info("Квантовано INT8: %s", exported)
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Експорт моделі YOLO для detector.py")
+    parser.add_argument("model", help="модель .pt")
+    parser.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument("--imgsz", type=int, default=DEFAULT_INPUT_SIZE, help="фіксований розмір входу")
+    parser.add_argument("--int8", metavar="DIR", help="каталог кадрів для калібрування INT8")
+    args = parser.parse_args()
+    export(args.model, args.format, args.imgsz, args.int8)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import log
+
+# Попередній протокол: відповідь рядком без ідентифікатора на спільний топік
+LEGACY_RESPONSE_TOPIC = "home/door/response"
+# Протокол з кореляцією: відповідь JSON на топік пристрою
+RESPONSE_TOPIC = "home/door/{device_id}/response"
+# Скільки секунд пам'ятати відповідь для повторних запитів з тим самим request_id
+RETRY_TTL = 120.0
+MAX_REMEMBERED = 4096
+# Символи, неприпустимі в device_id: він стає рівнем топіка відповіді
+DEVICE_ID_FORBIDDEN = ("/", "+", "#", "\0")
+
+
+class InvalidDeviceId(ValueError):
+    """device_id не можна використати в топіку відповіді."""
+
+
+def validate_device_id(device_id):
+    """None або коректний device_id; порожній або з "/", "+", "#" - InvalidDeviceId."""
+    if device_id is None:
+        return None
+    if not device_id or any(char in device_id for char in DEVICE_ID_FORBIDDEN):
+        raise InvalidDeviceId(f"Invalid device_id: {device_id!r}")
+    return device_id
+
+
+class DoorRequest:
+    """Запит авторизації. Без device_id і request_id - запит попереднього протоколу.
+
+    Некоректний device_id (див. validate_device_id) - InvalidDeviceId.
+    """
+
+    def __init__(self, value, device_id=None, request_id=None):
+        self.value = value
+        self.device_id = validate_device_id(device_id)
+        self.request_id = request_id
+
+    @property
+    def correlated(self):
+        return self.device_id is not None and self.request_id is not None
+
+    @property
+    def response_topic(self):
+        return RESPONSE_TOPIC.format(device_id=self.device_id) if self.correlated else LEGACY_RESPONSE_TOPIC
+
+    def response_payload(self, status):
+        if not self.correlated:
+            return status
+        return json.dumps({"request_id": self.request_id, "status": status})
+
+
+def parse_request(payload, field):
+    """Розбирає вміст MQTT-запиту дверей.
+
+    Новий формат - JSON {"device_id": ..., "request_id": ..., <field>: ...};
+    будь-що інше вважається значенням попереднього формату (пароль або id картки).
+    """
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return DoorRequest(payload)
+    if not isinstance(data, dict) or field not in data:
+        return DoorRequest(payload)
+    device_id, request_id = data.get("device_id"), data.get("request_id")
+    return DoorRequest(
+        str(data[field]),
+        str(device_id) if device_id is not None else None,
+        str(request_id) if request_id is not None else None,
+    )
+
+
+def _value_digest(value):
+    """Відбиток переданого значення (пароль, id картки): у пам'яті не тримаються відкриті значення."""
+    return hashlib.sha256(str(value).encode("utf-8")).digest()
+
+
+class _Entry:
+    def __init__(self, created, digest):
+        self.created = created
+        self.digest = digest
+        self.ready = threading.Event()
+        self.status = None
+
+
+class DoorResponder:
+    """Виконує рішення щодо запиту дверей і публікує відповідь.
+
+    Для запитів з кореляцією відповідь іде на home/door/<device_id>/response
+    разом з request_id, а результат запам'ятовується на RETRY_TTL секунд:
+    повтор того самого запиту (наприклад, після втраченої відповіді) отримує
+    ту саму відповідь без повторного виконання (add_user не відповість
+    DUPLICATE_CARD на власну першу спробу). Повтором вважається запит того
+    самого пристрою, каналу і request_id з тим самим значенням: якщо
+    request_id використано знову для іншої картки чи пароля (наприклад,
+    лічильник пристрою скинувся після перезавантаження), запит виконується
+    заново. Одночасні повтори чекають на перше виконання. Запити попереднього
+    протоколу обробляються як раніше.
+
+    on_decision(channel, door_request, status, seconds) викликається після
+    кожного виконаного рішення (повтори з пам'яті не враховуються).
+    """
+
+    def __init__(self, mqtt_client, ttl=RETRY_TTL, max_remembered=MAX_REMEMBERED, on_decision=None):
+        self.mqtt_client = mqtt_client
+        self.on_decision = on_decision
+        self.ttl = ttl
+        self.max_remembered = max_remembered
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.counters = {"legacy": 0, "correlated": 0, "retries": 0, "reused_ids": 0, "rejected": 0}
+
+    def _expire(self, now):
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_remembered and now - entry.created < self.ttl:
+                break
+            del self._entries[key]
+
+    def _decide(self, door_request, decide, channel):
+        started = time.perf_counter()
+        status = decide(door_request.value)
+        if self.on_decision is not None:
+            self.on_decision(channel, door_request, status, time.perf_counter() - started)
+        return status
+
+    def respond(self, door_request, decide, channel=None):
+        """decide(value) -> статус (VALID, INVALID, ADD_USER, ...). Повертає статус."""
+        if not door_request.correlated:
+            with self._lock:
+                self.counters["legacy"] += 1
+            status = self._decide(door_request, decide, channel)
+            self.mqtt_client.publish(door_request.response_topic, status)
+            return status
+
+        key = (door_request.device_id, channel, door_request.request_id)
+        digest = _value_digest(door_request.value)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry.digest != digest:
+                # Той самий request_id з іншим значенням - це новий запит, не повтор
+                self.counters["reused_ids"] += 1
+                del self._entries[key]
+                entry = None
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = _Entry(now, digest)
+                self.counters["correlated"] += 1
+            else:
+                self.counters["retries"] += 1
+        if owner:
+            try:
+                entry.status = self._decide(door_request, decide, channel)
+            except Exception:
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                raise
+            finally:
+                entry.ready.set()
+        else:
+            entry.ready.wait(self.ttl)
+            if entry.status is None:
+                # Перша спроба завершилась помилкою - виконуємо запит ще раз
+                return self.respond(door_request, decide, channel)
+        self.mqtt_client.publish(door_request.response_topic, door_request.response_payload(entry.status), qos=1)
+        return entry.status
+
+    def handle_mqtt(self, payload, field, decide, channel=None):
+        """Запит з MQTT; з некоректним device_id відповісти нікуди - запит відкидається."""
+        try:
+            door_request = parse_request(payload, field)
+        except InvalidDeviceId as e:
+            with self._lock:
+                self.counters["rejected"] += 1
+            log.warning("Door request dropped: %s", e)
+            return None
+        return self.respond(door_request, decide, channel)
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "remembered": len(self._entries)}
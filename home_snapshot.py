@@ -0,0 +1,126 @@
+import hashlib
+import json
+import threading
+
+import db
+from access_cache import install_triggers, read_version
+
+# Додаткові поля кімнат (як у index() WEB-інтерфейсу)
+ROOM_EXTRA_FIELDS = {
+    "Kitchen": "fire_detected",
+    "Bedroom": "curtains_state",
+    "Bathroom": "fan_state",
+}
+
+# Стан усіх кімнат одним запитом: бажана температура з рядка id = 1,
+# поточний стан з рядка id = 2 (пошук за первинним ключем, без агрегатів)
+ROOMS_SQL = " UNION ALL ".join(
+    f"SELECT '{table}' AS room, d.desired_temperature AS desired_temperature, "
+    f"c.current_temperature AS current_temperature, c.light_state AS light_state, "
+    f"{'c.' + ROOM_EXTRA_FIELDS[table] if table in ROOM_EXTRA_FIELDS else 'NULL'} AS extra "
+    f"FROM (SELECT 1) LEFT JOIN {table} AS d ON d.id = 1 LEFT JOIN {table} AS c ON c.id = 2"
+    for table in db.ROOM_TABLES.values()
+)
+PASSWORD_SQL = "SELECT password FROM door_passwords WHERE id = 1"
+VEHICLES_SQL = "SELECT * FROM allowed_vehicles"
+
+
+def load_rooms(conn):
+    """Стан усіх кімнат ({таблиця: {поле: значення}}) одним запитом."""
+    rooms = {}
+    for row in conn.execute(ROOMS_SQL):
+        rooms[row["room"]] = {
+            "desired_temperature": row["desired_temperature"],
+            "current_temperature": row["current_temperature"],
+            "light_state": row["light_state"],
+        }
+        if row["room"] in ROOM_EXTRA_FIELDS:
+            rooms[row["room"]][ROOM_EXTRA_FIELDS[row["room"]]] = row["extra"]
+    return rooms
+
+
+def load_access(conn):
+    """Пароль дверей і список дозволених автомобілів."""
+    password = conn.execute(PASSWORD_SQL).fetchone()
+    vehicles = [dict(row) for row in conn.execute(VEHICLES_SQL)]
+    return dict(password) if password else None, vehicles
+
+
+def load_snapshot(conn):
+    """Повний стан для дашборда."""
+    password, vehicles = load_access(conn)
+    return {"rooms": load_rooms(conn), "password": password, "vehicles": vehicles}
+
+
+class HomeSnapshotCache:
+    """Кеш знімка стану будинку для index() і /api/state.
+
+    Як і access_cache, перед кожним зверненням перевіряє лише PRAGMA
+    data_version власного з'єднання: знімок перечитується тільки після
+    запису в базу з будь-якого іншого з'єднання (телеметрія, форми). Пароль
+    і автомобілі перечитуються лише при зміні access_cache_version (тригери
+    access_cache), тож запис телеметрії оновлює тільки стан кімнат. ETag
+    обчислюється від JSON без пароля, тому перечитаний, але незмінений стан
+    дає той самий ETag.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._snapshot = None
+        self._body = None
+        self._etag = None
+        self._access_version = None
+        self._vehicles_json = None
+        self.hits = 0
+        self.reloads = 0
+
+    def _reload(self):
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            access_version = read_version(conn)
+            reload_access = self._snapshot is None or access_version is None or access_version != self._access_version
+            if reload_access:
+                password, vehicles = load_access(conn)
+            else:
+                password, vehicles = self._snapshot["password"], self._snapshot["vehicles"]
+            snapshot = {"rooms": load_rooms(conn), "password": password, "vehicles": vehicles}
+        finally:
+            conn.rollback()
+        self._access_version = access_version
+        if reload_access:
+            self._vehicles_json = json.dumps(vehicles, ensure_ascii=False, sort_keys=True)
+        rooms_json = json.dumps(snapshot["rooms"], ensure_ascii=False, sort_keys=True)
+        body = f'{{"rooms": {rooms_json}, "vehicles": {self._vehicles_json}}}'
+        self._snapshot = snapshot
+        self._body = body
+        self._etag = hashlib.sha1(body.encode("utf-8")).hexdigest()[:20]
+        self.reloads += 1
+
+    def get(self):
+        """Повертає (знімок, JSON для /api/state, ETag)."""
+        with self._lock:
+            if self._conn is None:
+                self._conn = db.open_connection()
+                install_triggers(self._conn)
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version or self._snapshot is None:
+                self._data_version = data_version
+                self._reload()
+            else:
+                self.hits += 1
+            return self._snapshot, self._body, self._etag
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._data_version = None
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "reloads": self.reloads}
+
+
+home_snapshot = HomeSnapshotCache()
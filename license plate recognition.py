@@ -1,192 +1,293 @@
 import cv2
+import functools
 import os
 import time
 import re
+import threading
 from datetime import datetime
 import subprocess
-from ultralytics import YOLO
-import pytesseract
-import sqlite3
+import numpy as np
+from access_cache import access_cache
 import paho.mqtt.client as mqtt
-
-# Шлях до Tesseract OCR
-pytesseract.pytesseract.tesseract_cmd = "/usr/bin/tesseract"
-
-# Шлях до бази даних SQLite
-DB_PATH = "/home/marko/SQliteDB_Stuff/smart_home.db"
+from plate_pipeline import PlatePipeline
+from camera import open_source
+from camera_config import load_cameras
+from motion_gate import MotionGate, parse_roi
+from plate_tracker import PlateTracker
+from batch_detect import PLATE_INPUT_SIZE
+import detector
+from ocr_pool import OcrPool, prepare_plate_image
+from preprocess import FramePreprocessor
+from artifact_writer import ArtifactWriter, BufferedLogAppender, should_save
+from access_audit import AccessAudit
+import log
+import metrics
+import startup
 
 # MQTT налаштування
-MQTT_BROKER = "raspberrypi.local"
-MQTT_PORT = 1883
-MQTT_USER = "rpi"
-MQTT_PASSWORD = "rpi"
-MQTT_TOPIC_PUBLISH = "home/gate"
-
-# Завантаження моделей YOLO
-model_cars = YOLO('yolov8n.pt')  # Використовуйте легку модель
-model_plates = YOLO('license_plate_detector.pt')
+MQTT_BROKER = os.environ.get("MQTT_BROKER", "raspberrypi.local")
+MQTT_PORT = int(os.environ.get("MQTT_PORT", 1883))
+MQTT_USER = os.environ.get("MQTT_USER", "rpi")
+MQTT_PASSWORD = os.environ.get("MQTT_PASSWORD", "rpi")
+MQTT_TOPIC_PUBLISH = os.environ.get("MQTT_TOPIC_PUBLISH", "home/gate")
+
+# Джерело кадрів (див. camera.open_source): "libcamera" - безперервний потік,
+# "libcamera-still" - знімок на кожен кадр, "v4l2:/dev/video0", "video:файл", "dir:каталог"
+CAMERA_SOURCE = os.environ.get("CAMERA_SOURCE", "libcamera")
+# Роздільна здатність кадрів для виявлення та частота кадрів потоку
+CAMERA_WIDTH = int(os.environ.get("CAMERA_WIDTH", 1640))
+CAMERA_HEIGHT = int(os.environ.get("CAMERA_HEIGHT", 1232))
+CAMERA_FPS = float(os.environ.get("CAMERA_FPS", 5))
+
+# Фільтр руху перед YOLO: область перед воротами "x1,y1,x2,y2" (частки кадру),
+# поріг яскравості різниці та мінімальна частка змінених пікселів ROI
+MOTION_ROI = parse_roi(os.environ.get("MOTION_ROI", "0.0,0.3,1.0,1.0"))
+MOTION_THRESHOLD = int(os.environ.get("MOTION_THRESHOLD", 25))
+MOTION_MIN_FRACTION = float(os.environ.get("MOTION_MIN_FRACTION", 0.02))
+MOTION_HOLD_SECONDS = float(os.environ.get("MOTION_HOLD_SECONDS", 5))
+
+# Голосування OCR між кадрами: мінімум однакових прочитань і частка голосів
+# за кожен символ; повторне рішення для того самого номера - не частіше за cooldown
+TRACKER_MIN_VOTES = int(os.environ.get("TRACKER_MIN_VOTES", 3))
+TRACKER_CONFIDENCE = float(os.environ.get("TRACKER_CONFIDENCE", 0.6))
+GATE_COOLDOWN_SECONDS = float(os.environ.get("GATE_COOLDOWN_SECONDS", 30))
+
+# Кадр з камери та параметри конвеєра розпізнавання
+IMAGE_PATH = "current_image.jpg"
+PIPELINE_QUEUE_SIZE = 2
+PIPELINE_REPORT_INTERVAL = float(os.environ.get("PIPELINE_REPORT_INTERVAL", 30.0))
+# Якщо задано, звіт конвеєра також записується у цей файл як JSON (для бенчмарків)
+PIPELINE_STATS_PATH = os.environ.get("PIPELINE_STATS_PATH")
+
+# Кілька камер і воріт: CAMERAS_CONFIG - шлях до JSON-файлу або JSON-список
+# [{"name": "front", "camera": "v4l2:/dev/video0", "topic": "home/gate", "roi": "0,0.3,1,1"}, ...];
+# відсутні поля (width, height, fps, roi, topic) беруться з CAMERA_*, MOTION_ROI і
+# MQTT_TOPIC_PUBLISH. Без конфігурації - одна камера CAMERA_SOURCE, як раніше.
+# Моделі й OCR спільні: пам'ять залежить від кількості воркерів, а не камер.
+CAMERAS_CONFIG = os.environ.get("CAMERAS_CONFIG")
+gate_cameras = load_cameras(CAMERAS_CONFIG, {"camera": CAMERA_SOURCE, "topic": MQTT_TOPIC_PUBLISH,
+                                             "roi": MOTION_ROI, "width": CAMERA_WIDTH,
+                                             "height": CAMERA_HEIGHT, "fps": CAMERA_FPS})
+# Воркери етапів детекторів автомобілів і номерів, спільні для всіх камер
+DETECTOR_WORKERS = int(os.environ.get("DETECTOR_WORKERS", 1))
+
+# Ширина кадру для пошуку автомобілів; області вирізаються з повного кадру
+DETECT_WIDTH = int(os.environ.get("DETECT_WIDTH", 640))
+# Буфер зменшеного кадру FramePreprocessor розрахований на один потік, тому
+# кожен воркер етапу cars (DETECTOR_WORKERS) має власний екземпляр
+_preprocessors = threading.local()
+
+def frame_preprocessor():
+    preprocessor = getattr(_preprocessors, "instance", None)
+    if preprocessor is None:
+        preprocessor = _preprocessors.instance = FramePreprocessor(DETECT_WIDTH)
+    return preprocessor
+
+# Стан запуску (/healthz і /readyz на METRICS_PORT)
+readiness = startup.Readiness()
+
+# Моделі YOLO. Бекенд обирає detector.load_detector: експортована ONNX Runtime
+# або OpenVINO модель поруч з .pt (DETECTOR_BACKEND, DETECTOR_INT8,
+# DETECTOR_THREADS), інакше PyTorch. Рушії імпортуються лише під час
+# завантаження, яке після запуску йде у фоні паралельно з підключенням до
+# брокера; пробний прогін на порожньому кадрі виконується до першого кадру.
+CAR_MODEL = os.environ.get("CAR_MODEL", "yolov8n.pt")  # Використовуйте легку модель
+PLATE_MODEL = os.environ.get("PLATE_MODEL", "license_plate_detector.pt")
+
+def load_car_model():
+    car_detector = detector.load_detector(CAR_MODEL)
+    height = max(1, round(CAMERA_HEIGHT * min(1.0, DETECT_WIDTH / CAMERA_WIDTH)))
+    car_detector.detect([np.zeros((height, min(DETECT_WIDTH, CAMERA_WIDTH), 3), dtype=np.uint8)])
+    return car_detector
+
+def load_plate_model():
+    plate_detector = detector.load_detector(PLATE_MODEL, PLATE_INPUT_SIZE)
+    plate_detector.detect([np.zeros((PLATE_INPUT_SIZE, PLATE_INPUT_SIZE, 3), dtype=np.uint8)])
+    return plate_detector
+
+model_cars = startup.LazyResource("car_model", load_car_model, readiness)
+model_plates = startup.LazyResource("plate_model", load_plate_model, readiness)
+
+# Пул OCR: постійні рушії Tesseract (tesserocr) за кількістю ядер; запис
+# проміжного зображення plate_resized.jpg лише для налагодження
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", os.cpu_count() or 1))
+OCR_DEBUG_DUMPS = os.environ.get("OCR_DEBUG_DUMPS") == "1"
+ocr_pool = OcrPool(OCR_WORKERS)
+
+# Час моделей і OCR окремо від часу етапів конвеєра (/metrics на METRICS_PORT)
+recognition_seconds = metrics.histogram("recognition_stage_seconds", "Model and OCR call time", ("stage",))
 
 # Директорії для збереження результатів
 CAR_DIR = "processed_cars"
 PLATE_DIR = "processed_plates"
-os.makedirs(CAR_DIR, exist_ok=True)
-os.makedirs(PLATE_DIR, exist_ok=True)
 
-# Ініціалізація MQTT-клієнта
+# Вибірка вирізаних зображень: "all", "denied", "low_confidence", "none" (через кому);
+# решта результатів зберігається з імовірністю ARTIFACT_SAMPLE_RATE.
+# Файли записуються у фоновому потоці, найстаріші видаляються понад квоту.
+# Запис зображень і журнал номерів (потоки, сканування каталогів, відкриття
+# файлу) створюються в start_services, а не під час імпорту.
+ARTIFACT_POLICY = set(os.environ.get("ARTIFACT_POLICY", "denied,low_confidence").split(","))
+ARTIFACT_SAMPLE_RATE = float(os.environ.get("ARTIFACT_SAMPLE_RATE", 0.05))
+ARTIFACT_LOW_CONFIDENCE = float(os.environ.get("ARTIFACT_LOW_CONFIDENCE", 0.8))
+ARTIFACT_QUOTA_MB = float(os.environ.get("ARTIFACT_QUOTA_MB", 512))
+PLATES_LOG_PATH = "recognized_plates.txt"
+artifact_writer = None
+plates_log = None
+
+# Журнал рішень щодо в'їзду (access_events у спільній базі), пакетний запис у фоні
+access_audit = AccessAudit()
+
+# MQTT-клієнт (підключається у фоні під час запуску, див. start_services)
 mqtt_client = mqtt.Client()
 mqtt_client.username_pw_set(MQTT_USER, MQTT_PASSWORD)
-mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
-
-# Запуск асинхронного циклу MQTT
-mqtt_client.loop_start()
-
-def adjust_brightness(image, alpha=1.2, beta=50):
-    """Збільшує яскравість та контрастність зображення."""
-    adjusted = cv2.convertScaleAbs(image, alpha=alpha, beta=beta)
-    return adjusted
 
 def capture_and_recognize_license_plate(output_path):
     """Захоплює зображення за допомогою libcamera-still і зберігає його у файл."""
-    print("[INFO] Захоплення зображення з камери...")
+    log.info("Захоплення зображення з камери...")
     try:
         subprocess.run(["libcamera-still", "-o", output_path, "-n", "--width", "3280", "--height", "2464"], check=True)
         if os.path.exists(output_path):
-            print(f"[INFO] Зображення успішно збережено: {output_path}")
+            log.info("Зображення успішно збережено: %s", output_path)
             return True
         else:
-            print("[ERROR] Файл зображення не знайдено після захоплення.")
+            log.error("Файл зображення не знайдено після захоплення.")
             return False
     except subprocess.CalledProcessError as e:
-        print(f"[ERROR] Помилка виконання команди libcamera-still: {e}")
+        log.error("Помилка виконання команди libcamera-still: %s", e)
         return False
 
-def write_to_file(plate_texts, file_name="recognized_plates.txt"):
-    """Записує розпізнані номерні знаки у текстовий файл."""
-    with open(file_name, "a") as file:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for plate in plate_texts:
-            file.write(f"{timestamp}: {plate}\n")
-    print("[INFO] Номерні знаки записані у файл.")
-
-def save_cropped_image(image, bbox, output_dir, prefix):
-    """Зберігає вирізаний регіон зображення з унікальною назвою."""
-    x1, y1, x2, y2 = map(int, bbox)
-    cropped = image[y1:y2, x1:x2]
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{prefix}_{timestamp}.jpg"
-    filepath = os.path.join(output_dir, filename)
-    cv2.imwrite(filepath, cropped)
-    print(f"[INFO] Зображення збережено: {filepath}")
-    return filepath
-
-def is_plate_allowed(plate_number):
-    """Перевіряє, чи дозволений номерний знак у базі даних."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    query = "SELECT COUNT(*) FROM allowed_vehicles WHERE plate_number = ?"
-    cursor.execute(query, (plate_number,))
-    result = cursor.fetchone()
-
-    conn.close()
-
-    return result[0] > 0
-
-def open_gate():
-    """Надсилає команду на відкриття воріт через MQTT."""
-    mqtt_client.publish(MQTT_TOPIC_PUBLISH, "OPEN")
-    print("[INFO] Команда на відкриття воріт надіслана.")
+def write_to_file(plate_texts):
+    """Записує розпізнані номерні знаки у текстовий файл (буферизовано, див. plates_log)."""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    plates_log.append(f"{timestamp}: {plate}" for plate in plate_texts)
+    log.info("Номерні знаки записані у файл.")
+
+def save_artifacts(car_roi, plate_roi, allowed, confidence=None):
+    """Зберігає вирізані автомобіль і номер, якщо результат підпадає під ARTIFACT_POLICY."""
+    if not should_save(ARTIFACT_POLICY, allowed, confidence, ARTIFACT_LOW_CONFIDENCE, ARTIFACT_SAMPLE_RATE):
+        return
+    if car_roi is not None:
+        artifact_writer.save(car_roi, CAR_DIR, "car")
+    if plate_roi is not None:
+        artifact_writer.save(plate_roi, PLATE_DIR, "plate")
+
+def match_allowed_plate(plate_number):
+    """Дозволений номер, з яким збігся розпізнаний з урахуванням помилок OCR, або None."""
+    return access_cache.match_plate(plate_number)
+
+def open_gate(topic=MQTT_TOPIC_PUBLISH):
+    """Надсилає команду на відкриття воріт через MQTT (топік воріт камери)."""
+    mqtt_client.publish(topic, "OPEN")
+    log.info("Команда на відкриття воріт надіслана.")
+
+def detect_cars(image):
+    """Шукає автомобілі на кадрі; повертає список (рамка, вирізана область автомобіля).
+
+    Виявлення виконується на зменшеному кадрі, рамки задаються в координатах
+    оригіналу, а області автомобілів вирізаються з повнорозмірного кадру.
+    """
+    preprocessor = frame_preprocessor()
+    small_image, scale = preprocessor.downscale(image)
+
+    log.debug("Розпочато обробку зображення для пошуку автомобілів...")
+    with recognition_seconds.time(stage="yolo_car"):
+        detections_cars = model_cars.get().detect([small_image])[0]
+
+    cars = []
+    for detection in preprocessor.to_full(detections_cars, scale, image.shape[:2]):
+        x1, y1, x2, y2, conf, cls = detection
+        cars.append(((x1, y1, x2, y2), preprocessor.crop(image, (x1, y1, x2, y2))))
+    return cars
+
+def _first_plate(car_image, detections_plates):
+    for detection in detections_plates:
+        x1, y1, x2, y2, conf, cls = detection
+        return car_image[int(y1):int(y2), int(x1):int(x2)]
+    return None
+
+def find_plates_batch(car_images):
+    """Шукає номери на всіх автомобілях кадру одним викликом детектора номерів.
+
+    Вирізані області зводяться letterbox до PLATE_INPUT_SIZE, а рамки номерів
+    перераховуються назад у координати кожного автомобіля.
+    """
+    with recognition_seconds.time(stage="yolo_plate"):
+        detections = model_plates.get().detect(car_images)
+    return [_first_plate(car_image, boxes) for car_image, boxes in zip(car_images, detections)]
+
+def check_plate_access(plate_text_cleaned, captured_at=None, gate=None):
+    """Приймає рішення щодо в'їзду та відкриває ворота для дозволеного номера.
+
+    Рішення записується в журнал доступу; затримка рахується від захоплення
+    кадру (captured_at, time.monotonic()), якщо його передано. gate - камера
+    (GateCamera), що побачила номер: команда йде в її топік, а назва камери
+    записується в журнал як device_id.
+    """
+    started = time.monotonic() if captured_at is None else captured_at
+    matched_plate = match_allowed_plate(plate_text_cleaned)
+    allowed = matched_plate is not None
+    if allowed:
+        if matched_plate != plate_text_cleaned:
+            log.info("Розпізнаний номер %s збігся з дозволеним %s.", plate_text_cleaned, matched_plate)
+        log.info("Номер дозволений: %s", plate_text_cleaned, tag="ACCESS GRANTED")
+        log.info("Дозволено в'їзд.")
+        open_gate(gate.topic if gate is not None else MQTT_TOPIC_PUBLISH)
+    else:
+        log.info("Номер не дозволений: %s", plate_text_cleaned, tag="ACCESS DENIED")
+        log.info("Заборонено в'їзд.")
+    access_audit.record("plate", "granted" if allowed else "denied", detail=matched_plate, plate=plate_text_cleaned,
+                        device_id=gate.name if gate is not None else None, latency=time.monotonic() - started)
+    return allowed
 
 def detect_cars_and_plates(image_path):
     """Обробляє зображення: автомобілі та номерні знаки."""
     image = cv2.imread(image_path)
     if image is None:
-        print(f"[ERROR] Не вдалося завантажити зображення {image_path}.")
+        log.error("Не вдалося завантажити зображення %s.", image_path)
         return
 
-    bright_image = adjust_brightness(image)
-
-    print("[INFO] Розпочато обробку зображення для пошуку автомобілів...")
-    results_cars = model_cars(bright_image)
-    detections_cars = results_cars[0].boxes.data.numpy() if results_cars[0].boxes is not None else []
-
-    if detections_cars.size == 0:
-        print("[INFO] Автомобілі не знайдено!")
+    cars = detect_cars(image)
+    if not cars:
+        log.info("Автомобілі не знайдено!")
         return
 
     plate_texts = []
 
-    for detection in detections_cars:
-        x1, y1, x2, y2, conf, cls = detection
-        car_roi = bright_image[int(y1):int(y2), int(x1):int(x2)]
-        save_cropped_image(bright_image, (x1, y1, x2, y2), CAR_DIR, "car")
+    try:
+        plate_rois = find_plates_batch([car_roi for _, car_roi in cars])
+    except Exception as e:
+        log.error("Помилка обробки номерного знака: %s", e)
+        plate_rois = []
 
-        plate_text = detect_plate(car_roi)
+    for (_, car_roi), plate_roi in zip(cars, plate_rois):
+        plate_text = recognize_plate_text(plate_roi) if plate_roi is not None else ""
         if plate_text:
             plate_text_cleaned = plate_text.replace(" ", "")
             plate_texts.append(plate_text_cleaned)
-
-            if is_plate_allowed(plate_text_cleaned):
-                print(f"[ACCESS GRANTED] Номер дозволений: {plate_text_cleaned}")
-                print("[INFO] Дозволено в'їзд.")
-                open_gate()
-            else:
-                print(f"[ACCESS DENIED] Номер не дозволений: {plate_text_cleaned}")
-                print("[INFO] Заборонено в'їзд.")
+            allowed = check_plate_access(plate_text_cleaned)
+            save_artifacts(car_roi, plate_roi, allowed)
 
     if plate_texts:
         result_line = ", ".join(plate_texts)
-        print(f"[RESULT] Розпізнані номерні знаки: {result_line}")
+        log.info("Розпізнані номерні знаки: %s", result_line, tag="RESULT")
         write_to_file(plate_texts)
     else:
-        print("[RESULT] Жодного номерного знака не виявлено.")
-
-def detect_plate(car_image):
-    """Розпізнає номерний знак з області автомобіля."""
-    try:
-        results_plates = model_plates(car_image)
-        detections_plates = results_plates[0].boxes.data.numpy() if results_plates[0].boxes is not None else []
-
-        if detections_plates.size == 0:
-            return ""
-
-        for detection in detections_plates:
-            x1, y1, x2, y2, conf, cls = detection
-            plate_roi = car_image[int(y1):int(y2), int(x1):int(x2)]
-            save_cropped_image(car_image, (x1, y1, x2, y2), PLATE_DIR, "plate")
-            text = recognize_plate_text(plate_roi)
-            return text
-    except Exception as e:
-        print(f"[ERROR] Помилка обробки номерного знака: {e}")
-        return ""
+        log.info("Жодного номерного знака не виявлено.", tag="RESULT")
 
 def recognize_plate_text(plate_roi):
-    """Розпізнає текст номерного знака за допомогою Tesseract OCR."""
+    """Розпізнає текст номерного знака за допомогою Tesseract OCR (пул постійних воркерів)."""
     try:
-        gray = cv2.cvtColor(plate_roi, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-
-        # Динамічне масштабування
-        height, width = binary.shape[:2]
-        if width < 100 or height < 50:
-            scale = 8  # Якщо зображення дуже маленьке
-        elif width > 400 or height > 200:
-            scale = 2  # Якщо зображення велике
-        else:
-            scale = 4  # Середній випадок
-        
-        # Масштабування
-        binary_resized = cv2.resize(binary, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
-        resized_path = "processed_plates/plate_resized.jpg"
-        cv2.imwrite(resized_path, binary_resized)
-        print(f"[INFO] Збережено масштабоване зображення: {resized_path}")
-        config = '--psm 7 --oem 3'
-        raw_text = pytesseract.image_to_string(binary_resized, config=config).strip()
+        binary_resized = prepare_plate_image(plate_roi)
+        if OCR_DEBUG_DUMPS:
+            resized_path = os.path.join(PLATE_DIR, "plate_resized.jpg")
+            cv2.imwrite(resized_path, binary_resized)
+            log.info("Збережено масштабоване зображення: %s", resized_path)
+        with recognition_seconds.time(stage="ocr"):
+            raw_text = ocr_pool.recognize(binary_resized)
 
         return correct_plate_format(raw_text)
     except Exception as e:
-        print(f"[ERROR] Помилка розпізнавання тексту: {e}")
+        log.error("Помилка розпізнавання тексту: %s", e)
         return ""
 
 def correct_plate_format(raw_text):
@@ -201,13 +302,166 @@ def correct_plate_format(raw_text):
         corrected = ''.join(possible_numbers[:2] + possible_numbers[-2:])
         return corrected if len(corrected) == 8 else cleaned_text
 
-if __name__ == "__main__":
-    image_path = "current_image.jpg"
+# Етапи конвеєра (plate_pipeline.PlatePipeline). Кожен етап отримує словник
+# з frame_id, captured_at і source (назва камери) та повертає список елементів
+# для наступного етапу. Фільтр руху і треки - окремі для кожної камери,
+# детектори та OCR - спільні.
+gates = {gate.name: gate for gate in gate_cameras}
+cameras = {}
+
+def camera_component(gate):
+    return f"camera:{gate.name}"
+
+def capture_stage(gate):
+    """Захоплення кадру з джерела камери у вигляді масиву numpy (без запису на диск)."""
+    camera = cameras.get(gate.name)
+    if camera is None:
+        still_path = IMAGE_PATH if len(gates) == 1 else f"{gate.name}_{IMAGE_PATH}"
+        camera = cameras[gate.name] = open_source(gate.camera, gate.width, gate.height, gate.fps,
+                                                  still_path=still_path)
+        readiness.set_ready(camera_component(gate))
+    image = camera.read()
+    if image is None:
+        return None
+    return {"image": image}
+
+motion_gates = {
+    name: MotionGate(gate.roi, threshold=MOTION_THRESHOLD, min_fraction=MOTION_MIN_FRACTION,
+                     hold_seconds=MOTION_HOLD_SECONDS)
+    for name, gate in gates.items()
+}
+
+def motion_stage(item):
+    """Пропускає кадр до детекторів лише при русі в області перед воротами цієї камери."""
+    return [item] if motion_gates[item["source"]].check(item["image"]) else []
+
+plate_trackers = {
+    name: PlateTracker(min_votes=TRACKER_MIN_VOTES, confidence=TRACKER_CONFIDENCE, cooldown=GATE_COOLDOWN_SECONDS)
+    for name in gates
+}
+
+def car_stage(item):
+    """Виявлення автомобілів; далі передаються лише треки, для яких ще немає рішення.
+
+    Треки оновлюються за часом захоплення кадру: з DETECTOR_WORKERS > 1 кадри
+    однієї камери можуть завершитися не по черзі, і старший кадр трекер відкидає.
+    """
+    cars = detect_cars(item.pop("image"))
+    plate_tracker = plate_trackers[item["source"]]
+    track_ids = plate_tracker.update([bbox for bbox, _ in cars], now=item["captured_at"])
+    if track_ids is None:
+        return []
+    pending = [
+        (track_id, car_roi)
+        for track_id, (_, car_roi) in zip(track_ids, cars)
+        if plate_tracker.needs_ocr(track_id)
+    ]
+    return [{**item, "cars": pending}] if pending else []
+
+def plate_stage(item):
+    """Пакетне виявлення номерів для всіх автомобілів кадру."""
+    cars = item.pop("cars")
+    plate_rois = find_plates_batch([car_roi for _, car_roi in cars])
+    return [
+        {**item, "track_id": track_id, "car": car_roi, "plate": plate_roi}
+        for (track_id, car_roi), plate_roi in zip(cars, plate_rois)
+        if plate_roi is not None
+    ]
+
+def ocr_stage(item):
+    """OCR та голосування між кадрами: далі йде лише узгоджений номер треку."""
+    plate_text = recognize_plate_text(item["plate"])
+    consensus = plate_trackers[item["source"]].add_reading(item["track_id"], plate_text.replace(" ", ""),
+                                                         now=item["captured_at"])
+    return [{**item, "text": consensus}] if consensus else []
+
+def decision_stage(item):
+    """Одне рішення на трек: перевірка доступу, команда воротам, запис у файл і вибірка зображень."""
+    plate_tracker = plate_trackers[item["source"]]
+    item["allowed"] = check_plate_access(item["text"], item["captured_at"], gates[item["source"]])
+    plate_tracker.set_result(item["track_id"], item["allowed"])
+    write_to_file([item["text"]])
+    save_artifacts(item.pop("car"), item.pop("plate"), item["allowed"],
+                   plate_tracker.track_confidence(item["track_id"]))
+    return [item]
+
+def build_pipeline(sources=None):
+    """Конвеєр з обмеженими чергами між етапами; застарілі кадри відкидаються.
+
+    Втрачатися можуть лише кадри (черги motion, cars, plates): черги окремих
+    автомобілів перед OCR і рішень перед decision не відкидають елементи, а
+    тиснуть назад на етап plates, перед яким тоді відкидаються кадри.
+
+    Кожна камера читається у власному потоці; з кількома камерами черги
+    етапів обслуговують їх по колу (plate_pipeline.FairQueue).
+    """
+    if sources is None:
+        sources = {name: functools.partial(capture_stage, gate) for name, gate in gates.items()}
+    return (PlatePipeline(sources, queue_size=PIPELINE_QUEUE_SIZE, report_interval=PIPELINE_REPORT_INTERVAL,
+                          stats_path=PIPELINE_STATS_PATH)
+            .add_stage("motion", motion_stage, queue_size=1)
+            .add_stage("cars", car_stage, workers=DETECTOR_WORKERS, queue_size=1)
+            .add_stage("plates", plate_stage, workers=DETECTOR_WORKERS)
+            .add_stage("ocr", ocr_stage, workers=OCR_WORKERS, queue_size=OCR_WORKERS, lossless=True)
+            .add_stage("decision", decision_stage, lossless=True)
+            .add_stats("detectors", lambda: {"cars": model_cars.get().describe(),
+                                             "plates": model_plates.get().describe()})
+            .add_stats("cameras", lambda: {name: gate.describe() for name, gate in gates.items()})
+            .add_stats("motion_gate", lambda: {name: gate.stats() for name, gate in motion_gates.items()})
+            .add_stats("plate_tracker", lambda: {name: tracker.stats() for name, tracker in plate_trackers.items()})
+            .add_stats("ocr_pool", ocr_pool.stats)
+            .add_stats("artifacts", lambda: artifact_writer.stats())
+            .add_stats("access_audit", access_audit.stats))
+
+def run_sequential(image_path):
+    """Послідовний цикл: захоплення -> обробка -> очікування 3 секунди."""
     while True:
-        print("[INFO] Запуск циклу...")
+        log.info("Запуск циклу...")
         if capture_and_recognize_license_plate(image_path):
             detect_cars_and_plates(image_path)
         else:
-            print("[ERROR] Зображення не вдалося зберегти.")
-        print("[INFO] Завершення циклу. Очікування 3 секунди...")
+            log.error("Зображення не вдалося зберегти.")
+        log.info("Завершення циклу. Очікування 3 секунди...")
         time.sleep(3)
+
+def start_services():
+    """Фаза запуску: моделі, OCR і брокер готуються паралельно; повертається, коли моделі прогріто.
+
+    Помилка завантаження моделі зупиняє запуск, як і раніше.
+    """
+    global artifact_writer, plates_log
+    readiness.expect("car_model", "plate_model", "mqtt", "ocr")
+    if metrics.METRICS_PORT:
+        metrics.serve_http(metrics.METRICS_PORT, health=functools.partial(startup.health_response, readiness))
+    model_cars.load_in_background()
+    model_plates.load_in_background()
+    startup.connect_mqtt(mqtt_client, MQTT_BROKER, MQTT_PORT, readiness)
+    access_audit.start()
+    artifact_writer = ArtifactWriter([CAR_DIR, PLATE_DIR], quota_bytes=int(ARTIFACT_QUOTA_MB * 1024 * 1024))
+    plates_log = BufferedLogAppender(PLATES_LOG_PATH)
+    with readiness.phase("ocr"):
+        ocr_pool.warm_up()
+    model_cars.get()
+    model_plates.get()
+
+if __name__ == "__main__":
+    if os.environ.get("RECOGNIZER_MODE") == "sequential":
+        start_services()
+        run_sequential(IMAGE_PATH)
+    else:
+        # Камери відкриваються з першим кадром конвеєра
+        readiness.expect(*(camera_component(gate) for gate in gate_cameras))
+        start_services()
+        pipeline = build_pipeline()
+        metrics.add_collector(pipeline.collect_metrics)
+        pipeline.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pipeline.stop()
+            for camera in cameras.values():
+                camera.close()
+            artifact_writer.close()
+            plates_log.close()
+            access_audit.stop()
@@ -0,0 +1,175 @@
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+
+from paho.mqtt.client import topic_matches_sub
+
+import log
+from db import ROOM_TABLES
+
+# Поля телеметрії ESP32 -> назви колонок, які показує WEB-інтерфейс
+ROOM_FIELDS = {
+    "temp": "current_temperature",
+    "light": "light_state",
+    "fire": "fire_detected",
+    "curtains": "curtains_state",
+    "fan": "fan_state",
+    "desired_temp": "desired_temperature",
+}
+DOOR_STATUS_TOPIC = "home/door/status"
+# Фільтри топіків команд воротам через кому: кожна камера розпізнавача має
+# власний топік (camera_config), за замовчуванням home/gate і home/gate/<ворота>
+GATE_TOPICS = [topic.strip() for topic in os.environ.get("GATE_TOPICS", "home/gate/#").split(",") if topic.strip()]
+SUBSCRIBER_QUEUE_SIZE = 100
+KEEPALIVE_SECONDS = 15.0
+
+
+def format_event(event, data, event_id=None):
+    """Подія у форматі Server-Sent Events."""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class _Subscriber:
+    def __init__(self, max_queue):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.lagging = False
+
+
+class LiveStateHub:
+    """Єдина копія стану будинку в пам'яті та розсилка змін браузерам.
+
+    Стан заповнюється з бази один раз (seed_rooms), далі оновлюється лише з
+    MQTT: телеметрія кімнат, стан дверей і команди воротам. Кожна подія
+    серіалізується один раз і кладеться в черги всіх підписників, тому
+    кількість відкритих сторінок не збільшує навантаження на базу. Підписник,
+    що не встигає читати, відключається; браузер (EventSource) перепідключиться
+    і отримає свіжий знімок стану.
+    """
+
+    def __init__(self, max_queue=SUBSCRIBER_QUEUE_SIZE, keepalive=KEEPALIVE_SECONDS):
+        self.max_queue = max_queue
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._rooms = {}
+        self._door = None
+        self._gate = None
+        self._gates = {}
+        self._subscribers = set()
+        self._seq = 0
+        self.events = 0
+        self.dropped_subscribers = 0
+
+    def seed_rooms(self, rooms):
+        """Початковий стан кімнат ({таблиця: {поле: значення}}) з бази."""
+        with self._lock:
+            for room, data in rooms.items():
+                self._rooms.setdefault(room, {}).update(data)
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot_locked()
+
+    def _snapshot_locked(self):
+        return {
+            "rooms": {room: dict(data) for room, data in self._rooms.items()},
+            "door": self._door,
+            "gate": self._gate,
+            "gates": dict(self._gates),
+        }
+
+    def _publish_locked(self, event, data):
+        self._seq += 1
+        self.events += 1
+        message = format_event(event, data, self._seq)
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+            except queue.Full:
+                subscriber.lagging = True
+                self._subscribers.discard(subscriber)
+                self.dropped_subscribers += 1
+
+    def update_room(self, room, data):
+        """Оновлює стан кімнати з повідомлення home/room/<room>; розсилає лише змінені поля."""
+        table = ROOM_TABLES.get(room)
+        if table is None:
+            return None
+        values = {ROOM_FIELDS[key]: value for key, value in data.items() if key in ROOM_FIELDS}
+        with self._lock:
+            state = self._rooms.setdefault(table, {})
+            delta = {field: value for field, value in values.items() if state.get(field) != value}
+            if not delta:
+                return None
+            state.update(delta)
+            self._publish_locked("room", {"room": table, "changes": delta})
+        return delta
+
+    def door_event(self, status):
+        event = {"status": status, "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        with self._lock:
+            self._door = event
+            self._publish_locked("door", event)
+
+    def gate_event(self, command, gate=None):
+        """Команда воротам; gate - топік воріт, щоб розрізняти кілька камер."""
+        event = {"gate": gate, "command": command, "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        with self._lock:
+            self._gate = event
+            self._gates[gate] = event
+            self._publish_locked("gate", event)
+
+    def on_mqtt_message(self, client, userdata, message):
+        """Обробник paho-mqtt для home/room/#, home/door/status і топіків воріт (GATE_TOPICS)."""
+        topic = message.topic
+        payload = message.payload.decode("utf-8")
+        try:
+            if topic.startswith("home/room/"):
+                data = json.loads(payload)
+                if isinstance(data, dict):
+                    self.update_room(topic.split("/")[2], data)
+            elif topic == DOOR_STATUS_TOPIC:
+                self.door_event(payload)
+            elif any(topic_matches_sub(gate_topic, topic) for gate_topic in GATE_TOPICS):
+                self.gate_event(payload, topic)
+        except ValueError as e:
+            log.error("Некоректне повідомлення на топіку %s: %s", topic, e)
+
+    def subscribe_mqtt(self, mqtt_client):
+        mqtt_client.subscribe("home/room/#")
+        mqtt_client.subscribe(DOOR_STATUS_TOPIC)
+        for gate_topic in GATE_TOPICS:
+            mqtt_client.subscribe(gate_topic)
+
+    def stream(self):
+        """Генератор SSE для одного браузера: спершу знімок стану, далі зміни."""
+        subscriber = _Subscriber(self.max_queue)
+        with self._lock:
+            # Знімок і підписка під одним блокуванням - жодна зміна не загубиться
+            first = format_event("snapshot", self._snapshot_locked(), self._seq)
+            self._subscribers.add(subscriber)
+        try:
+            yield "retry: 3000\n" + first
+            while True:
+                if subscriber.lagging and subscriber.queue.empty():
+                    return
+                try:
+                    yield subscriber.queue.get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "events": self.events,
+                "dropped_subscribers": self.dropped_subscribers,
+                "rooms": len(self._rooms),
+            }
@@ -0,0 +1,71 @@
+import logging
+import os
+import sys
+
+# Журнал усіх модулів - стандартний logging (логер smart_home). Формат рядка
+# такий самий, як у попередніх print: "[INFO] повідомлення" або "[ТЕГ] повідомлення";
+# повідомлення нижче поточного рівня не форматуються і не виводяться.
+LEVELS = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "WARNING": logging.WARNING, "ERROR": logging.ERROR}
+_NAMES = {value: name for name, value in LEVELS.items()}
+
+logger = logging.getLogger("smart_home")
+
+
+class _TagFilter(logging.Filter):
+    """Тег рядка: переданий tag= або назва рівня."""
+
+    def filter(self, record):
+        if getattr(record, "tag", None) is None:
+            record.tag = record.levelname
+        return True
+
+
+def _configure():
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("[%(tag)s] %(message)s"))
+    handler.addFilter(_TagFilter())
+    logger.addHandler(handler)
+    logger.propagate = False
+    logger.setLevel(LEVELS.get(os.environ.get("LOG_LEVEL", "INFO").upper(), logging.INFO))
+
+
+_configure()
+
+
+def set_level(name):
+    """Змінює рівень під час роботи (наприклад, з /debug/log-level)."""
+    level = LEVELS.get(str(name).upper())
+    if level is None:
+        raise ValueError(f"Unknown log level: {name}")
+    logger.setLevel(level)
+
+
+def get_level():
+    return _NAMES.get(logger.level, logging.getLevelName(logger.level))
+
+
+def enabled(name):
+    return logger.isEnabledFor(LEVELS[name])
+
+
+def _emit(level, message, args, tag):
+    if logger.isEnabledFor(level):
+        # stacklevel=3 - у записі рядок модуля, що викликав log.info(), а не цього файлу
+        logger.log(level, message, *args, extra={"tag": tag}, stacklevel=3)
+
+
+def debug(message, *args, tag=None):
+    _emit(logging.DEBUG, message, args, tag)
+
+
+def info(message, *args, tag=None):
+    """Як print(f"[INFO] ..."), але аргументи форматуються лише для увімкненого рівня."""
+    _emit(logging.INFO, message, args, tag)
+
+
+def warning(message, *args, tag=None):
+    _emit(logging.WARNING, message, args, tag)
+
+
+def error(message, *args, tag=None):
+    _emit(logging.ERROR, message, args, tag)
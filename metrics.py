@@ -0,0 +1,348 @@
+import bisect
+import hmac
+import ipaddress
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import log
+from profiler import profiler
+
+# Межі кошиків гістограм затримки (секунди)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Порт /metrics для процесів без Flask (розпізнавач); 0 - вимкнено
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9101))
+# /debug/... доступні лише з localhost; якщо задано DEBUG_TOKEN - з будь-якої
+# адреси, але тільки із заголовком X-Debug-Token з цим значенням
+DEBUG_TOKEN = os.environ.get("DEBUG_TOKEN")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Family:
+    """Метрика на момент збору: (суфікс, мітки, значення) для кожного ряду."""
+
+    def __init__(self, name, kind, documentation, samples=None):
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.samples = samples if samples is not None else []
+
+    def add(self, labels, value, suffix=""):
+        self.samples.append((suffix, labels, value))
+        return self
+
+    def add_histogram(self, labels, bounds, counts, total):
+        """Ряд гістограми: bounds - верхні межі, counts - кількість у кожному кошику (+ останній +Inf)."""
+        cumulative = 0
+        for bound, count in zip(list(bounds) + [float("inf")], counts):
+            cumulative += count
+            self.samples.append(("_bucket", {**labels, "le": _format_value(float(bound))}, cumulative))
+        self.samples.append(("_sum", labels, total))
+        self.samples.append(("_count", labels, cumulative))
+        return self
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples:
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), func=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.func = func
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _series(self):
+        """Значення з функції (число або {кортеж міток: число}) чи накопичені."""
+        if self.func is None:
+            with self._lock:
+                return dict(self._values)
+        value = self.func()
+        return value if isinstance(value, dict) else {(): value}
+
+    def collect(self):
+        family = Family(self.name, self.kind, self.documentation)
+        for key, value in sorted(self._series().items()):
+            family.add(dict(zip(self.labelnames, key)), value)
+        return [family]
+
+
+class Counter(_Metric):
+    """Лічильник, що лише зростає (назва за звичаєм Prometheus закінчується на _total)."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Поточне значення; з func значення читається під час збору (глибина черги тощо)."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Гістограма тривалостей (секунди) з фіксованими кошиками."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, seconds, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def collect(self):
+        family = Family(self.name, self.kind, self.documentation)
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(series.items()):
+            family.add_histogram(dict(zip(self.labelnames, key)), self.buckets, counts, total)
+        return [family]
+
+
+class Registry:
+    """Набір метрик процесу та функцій збору (collector() -> список Family)."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=(), func=None):
+        return self._get_or_create(Counter, name, documentation, labelnames, func)
+
+    def gauge(self, name, documentation, labelnames=(), func=None):
+        return self._get_or_create(Gauge, name, documentation, labelnames, func)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def add_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        """Усі метрики у текстовому форматі Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for source in [metric.collect for metric in metrics] + collectors:
+            try:
+                families = source()
+            except Exception as e:
+                log.error("Metrics collector failed: %s", e)
+                continue
+            for family in families:
+                lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+add_collector = registry.add_collector
+render = registry.render
+
+
+def debug_allowed(remote_addr, headers):
+    """Чи можна виконати запит /debug/... .
+
+    Запити з браузера (заголовок Origin) відхиляються завжди: CORS
+    API-сервера не повинен відкривати сторінкам керування процесом.
+    Далі - токен DEBUG_TOKEN, якщо його задано, інакше лише loopback-адреса.
+    """
+    if headers.get("Origin"):
+        return False
+    if DEBUG_TOKEN:
+        return hmac.compare_digest(headers.get("X-Debug-Token") or "", DEBUG_TOKEN)
+    try:
+        return ipaddress.ip_address(remote_addr or "").is_loopback
+    except ValueError:
+        return False
+
+
+def handle_debug(method, path, params):
+    """Керування без перезапуску: рівень журналу і семплювальний профайлер.
+
+    GET /debug/log-level - поточний рівень, POST /debug/log-level?level=DEBUG - зміна;
+    POST /debug/profile?action=start[&interval=0.005] - запуск профайлера,
+    POST /debug/profile?action=stop - зупинка і звіт, GET /debug/profile - звіт без зупинки.
+    Дії, що змінюють стан, приймаються лише методом POST. Повертає (код, текст).
+    """
+    changes_state = bool(params.get("level") or params.get("action"))
+    if changes_state and method != "POST":
+        return 405, "Use POST to change state\n"
+    if path == "/debug/log-level":
+        level = params.get("level")
+        if level:
+            try:
+                log.set_level(level)
+            except ValueError as e:
+                return 400, f"{e}\n"
+        return 200, f"{log.get_level()}\n"
+    if path == "/debug/profile":
+        action = params.get("action")
+        if action == "start":
+            interval = float(params.get("interval") or profiler.interval)
+            started = profiler.start(interval)
+            return 200, "started\n" if started else "already running\n"
+        if action == "stop":
+            profiler.stop()
+        elif action:
+            return 400, f"Unknown action: {action}\n"
+        return 200, profiler.report(int(params.get("limit") or 50))
+    return 404, "Not found\n"
+
+
+def register_flask(app, app_name):
+    """Метрики REST-маршрутів Flask-застосунку, /metrics і /debug/... ."""
+    from flask import Response, g, request
+
+    requests_total = counter("http_requests_total", "HTTP requests by route and status",
+                             ("app", "method", "route", "status"))
+    request_seconds = histogram("http_request_duration_seconds", "HTTP request handling time",
+                                ("app", "method", "route"))
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe(response):
+        started = getattr(g, "metrics_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            request_seconds.observe(time.perf_counter() - started, app=app_name, method=request.method, route=route)
+            requests_total.inc(app=app_name, method=request.method, route=route, status=response.status_code)
+        return response
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return Response(render(), content_type=CONTENT_TYPE)
+
+    @app.route("/debug/<name>", methods=["GET", "POST"])
+    def debug_endpoint(name):
+        if not debug_allowed(request.remote_addr, request.headers):
+            status, text = 403, "Forbidden\n"
+        else:
+            status, text = handle_debug(request.method, f"/debug/{name}", request.values.to_dict())
+        return Response(text, status=status, content_type="text/plain; charset=utf-8")
+
+    return app
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _respond(self, method):
+        url = urlparse(self.path)
+        health = self.server.health(url.path) if self.server.health is not None else None
+        if health is not None:
+            (status, text), content_type = health, "application/json"
+        elif url.path == "/metrics":
+            status, text, content_type = 200, render(), CONTENT_TYPE
+        elif url.path.startswith("/debug/") and not debug_allowed(self.client_address[0], self.headers):
+            status, text, content_type = 403, "Forbidden\n", "text/plain; charset=utf-8"
+        else:
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            status, text = handle_debug(method, url.path, params)
+            content_type = "text/plain; charset=utf-8"
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond("GET")
+
+    def do_POST(self):
+        self._respond("POST")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_http(port, host="0.0.0.0", health=None):
+    """/metrics і /debug/... для процесів без Flask (окремий потік).
+
+    health(path) -> (код, JSON) або None - додаткові маршрути /healthz і /readyz
+    (functools.partial(startup.health_response, readiness)).
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.health = health
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    log.info("Metrics on http://%s:%d/metrics", host, server.server_address[1])
+    return server
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+def parse_roi(value):
+    """ROI з рядка "x1,y1,x2,y2" у частках кадру (0..1)."""
+    if not value:
+        return None
+    x1, y1, x2, y2 = (float(part) for part in value.split(","))
+    return x1, y1, x2, y2
+
+
+class MotionGate:
+    """Дешевий попередній фільтр перед YOLO: різниця з фоном на зменшеному
+    сірому кадрі в межах області перед воротами.
+
+    Фон оновлюється швидко, поки руху немає, і дуже повільно під час руху,
+    тому автомобіль, що зупинився перед воротами, не зникає одразу. Після
+    останнього руху детектори працюють ще hold_seconds секунд.
+    """
+
+    def __init__(self, roi=None, width=160, threshold=25, min_fraction=0.02,
+                 learning_rate=0.05, motion_learning_rate=0.002, hold_seconds=5.0):
+        self.roi = roi
+        self.width = width
+        self.threshold = threshold
+        self.min_fraction = min_fraction
+        self.learning_rate = learning_rate
+        self.motion_learning_rate = motion_learning_rate
+        self.hold_seconds = hold_seconds
+        self.background = None
+        self._last_motion = None
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.run = 0
+        self.skipped = 0
+        self.last_fraction = 0.0
+        self.busy = 0.0
+
+    def _prepare(self, frame):
+        height, width = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, self.width * height // width)), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        if self.roi:
+            h, w = gray.shape
+            x1, y1, x2, y2 = self.roi
+            gray = gray[int(y1 * h):max(int(y2 * h), int(y1 * h) + 1), int(x1 * w):max(int(x2 * w), int(x1 * w) + 1)]
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame):
+        """True, якщо в ROI є рух (або ще не минув час утримання) і варто запускати детектори."""
+        started = time.perf_counter()
+        gray = self._prepare(frame)
+        now = time.monotonic()
+        with self._lock:
+            if self.background is None or self.background.shape != gray.shape:
+                self.background = gray.astype(np.float32)
+                motion = True
+                fraction = 1.0
+            else:
+                diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+                fraction = cv2.countNonZero(cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)[1]) / diff.size
+                motion = fraction >= self.min_fraction
+                rate = self.motion_learning_rate if motion else self.learning_rate
+                cv2.accumulateWeighted(gray, self.background, rate)
+            if motion:
+                self._last_motion = now
+            active = self._last_motion is not None and now - self._last_motion <= self.hold_seconds
+            self.checked += 1
+            self.last_fraction = fraction
+            if active:
+                self.run += 1
+            else:
+                self.skipped += 1
+            self.busy += time.perf_counter() - started
+        return active
+
+    def stats(self):
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "run": self.run,
+                "skipped": self.skipped,
+                "skip_ratio": round(self.skipped / self.checked, 3) if self.checked else 0.0,
+                "last_motion_fraction": round(self.last_fraction, 4),
+                "mean_check_ms": round(self.busy / self.checked * 1000, 3) if self.checked else 0.0,
+            }
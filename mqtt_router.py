@@ -0,0 +1,214 @@
+import bisect
+import queue
+import threading
+import time
+
+import log
+from metrics import Family
+
+# Межі кошиків гістограм затримки (мс); останній кошик - усе, що більше
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+_STOP = object()
+
+
+def topic_matches(pattern, topic):
+    """Перевірка топіка на відповідність шаблону MQTT з + і #."""
+    pattern_parts = pattern.split("/")
+    topic_parts = topic.split("/")
+    for index, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if index >= len(topic_parts):
+            return False
+        if part != "+" and part != topic_parts[index]:
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+class LatencyHistogram:
+    """Гістограма затримок з фіксованими кошиками (мс)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        """Верхня межа кошика, у який потрапляє частка fraction спостережень."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class Lane:
+    """Смуга обробки: власна черга та воркери, гістограми очікування і виконання."""
+
+    def __init__(self, name, workers=1, max_queue=0):
+        self.name = name
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.wait = LatencyHistogram()
+        self.handle = LatencyHistogram()
+        self.lock = threading.Lock()
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+        self.high_watermark = 0
+        self.threads = []
+
+    def put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+        with self.lock:
+            self.received += 1
+            self.high_watermark = max(self.high_watermark, self.queue.qsize())
+        return True
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            handler, topic, payload, received_at = item
+            started = time.monotonic()
+            try:
+                handler(topic, payload)
+            except Exception as e:
+                log.error("Handler for %s failed: %s", topic, e)
+                with self.lock:
+                    self.errors += 1
+            finished = time.monotonic()
+            with self.lock:
+                self.wait.observe(started - received_at)
+                self.handle.observe(finished - started)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue.qsize(),
+                "queue_capacity": self.queue.maxsize,
+                "queue_high_watermark": self.high_watermark,
+                "received": self.received,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "wait": self.wait.snapshot(),
+                "handler": self.handle.snapshot(),
+            }
+
+
+class MqttRouter:
+    """Маршрутизатор MQTT-повідомлень за топіками зі смугами пріоритету.
+
+    on_message лише знаходить обробник і кладе повідомлення в чергу його
+    смуги, тому мережевий потік paho ніколи не чекає на базу. Кожна смуга
+    має власних воркерів: повільна телеметрія не затримує перевірку пароля
+    чи картки дверей. Порядок повідомлень у смузі з одним воркером зберігається.
+    """
+
+    def __init__(self):
+        self.lanes = {}
+        self.routes = []
+        self.unrouted = 0
+
+    def add_lane(self, name, workers=1, max_queue=0):
+        self.lanes[name] = Lane(name, workers, max_queue)
+        return self
+
+    def add_route(self, pattern, handler, lane):
+        """handler(topic, payload) для топіків за шаблоном pattern у смузі lane."""
+        if lane not in self.lanes:
+            raise ValueError(f"Unknown lane: {lane}")
+        self.routes.append((pattern, handler, self.lanes[lane]))
+        return self
+
+    def route(self, pattern, lane):
+        """Декоратор для add_route."""
+        def decorator(handler):
+            self.add_route(pattern, handler, lane)
+            return handler
+        return decorator
+
+    def subscribe(self, mqtt_client):
+        for pattern in dict.fromkeys(pattern for pattern, _, _ in self.routes):
+            mqtt_client.subscribe(pattern)
+
+    def dispatch(self, topic, payload):
+        received_at = time.monotonic()
+        for pattern, handler, lane in self.routes:
+            if topic_matches(pattern, topic):
+                return lane.put((handler, topic, payload, received_at))
+        self.unrouted += 1
+        return False
+
+    def on_message(self, client, userdata, message):
+        """Обробник paho-mqtt (mqtt_client.on_message = router.on_message)."""
+        self.dispatch(message.topic, message.payload.decode("utf-8"))
+
+    def start(self):
+        for lane in self.lanes.values():
+            for index in range(lane.workers):
+                thread = threading.Thread(target=lane.run, name=f"mqtt-{lane.name}-{index}", daemon=True)
+                thread.start()
+                lane.threads.append(thread)
+        return self
+
+    def stop(self, timeout=5.0):
+        for lane in self.lanes.values():
+            for _ in lane.threads:
+                lane.queue.put(_STOP)
+        for lane in self.lanes.values():
+            for thread in lane.threads:
+                thread.join(timeout)
+            lane.threads = []
+
+    def stats(self):
+        return {"unrouted": self.unrouted, "lanes": {name: lane.stats() for name, lane in self.lanes.items()}}
+
+    def collect_metrics(self):
+        """Метрики смуг для /metrics (metrics.add_collector(router.collect_metrics))."""
+        messages = Family("mqtt_lane_messages_total", "counter", "MQTT messages per lane by outcome")
+        depth = Family("mqtt_lane_queue_depth", "gauge", "MQTT messages waiting in the lane queue")
+        wait = Family("mqtt_lane_wait_seconds", "histogram", "Time from receipt to handler start")
+        handle = Family("mqtt_lane_handler_seconds", "histogram", "MQTT handler run time")
+        for name, lane in self.lanes.items():
+            labels = {"lane": name}
+            with lane.lock:
+                for outcome, value in (("received", lane.received), ("dropped", lane.dropped), ("errors", lane.errors)):
+                    messages.add({**labels, "outcome": outcome}, value)
+                for family, histogram in ((wait, lane.wait), (handle, lane.handle)):
+                    family.add_histogram(labels, [bound / 1000 for bound in histogram.buckets],
+                                         list(histogram.counts), histogram.total_ms / 1000)
+            depth.add(labels, lane.queue.qsize())
+        messages.add({"lane": "", "outcome": "unrouted"}, self.unrouted)
+        return [messages, depth, wait, handle]
@@ -0,0 +1,144 @@
+import collections
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+# Параметри Tesseract, як у pytesseract: '--psm 7 --oem 3' (один рядок тексту)
+TESSERACT_CONFIG = "--psm 7 --oem 3"
+TESSERACT_LANG = "eng"
+# Виконуваний файл tesseract для резервного варіанта pytesseract
+TESSERACT_CMD = os.environ.get("TESSERACT_CMD", "/usr/bin/tesseract")
+TIMING_WINDOW = 1024
+
+
+def prepare_plate_image(plate_roi):
+    """Сірий -> розмиття -> бінаризація Otsu -> масштабування під розмір номера."""
+    gray = cv2.cvtColor(plate_roi, cv2.COLOR_BGR2GRAY) if plate_roi.ndim == 3 else plate_roi
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+
+    # Динамічне масштабування
+    height, width = binary.shape[:2]
+    if width < 100 or height < 50:
+        scale = 8  # Якщо зображення дуже маленьке
+    elif width > 400 or height > 200:
+        scale = 2  # Якщо зображення велике
+    else:
+        scale = 4  # Середній випадок
+    return cv2.resize(binary, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+
+
+class _TesserocrEngine:
+    """Постійний екземпляр Tesseract C API: мовні моделі завантажуються один раз."""
+
+    def __init__(self, lang):
+        from tesserocr import OEM, PSM, PyTessBaseAPI
+
+        self.api = PyTessBaseAPI(lang=lang, psm=PSM.SINGLE_LINE, oem=OEM.DEFAULT)
+
+    def recognize(self, image):
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        self.api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+        return self.api.GetUTF8Text()
+
+
+class _PytesseractEngine:
+    """Резервний варіант без tesserocr: окремий процес tesseract на кожен виклик."""
+
+    def __init__(self, lang):
+        import pytesseract
+
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+        self.pytesseract = pytesseract
+        self.lang = lang
+
+    def recognize(self, image):
+        return self.pytesseract.image_to_string(image, lang=self.lang, config=TESSERACT_CONFIG)
+
+
+def available_backend():
+    try:
+        import tesserocr  # noqa: F401
+        return "tesserocr"
+    except ImportError:
+        return "pytesseract"
+
+
+class OcrPool:
+    """Пул OCR-воркерів з постійним рушієм Tesseract у кожному потоці.
+
+    Зображення передаються масивами numpy без запису на диск. Кількість
+    воркерів за замовчуванням дорівнює кількості ядер процесора.
+    """
+
+    def __init__(self, workers=None, lang=TESSERACT_LANG, backend=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.lang = lang
+        self.backend = backend or available_backend()
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+        self._lock = threading.Lock()
+        self._latencies = collections.deque(maxlen=TIMING_WINDOW)
+        self.processed = 0
+        self.errors = 0
+
+    def _engine(self):
+        engine = getattr(self._local, "engine", None)
+        if engine is None:
+            engine_class = _TesserocrEngine if self.backend == "tesserocr" else _PytesseractEngine
+            engine = self._local.engine = engine_class(self.lang)
+        return engine
+
+    def _run(self, image):
+        started = time.perf_counter()
+        try:
+            return self._engine().recognize(image).strip()
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.processed += 1
+                self._latencies.append(time.perf_counter() - started)
+
+    def submit(self, image):
+        """Асинхронне розпізнавання; повертає Future з текстом."""
+        return self._executor.submit(self._run, image)
+
+    def recognize(self, image):
+        return self.submit(image).result()
+
+    def warm_up(self, timeout=60.0):
+        """Створює рушій Tesseract у кожному воркері до першого номера.
+
+        Завдання чекають одне на одного на бар'єрі, тому кожне займає окремий потік пулу.
+        """
+        barrier = threading.Barrier(self.workers)
+
+        def init():
+            self._engine()
+            barrier.wait(timeout)
+
+        for future in [self._executor.submit(init) for _ in range(self.workers)]:
+            future.result()
+
+    def stats(self):
+        with self._lock:
+            ordered = sorted(self._latencies)
+            processed, errors = self.processed, self.errors
+        return {
+            "backend": self.backend,
+            "workers": self.workers,
+            "processed": processed,
+            "errors": errors,
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2) if ordered else 0.0,
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2) if ordered else 0.0,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
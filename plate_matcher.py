@@ -0,0 +1,145 @@
+import os
+from collections import Counter
+
+# Кириличні літери, що на номерах збігаються з латинськими (база може містити будь-які)
+HOMOGLYPHS = str.maketrans("АВЕКМНОРСТХІУ", "ABEKMHOPCTXIY")
+# Групи символів, які OCR плутає між собою; заміна всередині групи коштує CONFUSION_COST,
+# будь-яка інша заміна, пропуск або зайвий символ - 1
+CONFUSION_GROUPS = ["O0DQ", "I1LJ", "B8", "S5", "Z2", "G6", "T7", "A4"]
+CONFUSION_COST = float(os.environ.get("PLATE_CONFUSION_COST", 0.3))
+# Номер вважається дозволеним, якщо найближчий дозволений номер не далі MAX_DISTANCE,
+# а наступний за ним - щонайменше на MIN_MARGIN далі (інакше збіг неоднозначний).
+# Типово приймаються лише плутанини OCR (до двох), але не довільна заміна символу.
+MAX_DISTANCE = float(os.environ.get("PLATE_MATCH_MAX_DISTANCE", 0.6))
+MIN_MARGIN = float(os.environ.get("PLATE_MATCH_MIN_MARGIN", 0.5))
+
+_SKELETON = str.maketrans({char: group[0] for group in CONFUSION_GROUPS for char in group})
+
+
+def normalize(text):
+    """Верхній регістр, кирилиця -> латиниця, лише літери та цифри."""
+    return "".join(char for char in text.upper().translate(HOMOGLYPHS) if char.isalnum())
+
+
+def skeleton(normalized):
+    """Кожна група плутанини замінюється одним символом (O, 0, D, Q -> O)."""
+    return normalized.translate(_SKELETON)
+
+
+def deletions(key, depth):
+    """Усі варіанти ключа з вилученими до depth символами (включно з самим ключем)."""
+    variants = {key}
+    frontier = {key}
+    for _ in range(depth):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+def weighted_distance(a, b, confusion_cost=CONFUSION_COST, limit=float("inf")):
+    """Відстань редагування, де заміна в межах групи плутанини дешевша за 1."""
+    previous = [float(j) for j in range(len(b) + 1)]
+    skeleton_b = skeleton(b)
+    for i, (char_a, skel_a) in enumerate(zip(a, skeleton(a)), 1):
+        current = [float(i)]
+        for j, (char_b, skel_b) in enumerate(zip(b, skeleton_b), 1):
+            if char_a == char_b:
+                substitution = 0.0
+            elif skel_a == skel_b:
+                substitution = confusion_cost
+            else:
+                substitution = 1.0
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + substitution))
+        if min(current) > limit:
+            return min(current)
+        previous = current
+    return previous[-1]
+
+
+class DeletionIndex:
+    """Індекс симетричних вилучень: пошук усіх ключів на відстані Левенштейна до depth.
+
+    Якщо відстань між двома рядками не більша за depth, то в них є спільний
+    варіант з не більше ніж depth вилученими символами; пошук - це depth-кратні
+    вилучення із запиту та звернення до словника замість перебору всіх ключів.
+    """
+
+    def __init__(self, depth):
+        self.depth = depth
+        self._variants = {}
+        self.size = 0
+
+    def add(self, key):
+        for variant in deletions(key, self.depth):
+            keys = self._variants.setdefault(variant, set())
+            if variant == key and key not in keys:
+                self.size += 1
+            keys.add(key)
+
+    def candidates(self, key):
+        found = set()
+        for variant in deletions(key, self.depth):
+            found |= self._variants.get(variant, set())
+        return found
+
+
+class PlateMatcher:
+    """Нечіткий пошук розпізнаного номера серед дозволених.
+
+    Номери нормалізуються (кирилиця -> латиниця) та індексуються за
+    "скелетом", у якому групи плутанини OCR злиті в один символ. Кожна операція,
+    що не є плутаниною, коштує 1 і в зваженій відстані, і у відстані між
+    скелетами, тому пошук скелетів у радіусі floor(max_distance) знаходить усіх
+    кандидатів; далі вони впорядковуються зваженою відстанню.
+    """
+
+    def __init__(self, plates, max_distance=MAX_DISTANCE, min_margin=MIN_MARGIN, confusion_cost=CONFUSION_COST):
+        self.max_distance = max_distance
+        self.min_margin = min_margin
+        self.confusion_cost = confusion_cost
+        self._exact = {}
+        self._by_skeleton = {}
+        self._index = DeletionIndex(int(max_distance))
+        for plate in plates:
+            normalized = normalize(plate)
+            if not normalized:
+                continue
+            self._exact.setdefault(normalized, plate)
+            key = skeleton(normalized)
+            self._by_skeleton.setdefault(key, []).append(normalized)
+            self._index.add(key)
+        self.counters = Counter()
+
+    def __len__(self):
+        return len(self._exact)
+
+    def match(self, text):
+        """Повертає (результат, дозволений номер або None, відстань).
+
+        Результат: "exact", "fuzzy", "ambiguous" (два дозволені номери надто
+        близькі, щоб вибрати один) або "miss".
+        """
+        normalized = normalize(text)
+        if normalized in self._exact:
+            self.counters["exact"] += 1
+            return "exact", self._exact[normalized], 0.0
+        scored = []
+        if normalized:
+            for key in self._index.candidates(skeleton(normalized)):
+                for candidate in self._by_skeleton[key]:
+                    distance = weighted_distance(normalized, candidate, self.confusion_cost,
+                                                 self.max_distance + self.min_margin)
+                    scored.append((distance, candidate))
+        scored.sort()
+        if not scored or scored[0][0] > self.max_distance:
+            self.counters["miss"] += 1
+            return "miss", None, scored[0][0] if scored else None
+        distance, candidate = scored[0]
+        if len(scored) > 1 and scored[1][0] - distance < self.min_margin:
+            self.counters["ambiguous"] += 1
+            return "ambiguous", None, distance
+        self.counters["fuzzy"] += 1
+        return "fuzzy", self._exact[candidate], distance
+
+    def stats(self):
+        return {"plates": len(self._exact), "skeletons": self._index.size, **self.counters}
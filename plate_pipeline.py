@@ -0,0 +1,419 @@
+import collections
+import itertools
+import json
+import os
+import threading
+import time
+
+import log
+import metrics
+
+# Скільки останніх вимірювань часу зберігати для кожного етапу
+TIMING_WINDOW = 512
+
+_stage_seconds = metrics.histogram("plate_pipeline_stage_seconds", "Plate pipeline stage run time", ("stage",))
+_end_to_end_seconds = metrics.histogram("plate_pipeline_end_to_end_seconds", "Time from frame capture to decision",
+                                        ("source",))
+
+# Назва джерела, якщо конвеєру передано одну функцію захоплення
+DEFAULT_SOURCE = "default"
+
+
+class LatestQueue:
+    """Обмежена черга між етапами: якщо вона заповнена, найстаріший елемент
+    відкидається, тож наступний етап завжди отримує найсвіжіші кадри.
+
+    З lossless=True нічого не відкидається: put() чекає на вільне місце.
+    Так працюють черги автомобілів і рішень - застарілими можуть бути лише
+    кадри, а втрачений автомобіль чи рішення означає, що ворота не відкриються.
+    """
+
+    def __init__(self, maxsize, lossless=False):
+        self.maxsize = maxsize
+        self.lossless = lossless
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+        self.blocked = 0
+        self.high_watermark = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.lossless:
+                    self.blocked += 1
+                    self._cond.wait_for(lambda: len(self._items) < self.maxsize or self._closed)
+                    if self._closed:
+                        return
+                else:
+                    self._items.popleft()
+                    self.dropped += 1
+            self._items.append(item)
+            self.high_watermark = max(self.high_watermark, len(self._items))
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Звільняє потоки, що чекають у put(), під час зупинки конвеєра."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class FairQueue:
+    """Черга між етапами для кількох камер: окрема обмежена черга (як
+    LatestQueue) для кожного джерела (item["source"]) і вибірка по колу.
+
+    Камера з високою частотою кадрів відкидає лише власні застарілі кадри
+    і не витісняє кадри інших камер; спільні воркери обслуговують джерела
+    по черзі, тому затримка однієї камери не залежить від темпу іншої.
+    lossless=True - як у LatestQueue: put() чекає на місце в черзі джерела.
+    """
+
+    def __init__(self, maxsize, lossless=False):
+        self.maxsize = maxsize
+        self.lossless = lossless
+        self._items = collections.OrderedDict()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+        self.dropped_by_source = collections.Counter()
+        self.blocked = 0
+        self.high_watermark = 0
+
+    def put(self, item):
+        source = item.get("source")
+        with self._cond:
+            items = self._items.setdefault(source, collections.deque())
+            if len(items) >= self.maxsize:
+                if self.lossless:
+                    self.blocked += 1
+                    self._cond.wait_for(lambda: len(items) < self.maxsize or self._closed)
+                    if self._closed:
+                        return
+                else:
+                    items.popleft()
+                    self.dropped += 1
+                    self.dropped_by_source[source] += 1
+            items.append(item)
+            self.high_watermark = max(self.high_watermark, len(items))
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not any(self._items.values()):
+                self._cond.wait(timeout)
+            for source, items in self._items.items():
+                if items:
+                    # Обслужене джерело переходить у кінець черги обходу
+                    self._items.move_to_end(source)
+                    item = items.popleft()
+                    self._cond.notify_all()
+                    return item
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(items) for items in self._items.values())
+
+
+def _percentile_ms(ordered, fraction):
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 2) if ordered else 0.0
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.processed = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.durations = collections.deque(maxlen=TIMING_WINDOW)
+        self.lock = threading.Lock()
+
+    def record(self, duration, emitted):
+        with self.lock:
+            self.processed += 1
+            self.emitted += emitted
+            self.busy += duration
+            self.durations.append(duration)
+        _stage_seconds.observe(duration, stage=self.name)
+
+    def snapshot(self, elapsed):
+        with self.lock:
+            ordered = sorted(self.durations)
+            processed, emitted, errors, busy = self.processed, self.emitted, self.errors, self.busy
+        return {
+            "processed": processed,
+            "emitted": emitted,
+            "errors": errors,
+            "mean_ms": round(busy / processed * 1000, 2) if processed else 0.0,
+            "p50_ms": _percentile_ms(ordered, 0.50),
+            "p95_ms": _percentile_ms(ordered, 0.95),
+            "p99_ms": _percentile_ms(ordered, 0.99),
+            "throughput_per_s": round(processed / elapsed, 2) if elapsed else 0.0,
+            "utilization": round(busy / elapsed, 3) if elapsed else 0.0,
+        }
+
+
+class SourceStats:
+    """Кадри, рішення і затримка кадр->рішення однієї камери."""
+
+    def __init__(self):
+        self.frames = 0
+        self.completed = 0
+        self.latencies = collections.deque(maxlen=TIMING_WINDOW)
+        self.lock = threading.Lock()
+
+    def snapshot(self, elapsed):
+        with self.lock:
+            ordered = sorted(self.latencies)
+            frames, completed = self.frames, self.completed
+        return {
+            "frames": frames,
+            "frames_per_s": round(frames / elapsed, 2) if elapsed else 0.0,
+            "completed": completed,
+            "end_to_end_p50_ms": _percentile_ms(ordered, 0.50),
+            "end_to_end_p95_ms": _percentile_ms(ordered, 0.95),
+            "end_to_end_p99_ms": _percentile_ms(ordered, 0.99),
+        }
+
+
+class PlatePipeline:
+    """Конвеєр розпізнавання: захоплення -> автомобілі -> номери -> OCR -> рішення.
+
+    Кожен етап працює у власних потоках і з'єднаний з наступним чергою
+    LatestQueue. Функція етапу отримує елемент (словник з frame_id,
+    captured_at і source) і повертає список нових елементів для наступного
+    етапу. Джерело (source) викликається в циклі і повертає словник кадру
+    або None; словник {назва: функція} задає кілька камер - кожна читається
+    у власному потоці, а черги між етапами стають FairQueue, тож спільні
+    воркери етапів обслуговують камери по черзі.
+    Якщо задано stats_path, кожен звіт і підсумок після stop() записуються
+    у цей файл як JSON.
+    """
+
+    def __init__(self, source, queue_size=2, report_interval=30.0, stats_path=None):
+        self.sources = dict(source) if isinstance(source, dict) else {DEFAULT_SOURCE: source}
+        self.queue_size = queue_size
+        self.report_interval = report_interval
+        self.stats_path = stats_path
+        self.stages = []
+        self._threads = []
+        self._stop = threading.Event()
+        self._frame_ids = itertools.count(1)
+        self._started_at = None
+        self.source_stats = StageStats("capture")
+        self.per_source = {name: SourceStats() for name in self.sources}
+        self.latencies = collections.deque(maxlen=TIMING_WINDOW)
+        self.completed = 0
+        self.extra_stats = {}
+
+    def add_stage(self, name, func, workers=1, queue_size=None, lossless=False):
+        """Етап з workers потоками; lossless - черга перед етапом не відкидає елементи (див. LatestQueue)."""
+        queue_class = FairQueue if len(self.sources) > 1 else LatestQueue
+        self.stages.append({
+            "name": name,
+            "func": func,
+            "workers": workers,
+            "queue": queue_class(queue_size or self.queue_size, lossless),
+            "stats": StageStats(name),
+        })
+        return self
+
+    def add_stats(self, name, func):
+        """Додає до звіту статистику допоміжного компонента (func() -> dict)."""
+        self.extra_stats[name] = func
+        return self
+
+    def start(self):
+        self._started_at = time.monotonic()
+        for name in self.sources:
+            self._spawn(self._run_source, "capture" if len(self.sources) == 1 else f"capture-{name}", name)
+        for index, stage in enumerate(self.stages):
+            for worker in range(stage["workers"]):
+                self._spawn(self._run_stage, f"{stage['name']}-{worker}", index)
+        if self.report_interval:
+            self._spawn(self._run_reporter, "pipeline-stats")
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        for stage in self.stages:
+            stage["queue"].close()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self.stats_path:
+            self.write_stats(self.stats())
+
+    def write_stats(self, report):
+        """Атомарно записує звіт у stats_path (читач не побачить половину файлу)."""
+        temporary_path = f"{self.stats_path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as stats_file:
+            json.dump(report, stats_file, ensure_ascii=False, indent=2)
+        os.replace(temporary_path, self.stats_path)
+
+    def _spawn(self, target, name, *args):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _emit(self, index, items):
+        if index < len(self.stages):
+            for item in items:
+                self.stages[index]["queue"].put(item)
+        else:
+            now = time.monotonic()
+            for item in items:
+                latency = now - item["captured_at"]
+                self.latencies.append(latency)
+                _end_to_end_seconds.observe(latency, source=item["source"])
+                self.completed += 1
+                source_stats = self.per_source[item["source"]]
+                with source_stats.lock:
+                    source_stats.latencies.append(latency)
+                    source_stats.completed += 1
+
+    def _run_source(self, name):
+        stats = self.source_stats
+        read_frame = self.sources[name]
+        source_stats = self.per_source[name]
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                frame = read_frame()
+            except Exception as e:
+                log.error("Помилка етапу capture (%s): %s", name, e)
+                with stats.lock:
+                    stats.errors += 1
+                self._stop.wait(1.0)
+                continue
+            if frame is None:
+                self._stop.wait(0.1)
+                continue
+            frame.setdefault("frame_id", next(self._frame_ids))
+            frame.setdefault("captured_at", started)
+            frame.setdefault("source", name)
+            stats.record(time.monotonic() - started, 1)
+            with source_stats.lock:
+                source_stats.frames += 1
+            self._emit(0, [frame])
+
+    def _run_stage(self, index):
+        stage = self.stages[index]
+        stats = stage["stats"]
+        while not self._stop.is_set():
+            item = stage["queue"].get(timeout=0.2)
+            if item is None:
+                continue
+            started = time.monotonic()
+            try:
+                outputs = stage["func"](item) or []
+            except Exception as e:
+                log.error("Помилка етапу %s: %s", stage["name"], e)
+                with stats.lock:
+                    stats.errors += 1
+                continue
+            stats.record(time.monotonic() - started, len(outputs))
+            self._emit(index + 1, outputs)
+
+    def _run_reporter(self):
+        while not self._stop.wait(self.report_interval):
+            report = self.stats()
+            parts = [
+                f"{name}: {s['mean_ms']} мс, {s['throughput_per_s']}/с"
+                for name, s in report["stages"].items()
+            ]
+            log.info("%s; кадр->рішення p95 %s мс; вузьке місце: %s", "; ".join(parts),
+                     report["end_to_end_p95_ms"], report["bottleneck"], tag="STATS")
+            if len(report["sources"]) > 1:
+                for name, values in report["sources"].items():
+                    log.info("камера %s: %s кадр/с, рішень %s, кадр->рішення p95 %s мс, відкинуто %s", name,
+                             values["frames_per_s"], values["completed"], values["end_to_end_p95_ms"],
+                             values["dropped"], tag="STATS")
+            for name, values in report["components"].items():
+                log.info("%s: %s", name, values, tag="STATS")
+            if self.stats_path:
+                self.write_stats(report)
+
+    def collect_metrics(self):
+        """Глибина черг, відкинуті елементи та помилки етапів для /metrics."""
+        depth = metrics.Family("plate_pipeline_queue_depth", "gauge", "Items waiting before the stage")
+        dropped = metrics.Family("plate_pipeline_dropped_total", "counter", "Stale items dropped before the stage")
+        errors = metrics.Family("plate_pipeline_errors_total", "counter", "Stage function failures")
+        errors.add({"stage": "capture"}, self.source_stats.errors)
+        for stage in self.stages:
+            labels = {"stage": stage["name"]}
+            depth.add(labels, len(stage["queue"]))
+            dropped.add(labels, stage["queue"].dropped)
+            errors.add(labels, stage["stats"].errors)
+        completed = metrics.Family("plate_pipeline_completed_total", "counter", "Items that reached the decision")
+        frames = metrics.Family("plate_pipeline_frames_total", "counter", "Frames captured per source")
+        for name, source_stats in self.per_source.items():
+            completed.add({"source": name}, source_stats.completed)
+            frames.add({"source": name}, source_stats.frames)
+        return [depth, dropped, errors, completed, frames]
+
+    def stats(self):
+        """Час і пропускна здатність кожного етапу, відкинуті кадри, вузьке місце."""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        stages = {"capture": self.source_stats.snapshot(elapsed)}
+        for stage in self.stages:
+            snapshot = stage["stats"].snapshot(elapsed)
+            snapshot["queue_depth"] = len(stage["queue"])
+            snapshot["dropped"] = stage["queue"].dropped
+            snapshot["blocked"] = stage["queue"].blocked
+            stages[stage["name"]] = snapshot
+        ordered = sorted(self.latencies)
+        # Вузьке місце - найзавантаженіший етап, перед яким відкидаються елементи
+        # (або, для черг без втрат, чекає попередній етап); якщо таких немає,
+        # темп задає захоплення.
+        bottleneck = "capture"
+        congested = [stage for stage in self.stages if stage["queue"].dropped or stage["queue"].blocked]
+        if congested:
+            bottleneck = max(
+                congested,
+                key=lambda stage: stages[stage["name"]]["utilization"] / stage["workers"],
+            )["name"]
+        return {
+            "elapsed_s": round(elapsed, 1),
+            "completed": self.completed,
+            "end_to_end_p50_ms": _percentile_ms(ordered, 0.50),
+            "end_to_end_p95_ms": _percentile_ms(ordered, 0.95),
+            "end_to_end_p99_ms": _percentile_ms(ordered, 0.99),
+            "bottleneck": bottleneck,
+            "stages": stages,
+            "sources": self._source_stats(elapsed),
+            "components": {name: func() for name, func in self.extra_stats.items()},
+        }
+
+    def _source_stats(self, elapsed):
+        """Статистика кожної камери; dropped - її кадри, відкинуті в усіх чергах."""
+        report = {}
+        for name, source_stats in self.per_source.items():
+            snapshot = source_stats.snapshot(elapsed)
+            if len(self.sources) > 1:
+                snapshot["dropped"] = sum(stage["queue"].dropped_by_source[name] for stage in self.stages)
+            else:
+                snapshot["dropped"] = sum(stage["queue"].dropped for stage in self.stages)
+            report[name] = snapshot
+        return report
@@ -0,0 +1,169 @@
+import itertools
+import threading
+import time
+from collections import Counter
+
+
+def iou(a, b):
+    """Intersection over Union двох рамок (x1, y1, x2, y2)."""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / (area_a + area_b - inter)
+
+
+class Track:
+    def __init__(self, track_id, bbox, now):
+        self.id = track_id
+        self.bbox = bbox
+        self.first_seen = now
+        self.last_seen = now
+        self.readings = []
+        self.decided = False
+        self.plate = None
+        self.confidence = None
+        self.allowed = None
+
+
+class PlateTracker:
+    """Відстеження автомобілів між кадрами та голосування за номер.
+
+    Рамки автомобілів зіставляються з наявними треками за IoU. Результати OCR
+    для треку накопичуються; номер вважається розпізнаним, коли серед
+    прочитань найчастішої довжини є щонайменше min_votes і для кожної позиції
+    частка голосів за найчастіший символ не менша за confidence. Якщо після
+    max_readings прочитань упевненість нижча за confidence, рішення не
+    приймається: прочитання відкидаються і голосування починається заново.
+    Рішення щодо воріт приймається один раз на трек, а той самий номер не
+    обробляється повторно протягом cooldown секунд.
+
+    Кадри однієї камери мають надходити в update у порядку захоплення (now -
+    час захоплення кадру): кадр, старший за вже застосований (кілька воркерів
+    детектора закінчили не по черзі), відкидається, щоб треки не поверталися
+    до попередніх положень.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=3.0, min_votes=3, confidence=0.6,
+                 max_readings=8, cooldown=30.0):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_votes = min_votes
+        self.confidence = confidence
+        self.max_readings = max_readings
+        self.cooldown = cooldown
+        self.tracks = {}
+        self._ids = itertools.count(1)
+        self._recent_plates = {}
+        self._last_update = None
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    def update(self, boxes, now=None):
+        """Зіставляє рамки кадру з треками; повертає id треку для кожної рамки.
+
+        None - кадр старший за вже застосований, його рамки не враховуються.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._last_update is not None and now < self._last_update:
+                self.counters["stale_frames"] += 1
+                return None
+            self._last_update = now
+            for track_id in [t.id for t in self.tracks.values() if now - t.last_seen > self.max_age]:
+                del self.tracks[track_id]
+            pairs = sorted(
+                ((iou(box, track.bbox), index, track.id)
+                 for index, box in enumerate(boxes)
+                 for track in self.tracks.values()),
+                reverse=True,
+            )
+            assigned = {}
+            used_tracks = set()
+            for overlap, index, track_id in pairs:
+                if overlap < self.iou_threshold:
+                    break
+                if index in assigned or track_id in used_tracks:
+                    continue
+                assigned[index] = track_id
+                used_tracks.add(track_id)
+            result = []
+            for index, box in enumerate(boxes):
+                track_id = assigned.get(index)
+                if track_id is None:
+                    track_id = next(self._ids)
+                    self.tracks[track_id] = Track(track_id, box, now)
+                    self.counters["tracks"] += 1
+                track = self.tracks[track_id]
+                track.bbox = box
+                track.last_seen = now
+                result.append(track_id)
+            return result
+
+    def needs_ocr(self, track_id):
+        """False, якщо для треку рішення вже прийняте - OCR більше не потрібен."""
+        with self._lock:
+            track = self.tracks.get(track_id)
+            needed = track is not None and not track.decided
+            self.counters["ocr_requested" if needed else "ocr_skipped"] += 1
+            return needed
+
+    def _consensus(self, readings):
+        lengths = Counter(len(text) for text in readings)
+        length, count = lengths.most_common(1)[0]
+        candidates = [text for text in readings if len(text) == length]
+        chars = []
+        confidence = 1.0
+        for position in range(length):
+            char, votes = Counter(text[position] for text in candidates).most_common(1)[0]
+            chars.append(char)
+            confidence = min(confidence, votes / count)
+        return "".join(chars), count, confidence
+
+    def add_reading(self, track_id, text, now=None):
+        """Додає результат OCR. Повертає номер, якщо для треку час прийняти рішення."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            track = self.tracks.get(track_id)
+            if track is None or track.decided or not text:
+                return None
+            track.readings.append(text)
+            plate, votes, confidence = self._consensus(track.readings)
+            if confidence < self.confidence:
+                if len(track.readings) >= self.max_readings:
+                    # Невпевнений номер не повинен дійти до перевірки доступу
+                    track.readings = []
+                    self.counters["inconclusive"] += 1
+                return None
+            if votes < self.min_votes and len(track.readings) < self.max_readings:
+                return None
+            track.decided = True
+            track.plate = plate
+            track.confidence = confidence
+            last = self._recent_plates.get(plate)
+            if last is not None and now - last < self.cooldown:
+                self.counters["cooldown_suppressed"] += 1
+                return None
+            self._recent_plates = {p: t for p, t in self._recent_plates.items() if now - t < self.cooldown}
+            self._recent_plates[plate] = now
+            self.counters["decisions"] += 1
+            return plate
+
+    def track_confidence(self, track_id):
+        """Частка голосів за найменш певний символ узгодженого номера треку."""
+        with self._lock:
+            track = self.tracks.get(track_id)
+            return track.confidence if track is not None else None
+
+    def set_result(self, track_id, allowed):
+        with self._lock:
+            track = self.tracks.get(track_id)
+            if track is not None:
+                track.allowed = allowed
+
+    def stats(self):
+        with self._lock:
+            return {"active_tracks": len(self.tracks), **self.counters}
@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+# Ширина кадру для виявлення автомобілів (YOLO все одно зводить вхід до 640)
+DETECT_WIDTH = 640
+
+
+def brightness_lut(alpha=1.2, beta=50):
+    """Таблиця 256 значень, еквівалентна cv2.convertScaleAbs(image, alpha=alpha, beta=beta)."""
+    values = np.abs(np.arange(256, dtype=np.float32) * alpha + beta)
+    return np.clip(np.rint(values), 0, 255).astype(np.uint8)
+
+
+class FramePreprocessor:
+    """Підготовка кадру з урахуванням роздільної здатності.
+
+    Автомобілі шукаються на зменшеному кадрі, рамки перераховуються в
+    координати оригіналу, а області автомобілів вирізаються з повнорозмірного
+    кадру. Корекція яскравості (таблиця LUT) застосовується лише до зменшеного
+    кадру та вирізаних областей. Буфер зменшеного кадру використовується
+    повторно, тому результат downscale() дійсний лише до наступного виклику;
+    екземпляр розрахований на один потік.
+    """
+
+    def __init__(self, detect_width=DETECT_WIDTH, alpha=1.2, beta=50):
+        self.detect_width = detect_width
+        self.lut = brightness_lut(alpha, beta)
+        self._buffer = None
+
+    def downscale(self, frame):
+        """Повертає (зменшений кадр з корекцією яскравості, масштаб зменшення)."""
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.detect_width / width)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        shape = (size[1], size[0]) + frame.shape[2:]
+        if self._buffer is None or self._buffer.shape != shape or self._buffer.dtype != frame.dtype:
+            self._buffer = np.empty(shape, dtype=frame.dtype)
+        if scale < 1.0:
+            cv2.resize(frame, size, dst=self._buffer, interpolation=cv2.INTER_AREA)
+        else:
+            np.copyto(self._buffer, frame)
+        cv2.LUT(self._buffer, self.lut, dst=self._buffer)
+        return self._buffer, scale
+
+    @staticmethod
+    def to_full(detections, scale, shape):
+        """Переводить рамки [x1, y1, x2, y2, ...] зі зменшеного кадру в координати оригіналу."""
+        if len(detections) == 0:
+            return detections
+        boxes = np.array(detections, dtype=np.float32, copy=True)
+        boxes[:, :4] /= scale
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+        return boxes
+
+    def crop(self, frame, bbox):
+        """Вирізає область з повнорозмірного кадру та коригує її яскравість (нова копія)."""
+        x1, y1, x2, y2 = map(int, bbox)
+        return cv2.LUT(frame[y1:y2, x1:x2], self.lut)
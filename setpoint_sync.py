@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+
+from db import ROOM_TABLES
+
+# Період контрольної повторної синхронізації бажаної температури (секунди)
+RESYNC_INTERVAL = float(os.environ.get("SETPOINT_RESYNC_INTERVAL", 600))
+
+# Версія бажаної температури кожної кімнати: збільшується при кожній зміні,
+# публікується разом зі значенням у retained-повідомленні home/room/<room>.
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS desired_temp_versions (
+    room TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+)
+"""
+
+# Один запит замість п'яти SELECT: бажана температура і версія всіх кімнат
+SNAPSHOT_SQL = " UNION ALL ".join(
+    f"SELECT '{room}' AS room, t.desired_temperature AS desired_temperature, coalesce(v.version, 0) AS version "
+    f"FROM {table} AS t LEFT JOIN desired_temp_versions AS v ON v.room = '{room}' WHERE t.id = 1"
+    for room, table in ROOM_TABLES.items()
+)
+
+_published = {}
+_published_lock = threading.Lock()
+_schema_ready = False
+
+
+def ensure_schema(conn):
+    """Створює таблицю версій один раз на процес.
+
+    API_server створює її під час запуску; WEB-interface - під час першої
+    зміни температури. Прапорець ставиться лише поза транзакцією, коли
+    CREATE TABLE уже зафіксовано (як у telemetry_history.ensure_schema).
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    in_transaction = conn.in_transaction
+    conn.execute(SCHEMA_SQL)
+    if not in_transaction:
+        conn.commit()
+        _schema_ready = True
+
+
+def normalize(value):
+    """Бажана температура як число (з форми WEB-інтерфейсу вона надходить рядком)."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def update_desired_temp(conn, room, value):
+    """Зберігає бажану температуру кімнати, якщо вона змінилась.
+
+    Повертає (changed, version). Версія збільшується в тій самій транзакції,
+    що й значення, тому обидва процеси (API_server і WEB-interface) бачать
+    узгоджену нумерацію.
+    """
+    table = ROOM_TABLES[room]
+    value = normalize(value)
+    ensure_schema(conn)
+    row = conn.execute(
+        f"SELECT t.desired_temperature AS desired_temperature, coalesce(v.version, 0) AS version "
+        f"FROM {table} AS t LEFT JOIN desired_temp_versions AS v ON v.room = ? WHERE t.id = 1",
+        (room,),
+    ).fetchone()
+    if row and normalize(row["desired_temperature"]) == value:
+        return False, row["version"]
+    conn.execute(f"""
+        UPDATE {table}
+        SET desired_temperature = ?, timestamp = CURRENT_TIMESTAMP
+        WHERE id = 1;
+    """, (value,))
+    conn.execute("""
+        INSERT INTO desired_temp_versions (room, version) VALUES (?, 1)
+        ON CONFLICT (room) DO UPDATE SET version = version + 1
+    """, (room,))
+    version = conn.execute("SELECT version FROM desired_temp_versions WHERE room = ?", (room,)).fetchone()["version"]
+    conn.commit()
+    return True, version
+
+
+def publish_desired_temp(mqtt_client, room, value, version):
+    """Публікує retained-повідомлення: ESP32 отримує його одразу після підписки."""
+    value = normalize(value)
+    mqtt_client.publish(
+        f"home/room/{room}",
+        json.dumps({"desired_temp": value, "version": version}),
+        qos=1,
+        retain=True,
+    )
+    with _published_lock:
+        _published[room] = (value, version)
+
+
+def resync(conn, mqtt_client):
+    """Контрольна синхронізація: публікує лише ті кімнати, де значення в базі
+    відрізняється від останнього опублікованого цим процесом."""
+    ensure_schema(conn)
+    sent = []
+    for row in conn.execute(SNAPSHOT_SQL).fetchall():
+        current = (normalize(row["desired_temperature"]), row["version"])
+        with _published_lock:
+            unchanged = _published.get(row["room"]) == current
+        if not unchanged and current[0] is not None:
+            publish_desired_temp(mqtt_client, row["room"], *current)
+            sent.append(row["room"])
+    return sent
+
+
+def is_setpoint_message(data):
+    """Повідомлення з лише бажаною температурою - це наша ж публікація, а не телеметрія ESP32."""
+    return "desired_temp" in data and "temp" not in data and "light" not in data
@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import log
+
+# Максимальна пауза між спробами підключення до брокера (секунди)
+MQTT_RECONNECT_MAX_DELAY = int(os.environ.get("MQTT_RECONNECT_MAX_DELAY", 30))
+
+# Відлік часу запуску - від першого імпорту цього модуля
+STARTED_AT = time.monotonic()
+
+
+class Readiness:
+    """Стан запуску сервісу для /healthz і /readyz.
+
+    Кожен компонент (база, брокер, модель, камера) спершу очікується
+    (expect), далі стає готовим або помилковим. Сервіс готовий, коли готові
+    всі очікувані компоненти. Для кожного запам'ятовується, через скільки
+    секунд від запуску він став готовим - це і є вимірювання часу старту.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._components = {}
+        self.ready_after = None
+
+    def expect(self, *names):
+        with self._condition:
+            for name in names:
+                self._components.setdefault(name, {"state": "pending"})
+        return self
+
+    def _set(self, name, state, error=None):
+        with self._condition:
+            component = self._components.setdefault(name, {})
+            component.update(state=state, error=error)
+            if state == "ready" and "ready_after_s" not in component:
+                component["ready_after_s"] = round(time.monotonic() - STARTED_AT, 3)
+            if self.ready_after is None and self._ready_locked():
+                self.ready_after = round(time.monotonic() - STARTED_AT, 3)
+                log.info("Service ready in %.2f s", self.ready_after)
+            self._condition.notify_all()
+
+    def set_ready(self, name):
+        self._set(name, "ready")
+
+    def set_pending(self, name, reason=None):
+        self._set(name, "pending", reason)
+
+    def set_failed(self, name, error):
+        self._set(name, "failed", str(error))
+
+    def _ready_locked(self):
+        return all(component["state"] == "ready" for component in self._components.values())
+
+    def is_ready(self):
+        with self._condition:
+            return self._ready_locked()
+
+    def wait(self, name, timeout=None):
+        """Чекає, поки компонент стане готовим; False - помилка або вичерпано timeout."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._components.get(name, {}).get("state") in ("ready", "failed"),
+                                     timeout)
+            return self._components.get(name, {}).get("state") == "ready"
+
+    @contextmanager
+    def phase(self, name):
+        """Етап запуску: компонент готовий після успішного виконання блоку."""
+        self.expect(name)
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.set_failed(name, e)
+            log.error("Startup phase %s failed: %s", name, e)
+            raise
+        self.set_ready(name)
+        log.info("Startup phase %s took %.2f s", name, time.monotonic() - started)
+
+    def report(self):
+        with self._condition:
+            components = {name: dict(component) for name, component in self._components.items()}
+            ready = self._ready_locked()
+        return {
+            "ready": ready,
+            "uptime_s": round(time.monotonic() - STARTED_AT, 3),
+            "ready_after_s": self.ready_after,
+            "components": components,
+        }
+
+
+class LazyResource:
+    """Важкий ресурс (модель тощо), що створюється один раз.
+
+    load_in_background() починає завантаження в окремому потоці одразу після
+    старту; get() повертає ресурс, за потреби чекаючи на завершення або
+    завантажуючи його сам. Помилка завантаження повторюється в кожному get().
+    """
+
+    def __init__(self, name, loader, readiness=None):
+        self.name = name
+        self.loader = loader
+        self.readiness = readiness
+        self._lock = threading.Lock()
+        self._value = None
+        self._error = None
+        self._loaded = False
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded and self._error is None:
+                    self._load()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def _load(self):
+        try:
+            if self.readiness is not None:
+                with self.readiness.phase(self.name):
+                    self._value = self.loader()
+            else:
+                self._value = self.loader()
+            self._loaded = True
+        except Exception as e:
+            self._error = e
+
+    def load_in_background(self):
+        if self.readiness is not None:
+            self.readiness.expect(self.name)
+        threading.Thread(target=self._load_quietly, name=f"load-{self.name}", daemon=True).start()
+        return self
+
+    def _load_quietly(self):
+        try:
+            self.get()
+        except Exception:
+            # Помилку вже записано в readiness; get() поверне її викликачу
+            pass
+
+
+def connect_mqtt(client, host, port, readiness=None, on_connect=(), keepalive=60, name="mqtt"):
+    """Неблокувальне підключення до брокера з автоматичним перепідключенням.
+
+    Мережевий потік paho сам повторює спроби (1..MQTT_RECONNECT_MAX_DELAY с),
+    тому сервіс стартує і без брокера. Функції on_connect(client) викликаються
+    після кожного (пере)підключення - там оформлюються підписки.
+    """
+    if readiness is not None:
+        readiness.expect(name)
+
+    def handle_connect(client, userdata, flags, rc):
+        if rc != 0:
+            log.warning("MQTT connection to %s:%s refused (rc=%s)", host, port, rc)
+            return
+        log.info("Connected to MQTT broker %s:%s", host, port)
+        for callback in on_connect:
+            callback(client)
+        if readiness is not None:
+            readiness.set_ready(name)
+
+    def handle_disconnect(client, userdata, rc):
+        if rc != 0:
+            log.warning("MQTT connection lost (rc=%s), reconnecting", rc)
+        if readiness is not None:
+            readiness.set_pending(name, "disconnected")
+
+    client.on_connect = handle_connect
+    client.on_disconnect = handle_disconnect
+    client.reconnect_delay_set(min_delay=1, max_delay=MQTT_RECONNECT_MAX_DELAY)
+    client.connect_async(host, port, keepalive)
+    client.loop_start()
+    return client
+
+
+def health_response(readiness, path):
+    """(код, JSON) для /healthz (процес живий) і /readyz (усі компоненти готові); None - інший шлях."""
+    if path == "/healthz":
+        return 200, json.dumps({"status": "ok", "uptime_s": round(time.monotonic() - STARTED_AT, 3)})
+    if path == "/readyz":
+        report = readiness.report()
+        return (200 if report["ready"] else 503), json.dumps(report)
+    return None
+
+
+def register_flask(app, readiness):
+    """Маршрути /healthz і /readyz Flask-застосунку."""
+    from flask import Response
+
+    def respond(path):
+        status, body = health_response(readiness, path)
+        return Response(body, status=status, content_type="application/json")
+
+    app.add_url_rule("/healthz", "healthz", lambda: respond("/healthz"))
+    app.add_url_rule("/readyz", "readyz", lambda: respond("/readyz"))
+    return app
@@ -0,0 +1,220 @@
+import math
+import time
+from datetime import datetime
+
+# Рівні агрегації: назва -> тривалість інтервалу в секундах
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+# Скільки зберігати дані кожного рівня (секунди, None - без обмеження)
+RETENTION = {"raw": 7 * 86400, "1m": 30 * 86400, "1h": 365 * 86400, "1d": None}
+PRUNE_INTERVAL = 3600
+
+# Максимальна кількість точок у відповіді при автоматичному виборі рівня
+MAX_POINTS = 1500
+# Сирі дані видаються лише для коротких проміжків
+RAW_MAX_SPAN = 86400
+
+# Стани пристроїв, що зберігаються як 0/1: ключ JSON -> (стовпець, значення "увімкнено")
+STATE_FIELDS = {
+    "light": ("light", "on"),
+    "fan": ("fan", "on"),
+    "curtains": ("curtains", "open"),
+    "fire": ("fire", "yes"),
+}
+STATE_COLUMNS = [column for column, _ in STATE_FIELDS.values()]
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS telemetry_history (
+    room TEXT NOT NULL,
+    ts REAL NOT NULL,
+    temperature REAL,
+    light INTEGER,
+    fan INTEGER,
+    curtains INTEGER,
+    fire INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_telemetry_history_room_ts ON telemetry_history (room, ts);
+CREATE TABLE IF NOT EXISTS telemetry_rollup (
+    resolution INTEGER NOT NULL,
+    room TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    temp_count INTEGER NOT NULL,
+    temp_min REAL,
+    temp_max REAL,
+    temp_sum REAL,
+    light INTEGER,
+    fan INTEGER,
+    curtains INTEGER,
+    fire INTEGER,
+    PRIMARY KEY (resolution, room, bucket)
+) WITHOUT ROWID;
+"""
+
+# Інкрементальне оновлення агрегатів. Стани зберігаються як кількість
+# вимірювань зі значенням "увімкнено"; NULL означає, що в кімнаті немає такого пристрою.
+_NULLABLE_SUM = "CASE WHEN {c} IS NULL AND excluded.{c} IS NULL THEN NULL ELSE coalesce({c}, 0) + coalesce(excluded.{c}, 0) END"
+UPSERT_ROLLUP_SQL = f"""
+INSERT INTO telemetry_rollup (resolution, room, bucket, samples, temp_count, temp_min, temp_max, temp_sum, {", ".join(STATE_COLUMNS)})
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, {", ".join("?" for _ in STATE_COLUMNS)})
+ON CONFLICT (resolution, room, bucket) DO UPDATE SET
+    samples = samples + excluded.samples,
+    temp_count = temp_count + excluded.temp_count,
+    temp_min = coalesce(min(temp_min, excluded.temp_min), temp_min, excluded.temp_min),
+    temp_max = coalesce(max(temp_max, excluded.temp_max), temp_max, excluded.temp_max),
+    temp_sum = coalesce(temp_sum, 0) + coalesce(excluded.temp_sum, 0),
+    {", ".join(f"{c} = {_NULLABLE_SUM.format(c=c)}" for c in STATE_COLUMNS)};
+"""
+INSERT_RAW_SQL = f"""
+INSERT INTO telemetry_history (room, ts, temperature, {", ".join(STATE_COLUMNS)})
+VALUES (?, ?, ?, {", ".join("?" for _ in STATE_COLUMNS)});
+"""
+
+_schema_ready = False
+_last_prune = 0.0
+
+
+def ensure_schema(conn):
+    """Створює таблиці історії (без executescript, щоб не завершувати поточну транзакцію).
+
+    Прапорець _schema_ready ставиться лише тоді, коли таблиці вже зафіксовані:
+    поза транзакцією або після commit. Якщо виклик потрапив у транзакцію
+    (запис пакета TelemetryWriter), її відкат скасує і CREATE TABLE, тому
+    наступний виклик створить таблиці знову. API_server створює схему під час запуску.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    in_transaction = conn.in_transaction
+    for statement in SCHEMA_SQL.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+    if not in_transaction:
+        conn.commit()
+        _schema_ready = True
+
+
+def _sample_values(data):
+    """Перетворює повідомлення ESP32 на (температура, стани 0/1 або None)."""
+    try:
+        temperature = float(data["temp"]) if data.get("temp") is not None else None
+    except (TypeError, ValueError):
+        temperature = None
+    if temperature is not None and not math.isfinite(temperature):
+        # NaN/inf зіпсували б temp_min/temp_max/temp_sum агрегатів
+        temperature = None
+    states = []
+    for key, (_, on_value) in STATE_FIELDS.items():
+        value = data.get(key)
+        states.append(None if value is None else int(str(value).lower() == on_value))
+    return temperature, states
+
+
+def record_samples(conn, samples):
+    """Додає вимірювання (кімната, дані, unix-час) і оновлює агрегати.
+
+    Викликається в транзакції потоку TelemetryWriter; агрегати кожного рівня
+    спочатку підсумовуються в пам'яті, тож на пакет припадає один UPSERT на інтервал.
+    """
+    ensure_schema(conn)
+    raw_rows = []
+    rollups = {}
+    for room, data, ts in samples:
+        temperature, states = _sample_values(data)
+        raw_rows.append((room, ts, temperature, *states))
+        for seconds in RESOLUTIONS.values():
+            key = (seconds, room, int(ts // seconds * seconds))
+            agg = rollups.get(key)
+            if agg is None:
+                agg = rollups[key] = [0, 0, None, None, None] + [None] * len(states)
+            agg[0] += 1
+            if temperature is not None:
+                agg[1] += 1
+                agg[2] = temperature if agg[2] is None else min(agg[2], temperature)
+                agg[3] = temperature if agg[3] is None else max(agg[3], temperature)
+                agg[4] = temperature if agg[4] is None else agg[4] + temperature
+            for i, state in enumerate(states, start=5):
+                if state is not None:
+                    agg[i] = state if agg[i] is None else agg[i] + state
+    conn.executemany(INSERT_RAW_SQL, raw_rows)
+    conn.executemany(UPSERT_ROLLUP_SQL, [(*key, *agg) for key, agg in rollups.items()])
+    maybe_prune(conn)
+
+
+def prune(conn, now=None):
+    """Видаляє дані, старші за RETENTION."""
+    now = now or time.time()
+    ensure_schema(conn)
+    if RETENTION["raw"] is not None:
+        conn.execute("DELETE FROM telemetry_history WHERE ts < ?", (now - RETENTION["raw"],))
+    for name, seconds in RESOLUTIONS.items():
+        if RETENTION[name] is not None:
+            conn.execute(
+                "DELETE FROM telemetry_rollup WHERE resolution = ? AND bucket < ?",
+                (seconds, now - RETENTION[name]),
+            )
+
+
+def maybe_prune(conn, now=None):
+    global _last_prune
+    now = now or time.time()
+    if now - _last_prune >= PRUNE_INTERVAL:
+        _last_prune = now
+        prune(conn, now)
+
+
+def parse_time(value, default):
+    """Час з параметра запиту: unix-секунди або ISO 8601; nan/inf - ValueError."""
+    if value is None or value == "":
+        return default
+    try:
+        result = float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+    if not math.isfinite(result):
+        raise ValueError(f"Invalid time: {value}")
+    return result
+
+
+def choose_resolution(start, end):
+    """Найдрібніший рівень агрегації, що дає не більше MAX_POINTS точок."""
+    for name, seconds in RESOLUTIONS.items():
+        if (end - start) / seconds <= MAX_POINTS:
+            return name
+    return "1d"
+
+
+def query_history(conn, room, start, end, resolution=None):
+    """Історія кімнати за проміжок [start, end) з потрібного рівня агрегації."""
+    ensure_schema(conn)
+    resolution = resolution or choose_resolution(start, end)
+    if resolution == "raw":
+        if end - start > RAW_MAX_SPAN:
+            raise ValueError(f"raw resolution is limited to {RAW_MAX_SPAN} seconds, use 1m/1h/1d")
+        rows = conn.execute(
+            f"SELECT ts, temperature, {', '.join(STATE_COLUMNS)} FROM telemetry_history "
+            "WHERE room = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (room, start, end),
+        ).fetchall()
+        return resolution, [dict(row) for row in rows]
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"unknown resolution: {resolution}")
+    seconds = RESOLUTIONS[resolution]
+    rows = conn.execute(
+        f"SELECT bucket, samples, temp_count, temp_min, temp_max, temp_sum, {', '.join(STATE_COLUMNS)} "
+        "FROM telemetry_rollup WHERE resolution = ? AND room = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+        (seconds, room, start // seconds * seconds, end),
+    ).fetchall()
+    points = []
+    for row in rows:
+        point = {
+            "ts": row["bucket"],
+            "samples": row["samples"],
+            "temp_min": row["temp_min"],
+            "temp_max": row["temp_max"],
+            "temp_avg": row["temp_sum"] / row["temp_count"] if row["temp_count"] else None,
+        }
+        for column in STATE_COLUMNS:
+            point[f"{column}_on_fraction"] = row[column] / row["samples"] if row[column] is not None else None
+        points.append(point)
+    return resolution, points
@@ -0,0 +1,131 @@
+import queue
+import threading
+import time
+
+import db
+import log
+
+_STOP = object()
+
+
+class TelemetryWriter:
+    """Фоновий запис телеметрії ESP32 пакетами.
+
+    Обробник MQTT лише кладе (кімната, дані) в обмежену чергу і одразу
+    повертається. Потік запису об'єднує повідомлення однієї кімнати (перемагає
+    останнє) і записує їх однією транзакцією, коли накопичиться batch_size
+    повідомлень або мине flush_interval секунд. Якщо черга заповнена,
+    повідомлення відкидається і враховується в лічильнику dropped.
+
+    Якщо задано write_samples, у тій самій транзакції йому передаються всі
+    повідомлення пакета (кімната, дані, unix-час) без об'єднання - для історії.
+    """
+
+    def __init__(self, write_latest, write_samples=None, max_queue=1000, batch_size=50, flush_interval=1.0):
+        self.write_latest = write_latest
+        self.write_samples = write_samples
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._metrics = {
+            "received": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "rows_written": 0,
+            "flushes": 0,
+            "errors": 0,
+            "queue_high_watermark": 0,
+            "last_flush_ms": 0.0,
+            "max_lag_ms": 0.0,
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, room, data):
+        """Неблокуюче додавання повідомлення; False, якщо черга заповнена."""
+        try:
+            self._queue.put_nowait((room, data, time.monotonic(), time.time()))
+        except queue.Full:
+            with self._lock:
+                self._metrics["dropped"] += 1
+            return False
+        depth = self._queue.qsize()
+        with self._lock:
+            self._metrics["received"] += 1
+            if depth > self._metrics["queue_high_watermark"]:
+                self._metrics["queue_high_watermark"] = depth
+        return True
+
+    def stop(self, timeout=5.0):
+        """Записує все, що залишилось у черзі, і зупиняє потік."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._metrics)
+        result["queue_depth"] = self._queue.qsize()
+        result["queue_capacity"] = self._queue.maxsize
+        return result
+
+    def _run(self):
+        conn = db.open_connection()
+        latest = {}
+        samples = []
+        messages = 0
+        oldest = None
+        running = True
+        while running:
+            timeout = self.flush_interval if oldest is None else max(0.0, oldest + self.flush_interval - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                running = False
+            elif item is not None:
+                room, data, received_at, wall_time = item
+                latest[room] = data
+                if self.write_samples is not None:
+                    samples.append((room, data, wall_time))
+                messages += 1
+                if oldest is None:
+                    oldest = received_at
+            if latest and (not running or messages >= self.batch_size or time.monotonic() - oldest >= self.flush_interval):
+                self._flush(conn, latest, samples, messages, oldest)
+                latest = {}
+                samples = []
+                messages = 0
+                oldest = None
+        conn.really_close()
+
+    def _flush(self, conn, latest, samples, messages, oldest):
+        started = time.monotonic()
+        try:
+            with conn:
+                for room, data in latest.items():
+                    self.write_latest(conn, room, data)
+                if samples:
+                    self.write_samples(conn, samples)
+        except Exception as e:
+            log.error("Failed to flush telemetry batch: %s", e)
+            with self._lock:
+                self._metrics["errors"] += 1
+            return
+        finished = time.monotonic()
+        with self._lock:
+            metrics = self._metrics
+            metrics["flushes"] += 1
+            metrics["rows_written"] += len(latest)
+            metrics["coalesced"] += messages - len(latest)
+            metrics["last_flush_ms"] = round((finished - started) * 1000, 3)
+            metrics["max_lag_ms"] = max(metrics["max_lag_ms"], round((finished - oldest) * 1000, 3))